@@ -0,0 +1,244 @@
+"""
+Air Tracker AeroDataBox Client
+
+Thin client for the AeroDataBox endpoints used by the ingestion
+notebook. Requests are dispatched from a thread pool so several are in
+flight at once, while a shared token bucket keeps the overall request
+rate inside the RapidAPI quota; ``scheduler.py`` adapts its rate to the
+API's quota headers and 429s and retries transient failures. All
+requests reuse one keep-alive session, and responses can be served from
+a persistent TTL cache.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+import metrics
+from ratelimit import TokenBucket
+from response_cache import MISS, ResponseCache
+from scheduler import RequestScheduler
+
+
+class AeroDataBoxClient:
+    """
+    Rate-limited, concurrent AeroDataBox API client.
+
+    Args:
+        api_key (str, optional): RapidAPI key
+        host (str, optional): RapidAPI host header value
+        base_url (str, optional): API root URL; use a local mock server
+            URL for testing
+        rate (float, optional): Allowed requests per second
+        burst (int, optional): Requests allowed back-to-back
+        max_workers (int, optional): Requests kept in flight at once
+        timeout (float, optional): Per-request timeout in seconds
+        limiter (TokenBucket, optional): Shared limiter; overrides
+            ``rate``/``burst`` so several clients can share one quota
+        scheduler (RequestScheduler, optional): Shared scheduler (rate
+            adaptation, retries, circuit breakers); overrides ``limiter``
+        cache (ResponseCache, optional): Response cache consulted before
+            every request; cache hits do not consume quota
+        negative_ttl (float, optional): Seconds a 404 is remembered in
+            the cache before the resource is requested again
+
+    Example:
+        >>> client = AeroDataBoxClient(
+        ...     base_url="http://127.0.0.1:8000", cache=ResponseCache()
+        ... )
+        >>> airports = client.fetch_all(client.fetch_airport, ["DEL", "BOM"])
+    """
+
+    def __init__(
+        self,
+        api_key: str = config.API_KEY,
+        host: str = config.API_HOST,
+        base_url: str = config.API_BASE_URL,
+        rate: float = config.API_RATE_PER_SEC,
+        burst: int = config.API_BURST,
+        max_workers: int = config.API_MAX_WORKERS,
+        timeout: float = config.API_TIMEOUT,
+        limiter: Optional[TokenBucket] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        cache: Optional[ResponseCache] = None,
+        negative_ttl: float = config.CACHE_NEGATIVE_TTL,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.scheduler = scheduler or RequestScheduler(limiter or TokenBucket(rate, burst))
+        self.limiter = self.scheduler.limiter
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+
+        # One keep-alive connection per worker, reused across requests
+        self.session = requests.Session()
+        self.session.headers.update({
+            "x-rapidapi-key": api_key,
+            "x-rapidapi-host": host,
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    # ============================================================
+    # SINGLE REQUESTS
+    # ============================================================
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+            endpoint: Optional[str] = None) -> Optional[Any]:
+        """
+        Issue one scheduled GET request, or answer it from the cache.
+
+        The request is paced and retried by ``self.scheduler`` (see
+        ``scheduler.py``): 429s, 5xx responses and connection errors are
+        sent again before anything is raised.
+
+        Args:
+            path (str): Endpoint path, e.g. ``/airports/iata/DEL``
+            params (dict, optional): Query string parameters
+            endpoint (str, optional): Name the request is paced, guarded
+                by a circuit breaker and counted under; defaults to ``path``
+
+        Returns:
+            Parsed JSON body, or None for 204 No Content and 404 Not Found.
+            404s are remembered in the cache for ``negative_ttl`` seconds.
+
+        Raises:
+            requests.HTTPError: For any other non-2xx response, once
+                retries run out
+            scheduler.CircuitOpenError: If the endpoint keeps failing
+            scheduler.QuotaExhaustedError: If the plan's quota is used up
+        """
+        endpoint = endpoint or path
+        if self.cache is not None:
+            cached = self.cache.get(path, params)
+            if cached is not MISS:
+                metrics.inc("api_requests_total", endpoint=endpoint, status="cache")
+                return cached
+
+        response = self.scheduler.send(endpoint, lambda: self.session.get(
+            f"{self.base_url}{path}",
+            params=params,
+            timeout=self.timeout,
+        ))
+        if response.status_code == 404:
+            if self.cache is not None and self.cache.ttl_for(path):
+                self.cache.set(path, params, None, ttl=self.negative_ttl)
+            return None
+        if response.status_code == 204:
+            return None
+        response.raise_for_status()
+        with metrics.timer("api_decode_seconds", endpoint=endpoint):
+            data = response.json()
+
+        if self.cache is not None:
+            self.cache.set(path, params, data)
+        return data
+
+    def fetch_airport(self, iata: str) -> Optional[dict]:
+        """Fetch airport metadata for an IATA code."""
+        return self.get(f"/airports/iata/{iata}", endpoint="airport")
+
+    def fetch_flights(self, iata: str, params: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+        """Fetch departures/arrivals for an airport (default API window)."""
+        return self.get(f"/flights/airports/iata/{iata}", params, endpoint="flights")
+
+    def fetch_flights_window(self, iata: str, from_local: str, to_local: str,
+                             params: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+        """
+        Fetch departures for an airport between two local times.
+
+        Args:
+            iata (str): Airport IATA code
+            from_local (str): Window start, airport-local ``YYYY-MM-DDTHH:mm``
+            to_local (str): Window end; at most 12 hours after ``from_local``
+            params (dict, optional): Query parameters; defaults to
+                departures only
+        """
+        params = params if params is not None else {"direction": "Departure"}
+        return self.get(f"/flights/airports/iata/{iata}/{from_local}/{to_local}", params,
+                        endpoint="flights_window")
+
+    def fetch_aircraft(self, reg: str) -> Optional[dict]:
+        """Fetch airframe details for a registration (tail number)."""
+        return self.get(f"/aircrafts/reg/{reg}", endpoint="aircraft")
+
+    def fetch_airport_delays(self, iata: str) -> Optional[dict]:
+        """Fetch the current delay statistics for an airport."""
+        return self.get(f"/airports/iata/{iata}/delays", endpoint="airport_delays")
+
+    # ============================================================
+    # CONCURRENT REQUESTS
+    # ============================================================
+
+    def iter_fetch(
+        self, fetch: Callable[[str], Any], items: Iterable[str]
+    ) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        Run ``fetch`` for every item with up to ``max_workers`` in flight.
+
+        Results are yielded as soon as they complete, so callers can start
+        processing before the slowest request returns. Items are pulled
+        from ``items`` lazily and at most ``2 * max_workers`` requests are
+        queued at a time, so a slow consumer applies backpressure instead
+        of letting finished responses pile up in memory.
+
+        Args:
+            fetch (Callable): One of the ``fetch_*`` methods
+            items (Iterable[str]): IATA codes or registrations
+
+        Yields:
+            tuple: ``(item, result, error)``; ``error`` is the raised
+            exception (and ``result`` None) when the request failed
+        """
+        items = iter(items)
+        window = 2 * self.max_workers
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for item in islice(items, window):
+                pending[pool.submit(fetch, item)] = item
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    error = future.exception()
+                    result = None if error else future.result()
+                    yield item, result, error
+
+                for item in islice(items, window - len(pending)):
+                    pending[pool.submit(fetch, item)] = item
+
+    def fetch_all(self, fetch: Callable[[str], Any], items: Iterable[str]) -> Dict[str, Any]:
+        """
+        Fetch every item concurrently and collect the results.
+
+        Failed and empty responses are reported and left out of the result.
+
+        Args:
+            fetch (Callable): One of the ``fetch_*`` methods
+            items (Iterable[str]): IATA codes or registrations
+
+        Returns:
+            dict: Mapping of item to parsed JSON response, in input order
+        """
+        items = list(items)
+        results = {}
+        for item, result, error in self.iter_fetch(fetch, items):
+            if error is not None:
+                print("Request failed:", item, error)
+            elif result is None:
+                print("Not found:", item)
+            else:
+                results[item] = result
+        return {item: results[item] for item in items if item in results}
+
+    def close(self) -> None:
+        """Close pooled connections."""
+        self.session.close()
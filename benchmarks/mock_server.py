@@ -0,0 +1,224 @@
+"""
+Local mock of the AeroDataBox endpoints used by Air Tracker.
+
+Serves a :class:`~benchmarks.synthetic.SyntheticWorld` over HTTP with the
+same paths, status codes and RapidAPI rate-limit behaviour as the real
+API: requests over the per-second rate get ``429`` with ``Retry-After``,
+every response carries the ``X-RateLimit-Requests-*`` quota headers, an
+exhausted quota answers ``429`` until the server is restarted, empty
+flight windows are ``204`` and unknown airports / registrations ``404``.
+
+Point the client at it with ``AIR_TRACKER_API_BASE_URL`` or
+``AeroDataBoxClient(base_url=server.url)``.
+
+Usage:
+    python -m benchmarks.mock_server [--airports 15] [--flights 10000] [--rate 5] [--port 8000]
+"""
+
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlsplit
+
+from benchmarks.synthetic import SyntheticWorld
+from ratelimit import TokenBucket
+
+# (endpoint name, path pattern), matched in order
+ROUTES = [
+    ("delays", re.compile(r"^/airports/iata/(?P<iata>\w+)/delays$")),
+    ("airport", re.compile(r"^/airports/iata/(?P<iata>\w+)$")),
+    ("flights_window", re.compile(
+        r"^/flights/airports/iata/(?P<iata>\w+)/(?P<start>[\dT:-]+)/(?P<end>[\dT:-]+)$"
+    )),
+    ("flights", re.compile(r"^/flights/airports/iata/(?P<iata>\w+)$")),
+    ("aircraft", re.compile(r"^/aircrafts/reg/(?P<reg>[\w-]+)$")),
+]
+
+
+class MockAeroDataBox:
+    """
+    Threaded HTTP server answering AeroDataBox requests from a synthetic world.
+
+    Args:
+        world (SyntheticWorld): Data to serve
+        rate (float, optional): Requests per second before ``429``; None
+            disables the per-second limit
+        burst (int, optional): Requests allowed back-to-back
+        quota (int, optional): Total requests allowed (the monthly plan)
+        latency (float, optional): Seconds added to every response
+        host (str, optional): Interface to bind
+        port (int, optional): Port; 0 picks a free one
+
+    Example:
+        >>> with MockAeroDataBox(SyntheticWorld(), rate=5) as server:
+        ...     client = AeroDataBoxClient(base_url=server.url, rate=5)
+        ...     print(server.calls)
+    """
+
+    def __init__(
+        self,
+        world: SyntheticWorld,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        quota: Optional[int] = None,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.world = world
+        self.rate = rate
+        self.quota = quota
+        self.latency = latency
+        self.limiter = TokenBucket(rate, burst) if rate else None
+        self.calls: Counter = Counter()
+        self.throttled = 0
+        self._used = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def start(self) -> "MockAeroDataBox":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockAeroDataBox":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # ============================================================
+    # REQUEST HANDLING
+    # ============================================================
+
+    def _admit(self) -> Optional[dict]:
+        """Count the request; return 429 headers if it is over a limit."""
+        with self._lock:
+            over_quota = self.quota is not None and self._used >= self.quota
+            over_rate = self.limiter is not None and not over_quota and not self.limiter.try_acquire()
+            if over_quota or over_rate:
+                self.throttled += 1
+                retry_after = 3600 if over_quota else max(1, math.ceil(1 / self.rate))
+                return {"Retry-After": str(retry_after)}
+            # Like RapidAPI, only admitted requests count against the quota
+            self._used += 1
+            return None
+
+    def _quota_headers(self) -> dict:
+        if self.quota is None:
+            return {}
+        return {
+            "X-RateLimit-Requests-Limit": str(self.quota),
+            "X-RateLimit-Requests-Remaining": str(max(0, self.quota - self._used)),
+            # The mock's quota never resets; matches the Retry-After of an exhausted quota
+            "X-RateLimit-Requests-Reset": "3600",
+        }
+
+    def _answer(self, path: str):
+        """Return ``(endpoint, status, payload)`` for a request path."""
+        for endpoint, pattern in ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            args = match.groupdict()
+            if endpoint == "airport":
+                payload = self.world.airport(args["iata"])
+            elif endpoint == "delays":
+                payload = self.world.delays(args["iata"])
+            elif endpoint == "aircraft":
+                payload = self.world.aircraft(args["reg"])
+            elif endpoint == "flights_window":
+                payload = self.world.departures_local(args["iata"], args["start"], args["end"])
+            else:
+                end = self.world.end
+                payload = self.world.departures(args["iata"], end - timedelta(hours=12), end)
+            if payload is None:
+                return endpoint, 404, {"message": "Not found"}
+            if endpoint.startswith("flights") and not payload["departures"]:
+                return endpoint, 204, None
+            return endpoint, 200, payload
+        return "unknown", 404, {"message": "Unknown endpoint"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                throttled = server._admit()
+                if throttled is not None:
+                    self._send(429, {"message": "Too many requests"}, {**throttled, **server._quota_headers()})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                endpoint, status, payload = server._answer(urlsplit(self.path).path)
+                with server._lock:
+                    server.calls[endpoint] += 1
+                self._send(status, payload, server._quota_headers())
+
+            def _send(self, status: int, payload, headers: dict):
+                body = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--airports", type=int, default=15)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--rate", type=float, default=None, help="requests/sec before 429")
+    parser.add_argument("--burst", type=int, default=1)
+    parser.add_argument("--quota", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    world = SyntheticWorld(airports=args.airports, flights=args.flights, days=args.days)
+    server = MockAeroDataBox(
+        world, rate=args.rate, burst=args.burst, quota=args.quota,
+        latency=args.latency, port=args.port,
+    )
+    print(f"Serving {len(world.iata_codes)} airports, ~{args.flights} flights at {server.url}")
+    print(f"export AIR_TRACKER_API_BASE_URL={server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        print("Calls:", dict(server.calls), "throttled:", server.throttled)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Benchmark suite: ingestion throughput, API usage and catalog query latency.
+
+Builds a :class:`~benchmarks.synthetic.SyntheticWorld`, loads it into a
+scratch database (``air_tracker_bench`` by default, created and migrated
+on the configured MySQL server) and reports:
+
+- ingestion rows/sec per table, from the loaders' ``LoadStats``
+- API calls per run, by endpoint, and how many were throttled (``429``)
+- p50 / p95 latency of every catalog query, unfiltered and for a
+  one-day, one-airport scope (what the dashboard filters produce), on
+  MySQL and/or DuckDB over a Parquet export (``--backends mysql,duckdb``)
+
+By default ingestion goes through the real client and pipeline against
+a local :class:`~benchmarks.mock_server.MockAeroDataBox`; ``--direct``
+writes the generated rows straight to MySQL instead, which is the way to
+reach 1e7-1e8 flights.
+
+Usage:
+    python -m benchmarks.suite [--airports 15] [--flights 10000] [--days 7] [--rate 50]
+    python -m benchmarks.suite --direct --airports 2000 --flights 10000000 --infile
+"""
+
+import argparse
+import json
+import statistics
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import mysql.connector
+
+import config
+import delay_stats
+import parquet_store
+import pipeline
+import rollups
+from aerodatabox import AeroDataBoxClient
+from benchmarks.mock_server import MockAeroDataBox
+from benchmarks.synthetic import SyntheticWorld
+from bulk_loader import LoadStats
+from flight_parser import FLIGHT_COLUMNS, FLIGHT_UPDATE_COLUMNS
+from migrations import migrate
+from queries import CATALOG, FlightScope, build
+from query_backend import DuckDBBackend
+
+# First page of the paginated listings, as the dashboard requests it
+LISTING_PAGE = {"limit": (" LIMIT 26", ())}
+
+
+# ============================================================
+# DATABASE
+# ============================================================
+
+def bench_connection(database: str, infile: bool = False):
+    """Connect to a freshly migrated benchmark database."""
+    settings = {**config.DB_CONFIG, "database": database, "allow_local_infile": infile}
+    server = mysql.connector.connect(**{k: v for k, v in settings.items() if k != "database"})
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    server.close()
+    conn = mysql.connector.connect(**settings)
+    migrate(conn)
+    return conn
+
+
+# ============================================================
+# INGESTION
+# ============================================================
+
+def ingest_via_api(world: SyntheticWorld, conn, rate: float, burst: int,
+                   latency: float) -> Dict[str, object]:
+    """Run the incremental pipeline against a mock server serving ``world``."""
+    with MockAeroDataBox(world, rate=rate, burst=burst, latency=latency) as server:
+        client = AeroDataBoxClient(api_key="bench", base_url=server.url, rate=rate, burst=burst)
+        stats = [pipeline.ingest_airports(client, conn, world.iata_codes)]
+        flight_stats, registrations = pipeline.ingest_flights_incremental(
+            client, conn, world.iata_codes,
+            now=world.end,
+            initial_lookback=world.end - world.start,
+            lookahead=timedelta(0),
+        )
+        stats.append(flight_stats)
+        stats.append(pipeline.ingest_aircraft(client, conn, registrations))
+    return {
+        "stats": stats,
+        "api_calls": dict(server.calls),
+        "api_calls_total": server.total_calls,
+        "throttled": server.throttled,
+    }
+
+
+def ingest_direct(world: SyntheticWorld, conn, infile: bool = False) -> Dict[str, object]:
+    """Bulk-load ``world`` without the API, then rebuild the rollups and delay statistics."""
+    mode = "infile" if infile else "insert"
+    loaders = [
+        pipeline.table_loader(
+            conn, "airport", pipeline.AIRPORT_COLUMNS, update_columns=pipeline.AIRPORT_COLUMNS[2:],
+        ),
+        pipeline.table_loader(
+            conn, "flights", FLIGHT_COLUMNS, update_columns=FLIGHT_UPDATE_COLUMNS, mode=mode,
+        ),
+        pipeline.table_loader(conn, "aircraft", pipeline.AIRCRAFT_COLUMNS, ignore=True, mode=mode),
+    ]
+    airports, flights, aircraft = loaders
+    airports.extend(pipeline.airport_row(world.airport(iata)) for iata in world.iata_codes)
+    flights.extend(world.flight_rows())
+    aircraft.extend(pipeline.aircraft_row(world.aircraft(reg)) for reg in world.registrations())
+    results = [loader.close() for loader in loaders]
+
+    # Flights bypassed the incremental hooks, so rebuild once at the end
+    cursor = conn.cursor()
+    for name, rebuild in [("rollups", rollups.rebuild), ("airport_delays", delay_stats.rebuild)]:
+        started = time.perf_counter()
+        rebuild(cursor)
+        conn.commit()
+        results.append(LoadStats(name, seconds=time.perf_counter() - started))
+    cursor.close()
+    return {"stats": results, "api_calls": {}, "api_calls_total": 0, "throttled": 0}
+
+
+# ============================================================
+# QUERIES
+# ============================================================
+
+def percentile(timings: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``timings``."""
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def mysql_runner(conn) -> Callable[[str, tuple], object]:
+    """Run a query on ``conn`` and fetch every row."""
+    def run(sql: str, params: tuple):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    return run
+
+
+def time_catalog(run: Callable[[str, tuple], object], scopes: Dict[str, FlightScope], repeat: int,
+                 backend: str = "mysql", rollups: bool = True) -> List[Dict[str, object]]:
+    """Run every catalog query ``repeat`` times per scope and summarise latency."""
+    results = []
+    for name, query in CATALOG.items():
+        fragments = LISTING_PAGE if "limit" in query.fragments else {}
+        for label, scope in scopes.items():
+            sql, params = build(name, scope, rollups, **fragments)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                run(sql, params)
+                timings.append(time.perf_counter() - started)
+            results.append({
+                "query": name,
+                "scope": label,
+                "backend": backend,
+                "p50_ms": percentile(timings, 50) * 1000,
+                "p95_ms": percentile(timings, 95) * 1000,
+                "mean_ms": statistics.fmean(timings) * 1000,
+            })
+    return results
+
+
+def sample_scope(world: SyntheticWorld) -> FlightScope:
+    """One day, one airport: the busiest filter combination the dashboard offers."""
+    day = (world.end - timedelta(days=1)).date()
+    return FlightScope(start=day, end=day, airport=world.iata_codes[0])
+
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def print_report(world: SyntheticWorld, ingestion: Dict[str, object],
+                 latencies: List[Dict[str, object]]) -> None:
+    print(f"World: {len(world.iata_codes)} airports, ~{world.n_flights:,} flights, "
+          f"{world.n_aircraft:,} aircraft, {world.start:%Y-%m-%d} to {world.end:%Y-%m-%d}")
+
+    print("\nIngestion")
+    for stats in ingestion["stats"]:
+        print(f"  {stats}")
+    if ingestion["api_calls_total"]:
+        print(f"  API calls: {ingestion['api_calls_total']} "
+              f"({', '.join(f'{k}={v}' for k, v in sorted(ingestion['api_calls'].items()))}), "
+              f"throttled: {ingestion['throttled']}")
+
+    print("\nCatalog queries")
+    print(f"  {'query':16s} {'scope':9s} {'backend':8s} {'p50 ms':>9s} {'p95 ms':>9s}")
+    for row in latencies:
+        print(f"  {row['query']:16s} {row['scope']:9s} {row['backend']:8s} "
+              f"{row['p50_ms']:9.1f} {row['p95_ms']:9.1f}")
+
+
+def as_json(world: SyntheticWorld, ingestion: Dict[str, object],
+            latencies: List[Dict[str, object]]) -> str:
+    return json.dumps({
+        "world": {
+            "airports": len(world.iata_codes),
+            "flights": world.n_flights,
+            "aircraft": world.n_aircraft,
+        },
+        "ingestion": [
+            {"table": s.table, "rows": s.rows, "seconds": s.seconds, "rows_per_sec": s.rows_per_sec}
+            for s in ingestion["stats"]
+        ],
+        "api_calls": ingestion["api_calls"],
+        "api_calls_total": ingestion["api_calls_total"],
+        "throttled": ingestion["throttled"],
+        "queries": latencies,
+    }, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--airports", type=int, default=15)
+    parser.add_argument("--flights", type=int, default=10_000)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=50, help="mock API requests/sec")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock API seconds per response")
+    parser.add_argument("--direct", action="store_true", help="skip the API and bulk-load rows")
+    parser.add_argument("--infile", action="store_true", help="use LOAD DATA LOCAL INFILE with --direct")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per catalog query")
+    parser.add_argument("--database", default="air_tracker_bench")
+    parser.add_argument("--backends", default="mysql", help="comma-separated: mysql,duckdb")
+    parser.add_argument("--parquet-dir", default="parquet_bench", help="Parquet export for duckdb")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    world = SyntheticWorld(airports=args.airports, flights=args.flights, days=args.days, seed=args.seed)
+    conn = bench_connection(args.database, infile=args.infile)
+    try:
+        if args.direct:
+            ingestion = ingest_direct(world, conn, infile=args.infile)
+        else:
+            ingestion = ingest_via_api(world, conn, args.rate, args.burst, args.latency)
+        scopes = {"all": FlightScope(), "filtered": sample_scope(world)}
+        backends = args.backends.split(",")
+        latencies = []
+        if "mysql" in backends:
+            latencies += time_catalog(mysql_runner(conn), scopes, args.repeat)
+        if "duckdb" in backends:
+            ingestion["stats"] += parquet_store.export(conn, args.parquet_dir, full=True)
+            duckdb = DuckDBBackend(args.parquet_dir)
+            latencies += time_catalog(duckdb.run, scopes, args.repeat, "duckdb", rollups=False)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(as_json(world, ingestion, latencies))
+    else:
+        print_report(world, ingestion, latencies)
+
+
+if __name__ == "__main__":
+    main()
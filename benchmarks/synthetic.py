@@ -0,0 +1,298 @@
+"""
+Synthetic AeroDataBox data at configurable scale.
+
+``SyntheticWorld`` describes a network of airports, a fleet of aircraft
+and a schedule of flights, and renders them as the payloads of the
+endpoints ``aerodatabox.py`` calls. Everything is derived from a seed:
+the departures of one airport in one hour are generated from
+``(seed, airport, hour)`` alone, so overlapping time windows return the
+same flights and a world of 1e8 flights never has to be held in memory.
+
+The same world can also be written straight to MySQL as rows
+(:meth:`SyntheticWorld.flight_rows`) when the API path would be too slow
+for the scale being benchmarked.
+
+Example:
+    >>> world = SyntheticWorld(airports=15, flights=10_000, days=2)
+    >>> world.departures("DEL", world.start, world.start + timedelta(hours=12))["departures"][0]
+"""
+
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from flight_parser import flight_row
+
+# The airports tracked by the notebook come first, so small worlds look
+# like the real deployment
+TRACKED_IATA = [
+    "DEL", "BOM", "BLR", "MAA", "CCU", "HYD", "COK", "AMD",
+    "DXB", "LHR", "SIN", "JFK", "CDG", "FRA", "HND",
+]
+
+# (country, continent, time zone, latitude, longitude)
+COUNTRIES = [
+    ("India", "Asia", "Asia/Kolkata", 22.0, 79.0),
+    ("United Arab Emirates", "Asia", "Asia/Dubai", 25.2, 55.3),
+    ("United Kingdom", "Europe", "Europe/London", 51.5, -0.1),
+    ("Singapore", "Asia", "Asia/Singapore", 1.35, 103.9),
+    ("United States", "North America", "America/New_York", 40.6, -73.8),
+    ("France", "Europe", "Europe/Paris", 49.0, 2.5),
+    ("Germany", "Europe", "Europe/Berlin", 50.0, 8.6),
+    ("Japan", "Asia", "Asia/Tokyo", 35.5, 139.8),
+    ("Brazil", "South America", "America/Sao_Paulo", -23.4, -46.5),
+    ("Australia", "Oceania", "Australia/Sydney", -33.9, 151.2),
+    ("South Africa", "Africa", "Africa/Johannesburg", -26.1, 28.2),
+]
+_TRACKED_COUNTRY = [0] * 8 + [1, 2, 3, 4, 5, 6, 7]
+
+AIRLINES = ["AI", "6E", "UK", "SG", "EK", "BA", "SQ", "AA", "AF", "LH", "NH", "QF"]
+MODELS = [
+    ("Airbus A320", "A320", "A320"), ("Airbus A321", "A321", "A321"),
+    ("Boeing 737-800", "Boeing 737", "B738"), ("Boeing 787-9", "Boeing 787", "B789"),
+    ("Airbus A350-900", "A350", "A359"), ("ATR 72-600", "ATR 72", "AT76"),
+    ("Boeing 777-300ER", "Boeing 777", "B77W"), ("Embraer E190", "E-Jet", "E190"),
+]
+# Status mix of departures (weights roughly match a normal day)
+STATUSES = [
+    ("Departed", 40), ("Arrived", 25), ("Expected", 15), ("On Time", 8),
+    ("Delayed", 9), ("Cancelled", 3),
+]
+
+_API_UTC = "%Y-%m-%d %H:%MZ"
+
+
+def _base36(value: int, width: int) -> str:
+    digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    text = ""
+    while value:
+        value, rest = divmod(value, 36)
+        text = digits[rest] + text
+    return text.rjust(width, "0")
+
+
+def _local(utc_value: datetime, zone: ZoneInfo) -> str:
+    """Format a naive UTC datetime the way the API writes local times."""
+    local = utc_value.replace(tzinfo=timezone.utc).astimezone(zone)
+    offset = local.strftime("%z")
+    return local.strftime("%Y-%m-%d %H:%M") + f"{offset[:3]}:{offset[3:]}"
+
+
+class SyntheticWorld:
+    """
+    A deterministic synthetic flight network.
+
+    Args:
+        airports (int, optional): Number of airports (15 up to thousands)
+        flights (int, optional): Total departures over the whole period
+        days (float, optional): Length of the period, ending at ``end``
+        aircraft (int, optional): Fleet size; defaults to one airframe per
+            ~200 flights (at least 50)
+        seed (int, optional): Seed for every generated value
+        end (datetime, optional): End of the period (naive UTC)
+    """
+
+    def __init__(
+        self,
+        airports: int = 15,
+        flights: int = 10_000,
+        days: float = 7,
+        aircraft: Optional[int] = None,
+        seed: int = 0,
+        end: datetime = datetime(2026, 1, 8),
+    ):
+        self.seed = seed
+        self.end = end
+        self.start = end - timedelta(days=days)
+        self.hours = max(1, int(days * 24))
+        self.n_flights = flights
+        self.iata_codes = self._airport_codes(airports)
+        self.n_aircraft = aircraft or max(50, flights // 200)
+        # Departures per airport per hour
+        self.rate = flights / (len(self.iata_codes) * self.hours)
+
+        self._index = {iata: i for i, iata in enumerate(self.iata_codes)}
+        self._country = [self._country_of(i) for i in range(len(self.iata_codes))]
+        self._zones = {}
+
+    # ============================================================
+    # NETWORK
+    # ============================================================
+
+    @staticmethod
+    def _airport_codes(n: int) -> List[str]:
+        codes = TRACKED_IATA[:n]
+        extra = 0
+        while len(codes) < n:
+            code = "Z" + _base36(extra, 2)
+            extra += 1
+            if code not in codes:
+                codes.append(code)
+        return codes
+
+    def _country_of(self, index: int) -> int:
+        if index < len(_TRACKED_COUNTRY):
+            return _TRACKED_COUNTRY[index]
+        return index % len(COUNTRIES)
+
+    def _zone(self, iata: str) -> ZoneInfo:
+        if iata not in self._zones:
+            self._zones[iata] = ZoneInfo(COUNTRIES[self._country[self._index[iata]]][2])
+        return self._zones[iata]
+
+    def registration(self, index: int) -> str:
+        return "SY-" + _base36(index, 5)
+
+    def registrations(self) -> Iterator[str]:
+        return (self.registration(i) for i in range(self.n_aircraft))
+
+    def _rng(self, *parts) -> random.Random:
+        key = "|".join(str(part) for part in (self.seed,) + parts)
+        return random.Random(int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big"))
+
+    # ============================================================
+    # PAYLOADS
+    # ============================================================
+
+    def airport(self, iata: str) -> Optional[dict]:
+        """``/airports/iata/{iata}`` payload, or None for unknown codes."""
+        if iata not in self._index:
+            return None
+        index = self._index[iata]
+        country, continent, zone, lat, lon = COUNTRIES[self._country[index]]
+        rng = self._rng("airport", iata)
+        return {
+            "icao": "Y" + iata,
+            "iata": iata,
+            "fullName": f"{iata} Synthetic International",
+            "municipalityName": f"{country} City {index}",
+            "country": {"name": country},
+            "continent": {"name": continent},
+            "location": {"lat": round(lat + rng.uniform(-5, 5), 4), "lon": round(lon + rng.uniform(-5, 5), 4)},
+            "timeZone": zone,
+        }
+
+    def aircraft(self, registration: str) -> Optional[dict]:
+        """``/aircrafts/reg/{reg}`` payload, or None for unknown registrations."""
+        if not registration.startswith("SY-"):
+            return None
+        index = int(registration[3:], 36)
+        if index >= self.n_aircraft:
+            return None
+        model, line, icao = MODELS[index % len(MODELS)]
+        return {
+            "reg": registration,
+            "model": model,
+            "productionLine": line,
+            "icaoCode": icao,
+            "airlineName": f"Airline {AIRLINES[index % len(AIRLINES)]}",
+        }
+
+    def _hour_departures(self, iata: str, hour: int) -> List[dict]:
+        """Departures of ``iata`` in hour ``hour`` of the period."""
+        rng = self._rng("flights", iata, hour)
+        count = int(self.rate) + (rng.random() < self.rate - int(self.rate))
+        if not count:
+            return []
+        origin_zone = self._zone(iata)
+        hour_start = self.start + timedelta(hours=hour)
+        statuses, weights = zip(*STATUSES)
+        flights = []
+        for _ in range(count):
+            destination = self.iata_codes[rng.randrange(len(self.iata_codes))]
+            if destination == iata:
+                destination = self.iata_codes[(self._index[iata] + 1) % len(self.iata_codes)]
+            scheduled = hour_start + timedelta(minutes=rng.randrange(60))
+            status = rng.choices(statuses, weights)[0]
+            movement = {
+                "airport": {"iata": destination},
+                "scheduledTime": {"utc": scheduled.strftime(_API_UTC), "local": _local(scheduled, origin_zone)},
+            }
+            if status != "Cancelled" and rng.random() < 0.7:
+                late = rng.randrange(45, 240) if status == "Delayed" else rng.randrange(-5, 20)
+                revised = scheduled + timedelta(minutes=late)
+                movement["revisedTime"] = {"utc": revised.strftime(_API_UTC), "local": _local(revised, origin_zone)}
+            airline = AIRLINES[rng.randrange(len(AIRLINES))]
+            flights.append({
+                "number": f"{airline} {rng.randrange(1, 9999)}",
+                "movement": movement,
+                "aircraft": {"reg": self.registration(rng.randrange(self.n_aircraft))},
+                "status": status,
+                "airline": {"iata": airline},
+            })
+        return flights
+
+    def _hours(self, start_utc: datetime, end_utc: datetime) -> range:
+        first = max(0, int((start_utc - self.start).total_seconds() // 3600))
+        last = min(self.hours, int(-(-(end_utc - self.start).total_seconds() // 3600)))
+        return range(first, last)
+
+    def departures(self, iata: str, start_utc: datetime, end_utc: datetime) -> Optional[dict]:
+        """
+        Departures of ``iata`` scheduled in ``[start_utc, end_utc)``, shaped
+        like the ``/flights/airports/iata/{iata}/{from}/{to}`` payload.
+        Returns None for unknown airports.
+        """
+        if iata not in self._index:
+            return None
+        departures = []
+        for hour in self._hours(start_utc, end_utc):
+            for flight in self._hour_departures(iata, hour):
+                scheduled = datetime.strptime(flight["movement"]["scheduledTime"]["utc"], _API_UTC)
+                if start_utc <= scheduled < end_utc:
+                    departures.append(flight)
+        return {"departures": departures}
+
+    def departures_local(self, iata: str, from_local: str, to_local: str) -> Optional[dict]:
+        """:meth:`departures` for a window given in airport-local API format."""
+        if iata not in self._index:
+            return None
+        zone = self._zone(iata)
+
+        def to_utc(value: str) -> datetime:
+            local = datetime.strptime(value, "%Y-%m-%dT%H:%M").replace(tzinfo=zone)
+            return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+        return self.departures(iata, to_utc(from_local), to_utc(to_local))
+
+    def delays(self, iata: str) -> Optional[dict]:
+        """``/airports/iata/{iata}/delays`` payload for the last day of the period."""
+        if iata not in self._index:
+            return None
+        rng = self._rng("delays", iata)
+
+        def side() -> dict:
+            total = max(1, int(self.rate * 24))
+            delayed = int(total * rng.uniform(0.05, 0.3))
+            median = rng.randrange(5, 60)
+            return {
+                "numTotal": total,
+                "numQualifiedTotal": delayed,
+                "numCancelled": int(total * rng.uniform(0, 0.05)),
+                "medianDelay": f"00:{median:02d}:00",
+                "delayIndex": round(rng.uniform(0, 5), 2),
+            }
+
+        day_start = self.end - timedelta(days=1)
+        return {
+            "from": {"utc": day_start.strftime(_API_UTC)},
+            "to": {"utc": self.end.strftime(_API_UTC)},
+            "departuresDelayInformation": side(),
+            "arrivalsDelayInformation": side(),
+        }
+
+    # ============================================================
+    # DIRECT ROWS
+    # ============================================================
+
+    def flight_rows(self) -> Iterator[Tuple]:
+        """
+        Every flight of the world as ``flights`` rows, airport by airport and
+        hour by hour, without going through the API.
+        """
+        for iata in self.iata_codes:
+            for hour in range(self.hours):
+                for flight in self._hour_departures(iata, hour):
+                    yield flight_row(iata, flight)
@@ -0,0 +1,269 @@
+"""
+Air Tracker Bulk Loader
+
+Batched write path for the flights, airport, aircraft and airport_delays
+tables. Rows are buffered and sent with ``executemany`` (which
+mysql-connector rewrites into a single multi-row ``INSERT ... VALUES``),
+commits happen every ``commit_every`` rows rather than per row, and large
+backfills can switch to ``LOAD DATA LOCAL INFILE``.
+"""
+
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+import config
+import metrics
+
+
+@dataclass
+class LoadStats:
+    """Summary of one bulk load."""
+
+    table: str
+    rows: int = 0
+    batches: int = 0
+    commits: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.table}: {self.rows} rows in {self.seconds:.2f}s "
+            f"({self.rows_per_sec:,.0f} rows/s, {self.batches} batches, "
+            f"{self.commits} commits)"
+        )
+
+
+class BulkLoader:
+    """
+    Buffer rows and write them to one table in batches.
+
+    Args:
+        conn: MySQL connection (needs ``allow_local_infile=True`` for
+            ``mode="infile"``)
+        table (str): Target table
+        columns (Sequence[str]): Column names, in row tuple order
+        batch_size (int, optional): Rows per ``executemany`` call
+        commit_every (int, optional): Rows between commits
+        ignore (bool, optional): Skip rows that hit a unique key
+            (``INSERT IGNORE`` / ``LOAD DATA ... IGNORE``)
+        update_columns (Sequence[str], optional): Columns to overwrite on
+            a duplicate key (``ON DUPLICATE KEY UPDATE``). In infile mode
+            this becomes ``REPLACE``, which re-creates the whole row
+        mode (str, optional): ``"insert"`` or ``"infile"``
+        on_flush (Callable, optional): ``on_flush(cursor, rows)`` called
+            before each batch is written, on the loader's cursor and thus
+            in the same transaction (used to maintain rollup tables)
+        on_commit (Callable, optional): ``on_commit(cursor)`` called just
+            before each commit that includes written rows (used to bump
+            the data version)
+
+    Example:
+        >>> with BulkLoader(conn, "aircraft", ["registration", "model"], ignore=True) as loader:
+        ...     loader.extend(rows)
+        >>> print(loader.stats)
+    """
+
+    def __init__(
+        self,
+        conn,
+        table: str,
+        columns: Sequence[str],
+        batch_size: int = config.DB_BATCH_SIZE,
+        commit_every: int = config.DB_COMMIT_EVERY,
+        ignore: bool = False,
+        update_columns: Optional[Sequence[str]] = None,
+        mode: str = "insert",
+        on_flush: Optional[Callable[[Any, List[Sequence[Any]]], Any]] = None,
+        on_commit: Optional[Callable[[Any], Any]] = None,
+    ):
+        if mode not in ("insert", "infile"):
+            raise ValueError(f"Unknown bulk load mode: {mode}")
+        self.conn = conn
+        self.table = table
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.commit_every = max(commit_every, batch_size)
+        self.ignore = ignore
+        self.update_columns = list(update_columns or [])
+        self.mode = mode
+        self.on_flush = on_flush
+        self.on_commit = on_commit
+        self.stats = LoadStats(table)
+        self._buffer: List[Sequence[Any]] = []
+        self._uncommitted = 0
+        self._cursor = conn.cursor()
+        self._started = time.perf_counter()
+        self._sql = self._insert_sql()
+
+    # ============================================================
+    # SQL
+    # ============================================================
+
+    def _insert_sql(self) -> str:
+        column_list = ", ".join(self.columns)
+        placeholders = ", ".join(["%s"] * len(self.columns))
+        verb = "INSERT IGNORE" if self.ignore else "INSERT"
+        sql = f"{verb} INTO {self.table} ({column_list}) VALUES ({placeholders})"
+        if self.update_columns:
+            assignments = ", ".join(f"{col} = VALUES({col})" for col in self.update_columns)
+            sql += f" ON DUPLICATE KEY UPDATE {assignments}"
+        return sql
+
+    def _infile_sql(self) -> str:
+        if self.update_columns:
+            duplicates = "REPLACE"
+        elif self.ignore:
+            duplicates = "IGNORE"
+        else:
+            duplicates = ""
+        return (
+            f"LOAD DATA LOCAL INFILE %s {duplicates} INTO TABLE {self.table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' "
+            f"({', '.join(self.columns)})"
+        )
+
+    # ============================================================
+    # WRITING
+    # ============================================================
+
+    def add(self, row: Sequence[Any]) -> None:
+        """Queue one row, flushing when the batch is full."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Queue many rows."""
+        for row in rows:
+            self.add(row)
+
+    def flush(self) -> None:
+        """Write buffered rows, committing once ``commit_every`` is reached."""
+        if not self._buffer:
+            return
+
+        with metrics.timer("db_flush_seconds", table=self.table):
+            if self.on_flush is not None:
+                with metrics.timer("db_hook_seconds", table=self.table):
+                    self.on_flush(self._cursor, self._buffer)
+
+            if self.mode == "infile":
+                self._load_infile(self._buffer)
+            else:
+                self._cursor.executemany(self._sql, self._buffer)
+
+        metrics.inc("db_rows_total", len(self._buffer), table=self.table)
+        self.stats.rows += len(self._buffer)
+        self.stats.batches += 1
+        self._uncommitted += len(self._buffer)
+        self._buffer = []
+
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self, force: bool = False) -> None:
+        """
+        Commit written rows.
+
+        Args:
+            force (bool, optional): Commit even if no rows are pending, e.g.
+                to commit other statements run on the same connection
+        """
+        if self._uncommitted or force:
+            if self.on_commit is not None and self._uncommitted:
+                self.on_commit(self._cursor)
+            with metrics.timer("db_commit_seconds", table=self.table):
+                self.conn.commit()
+            self.stats.commits += 1
+            self._uncommitted = 0
+
+    def rollback(self) -> None:
+        """Discard buffered and uncommitted rows, rolling back the transaction."""
+        self.conn.rollback()
+        self.stats.rows -= self._uncommitted
+        self._uncommitted = 0
+        self._buffer = []
+
+    def close(self) -> LoadStats:
+        """
+        Flush and commit everything still pending.
+
+        Returns:
+            LoadStats: Totals and throughput for this loader
+        """
+        self.flush()
+        self.commit()
+        self._cursor.close()
+        self.stats.seconds = time.perf_counter() - self._started
+        metrics.set_gauge("load_rows_per_second", self.stats.rows_per_sec, table=self.table)
+        return self.stats
+
+    def __enter__(self) -> "BulkLoader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+            print("Loaded", self.stats)
+        else:
+            self.conn.rollback()
+            self._cursor.close()
+
+    # ============================================================
+    # LOAD DATA LOCAL INFILE
+    # ============================================================
+
+    @staticmethod
+    def _infile_value(value: Any) -> str:
+        if value is None:
+            return "\\N"
+        if isinstance(value, datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+        if isinstance(value, date):
+            return value.isoformat()
+        return (
+            str(value)
+            .replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    def _load_infile(self, rows: List[Sequence[Any]]) -> None:
+        handle, path = tempfile.mkstemp(prefix=f"{self.table}_", suffix=".tsv")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8", newline="") as f:
+                for row in rows:
+                    f.write("\t".join(self._infile_value(v) for v in row) + "\n")
+            self._cursor.execute(self._infile_sql(), (path,))
+        finally:
+            os.remove(path)
+
+
+def bulk_load(conn, table: str, columns: Sequence[str], rows: Iterable[Sequence[Any]], **kwargs) -> LoadStats:
+    """
+    Load ``rows`` into ``table`` with a :class:`BulkLoader` and report throughput.
+
+    Args:
+        conn: MySQL connection
+        table (str): Target table
+        columns (Sequence[str]): Column names, in row tuple order
+        rows (Iterable): Row tuples
+        **kwargs: Passed to :class:`BulkLoader`
+
+    Returns:
+        LoadStats: Totals and throughput for the load
+    """
+    with BulkLoader(conn, table, columns, **kwargs) as loader:
+        loader.extend(rows)
+    return loader.stats
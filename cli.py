@@ -0,0 +1,172 @@
+"""
+Air Tracker Command Line
+
+Entry point for scheduled runs, installed as ``air-tracker`` by
+``pip install .`` (see pyproject.toml):
+
+    air-tracker ingest [--airports DEL,BOM] [--processes N] [--full]   # fetch and load new data
+    air-tracker backfill                                              # convert local timestamps to UTC
+    air-tracker migrate [--status]                                    # create the database, apply migrations
+    air-tracker archive [--status]                                    # add partitions, archive old months
+    air-tracker bench [suite options]                                 # benchmarks/suite.py
+
+Only argparse and config are imported up front: every command imports
+what it needs when it runs, and nothing connects to MySQL or runs DDL
+before a command asks for it. pandas and numpy load on the first flight
+batch (``delay_stats.py``), streamlit only in the dashboard, so a cron
+run with nothing to fetch starts in a fraction of a second.
+"""
+
+import argparse
+import sys
+from typing import List, Optional
+
+import config
+
+
+def connect(database: bool = True):
+    """Open a MySQL connection from ``config.DB_CONFIG``, optionally without selecting the database."""
+    import mysql.connector
+
+    settings = dict(config.DB_CONFIG)
+    if not database:
+        settings.pop("database")
+    return mysql.connector.connect(**settings)
+
+
+# ============================================================
+# COMMANDS
+# ============================================================
+
+
+def ingest(args: argparse.Namespace) -> int:
+    import metrics
+    import shards
+
+    airports = [code.strip().upper() for code in args.airports.split(",") if code.strip()] \
+        if args.airports else shards.tracked_airports()
+    metrics.serve()
+    if shards.process_count(args.processes) > 1:
+        if args.full:
+            raise SystemExit("--full is only supported with --processes 1")
+        shards.run(airports, args.processes)
+        return 0
+
+    import pipeline
+    from aerodatabox import AeroDataBoxClient
+    from response_cache import ResponseCache
+
+    client = AeroDataBoxClient(cache=ResponseCache())
+    conn = connect()
+    try:
+        pipeline.run(client, conn, airports, incremental=not args.full)
+    finally:
+        conn.close()
+    return 0
+
+
+def backfill(args: argparse.Namespace) -> int:
+    import timezones
+
+    conn = connect()
+    try:
+        timezones.backfill(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+def migrate(args: argparse.Namespace) -> int:
+    import migrations
+
+    if not args.status:
+        server = connect(database=False)
+        server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS `{config.DB_CONFIG['database']}`")
+        server.close()
+    conn = connect()
+    try:
+        if args.status:
+            done = migrations.applied_versions(conn.cursor(buffered=True))
+            for version, name, _ in migrations.MIGRATIONS:
+                state = "applied" if version in done else "pending"
+                print(f"{version:03d} {name}: {state}")
+        else:
+            versions = migrations.migrate(conn)
+            print("Applied:", versions or "nothing, schema is up to date")
+    finally:
+        conn.close()
+    return 0
+
+
+def archive(args: argparse.Namespace) -> int:
+    import partitions
+
+    conn = connect()
+    try:
+        if args.status:
+            cursor = conn.cursor(buffered=True)
+            for partition, less_than in partitions.flight_partitions(cursor):
+                print(f"{partition}: < {less_than or 'MAXVALUE'}")
+            print("Archived until:", partitions.archived_until(cursor) or "nothing archived")
+        else:
+            partitions.maintain(conn)
+    finally:
+        conn.close()
+    return 0
+
+
+def bench(args: argparse.Namespace) -> int:
+    from benchmarks import suite
+
+    suite.main(args.options)
+    return 0
+
+
+# ============================================================
+# ENTRY POINT
+# ============================================================
+
+
+def parser() -> argparse.ArgumentParser:
+    root = argparse.ArgumentParser(prog="air-tracker", description=__doc__.splitlines()[1])
+    commands = root.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("ingest", help="fetch airports, flights and aircraft into MySQL")
+    command.add_argument("--airports", help="comma-separated IATA codes "
+                                            "(default: AIR_TRACKER_AIRPORTS_FILE or AIR_TRACKER_AIRPORTS)")
+    command.add_argument("--full", action="store_true",
+                         help="fetch each airport's default window instead of resuming from its watermark")
+    command.add_argument("--processes", type=int, default=config.INGEST_PROCESSES,
+                         help="worker processes to shard the airports across, 0 = one per core "
+                              "(default: AIR_TRACKER_INGEST_PROCESSES)")
+    command.set_defaults(handler=ingest)
+
+    command = commands.add_parser("backfill", help="convert local flight timestamps to UTC")
+    command.set_defaults(handler=backfill)
+
+    command = commands.add_parser("migrate", help="create the database and apply pending migrations")
+    command.add_argument("--status", action="store_true", help="list migrations without applying them")
+    command.set_defaults(handler=migrate)
+
+    command = commands.add_parser("archive", help="add future flight partitions and archive old months to Parquet")
+    command.add_argument("--status", action="store_true", help="list partitions and archived months")
+    command.set_defaults(handler=archive)
+
+    # Everything after "bench" is left for the suite's own parser
+    command = commands.add_parser("bench", help="run the benchmark suite (options as benchmarks/suite.py)",
+                                  add_help=False)
+    command.set_defaults(handler=bench)
+    return root
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    root = parser()
+    args, options = root.parse_known_args(argv)
+    if options and args.handler is not bench:
+        root.error(f"unrecognized arguments: {' '.join(options)}")
+    args.options = options
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
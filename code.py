@@ -11,448 +11,134 @@ import time
 
 
 # %%
-API_HOST = "aerodatabox.p.rapidapi.com"
-API_KEY = "71ff288c8emshc86261cd5e028edp170804jsnb6a70ef0a394"
+from config import API_HOST, API_KEY
+from aerodatabox import AeroDataBoxClient
+from response_cache import ResponseCache
 
 HEADERS = {
     "x-rapidapi-key": API_KEY,
     "x-rapidapi-host": API_HOST
 }
 
+# Shared client: keeps several requests in flight under one token-bucket
+# limiter sized to the RapidAPI quota (see config.py). Airport and aircraft
+# records are served from the on-disk cache for days, flights and delays
+# for minutes, so re-runs only spend quota on data that changes.
+client = AeroDataBoxClient(cache=ResponseCache())
 
-# %%
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="12345678",
-    database="air_tracker",
-)
-
-cursor = conn.cursor(buffered=True)
-
-
-
-# %%
-cursor.execute("CREATE DATABASE IF NOT EXISTS air_tracker")
 
 # %%
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS airport (
-    airport_id INT AUTO_INCREMENT PRIMARY KEY,
-    icao_code VARCHAR(4) UNIQUE,
-    iata_code VARCHAR(3) UNIQUE,
-    name VARCHAR(150),
-    city VARCHAR(100),
-    country VARCHAR(100),
-    continent VARCHAR(50),
-    latitude DOUBLE,
-    longitude DOUBLE,
-    timezone VARCHAR(50)
-)
-""")
+from config import DB_CONFIG
 
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS aircraft (
-    aircraft_id INT AUTO_INCREMENT PRIMARY KEY,
-    registration VARCHAR(10) UNIQUE,
-    model VARCHAR(50),
-    manufacturer VARCHAR(50),
-    icao_type_code VARCHAR(10),
-    owner VARCHAR(100)
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS flights (
-    flight_id VARCHAR(50) PRIMARY KEY,
-    flight_number VARCHAR(20),
-    aircraft_registration VARCHAR(300),
-    origin_iata VARCHAR(7),
-    destination_iata VARCHAR(7),
-    scheduled_departure DATETIME,
-    actual_departure DATETIME,
-    scheduled_arrival DATETIME,
-    actual_arrival DATETIME,
-    status VARCHAR(20),
-    airline_code VARCHAR(50)
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS airport_delays (
-    delay_id INT AUTO_INCREMENT PRIMARY KEY,
-    airport_iata VARCHAR(5),
-    delay_date DATE,
-    total_flights INT,
-    delayed_flights INT,
-    avg_delay_min INT,
-    median_delay_min INT,
-    canceled_flights INT
-)
-""")
-
-conn.commit()
-
-
-# %%
-import requests
+conn = mysql.connector.connect(**DB_CONFIG)
 
-iata_AIRPORTS = ["DEL","BOM","BLR","HYD","MAA","CCU","COK","DXB","LHR","JFK","SIN","CDG","HND","FRA","SYD"]
-airport_data_list = []
-def ferch_airport(iata):
-    url = f"https://aerodatabox.p.rapidapi.com/airports/iata/{iata}"
-    response = requests.get(url, headers = HEADERS)
-    return response.json()
+cursor = conn.cursor(buffered=True)
 
-for iata in iata_AIRPORTS:
-    airport_data = ferch_airport(iata)
-    airport_data_list.append(airport_data)
-    time.sleep(1)  # To avoid hitting the API rate limit
 
 
 # %%
-airport_data_list[0]
+cursor.execute("CREATE DATABASE IF NOT EXISTS air_tracker")
 
 # %%
-import time
-
-for airport in airport_data_list:
-
-    data = (
-        airport.get("icao"),
-        airport.get("iata"),
-        airport.get("fullName"),
-        airport.get("municipalityName"),
-        airport.get("country" ,{}).get("name"),
-        airport.get("continent",{}).get("name"),
-        airport.get("location", {}).get("lat"),
-        airport.get("location", {}).get("lon"),
-        airport.get("timeZone")
-    )
-
-    cursor.execute(
-        """
-        INSERT INTO airport
-        (icao_code, iata_code, name, city, country, continent, latitude, longitude, timezone)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            name = VALUES(name),
-            city = VALUES(city),
-            country = VALUES(country),
-            continent = VALUES(continent),
-            latitude = VALUES(latitude),
-            longitude = VALUES(longitude),
-            timezone = VALUES(timezone)
-        """,
-        data
-    )
-
-    conn.commit()
-    time.sleep(1)
+# Tables, join key types and dashboard indexes are versioned in migrations.py
+from migrations import migrate
 
+migrate(conn)
 
-# %%
-for iata in airport_data_list:
-    response_data = (iata["iata"])
-    print(response_data)
 
 # %%
-import uuid
-from datetime import datetime
-import requests
-
-def parse_dt(value):
-    if not value:
-        return None
-    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+import pipeline
+from shards import tracked_airports
 
-def fetch_flights(iata):
-    url = f"https://{API_HOST}/flights/airports/iata/{iata}"
-    response = requests.get(url, headers=HEADERS, timeout=10)
-    response.raise_for_status()
-    return response.json()
+# Tracked airports come from configuration: AIR_TRACKER_AIRPORTS_FILE (one
+# IATA code per line) or AIR_TRACKER_AIRPORTS, the 15 below by default.
+# For hundreds of airports use `air-tracker ingest --processes N` (shards.py)
+iata_AIRPORTS = tracked_airports()
 
-iata = ["DEL","BOM","BLR","HYD","MAA","CCU","COK","DXB","LHR","JFK","SIN","CDG","HND","FRA","SYD"]
-all_flights = []
-
-for airport in airport_data_list:
-    iata = airport.get("iata")
-    if not iata:
-        continue
-
-    response_data = fetch_flights(origin_iata)
-
-    for flight in response_data.get("departures", []):
-
-        aircraft = flight.get("aircraft", {})
-        if not aircraft.get("reg"):
-            continue
-
-        # store flight with its origin airport
-        all_flights.append({
-            "origin_iata": iata,
-            "flight": flight
-        })
+# Each step streams fetch -> parse -> write through bounded queues, so rows
+# are committed while later airports are still being fetched and nothing
+# accumulates in memory.
+airport_stats = pipeline.ingest_airports(client, conn, iata_AIRPORTS)
 
 
 # %%
-all_flights
-
-# %%
-import uuid
-
-insert_sql = """
-    INSERT INTO flights
-    (flight_id, flight_number, aircraft_registration,
-     origin_iata, destination_iata,
-     scheduled_departure, actual_departure,
-     scheduled_arrival, actual_arrival,
-     status, airline_code)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-"""
-
-for t in all_flights:
-    flight = t["flight"]
-    origin_iata = t["origin_iata"]
-    destination_iata = flight.get("movement",{}).get("airport", {}).get("iata")
-    flight_id = str(uuid.uuid4())
-    flight_number = flight.get("number")
-    aircraft_registration = flight.get("aircraft", {}).get("reg")
-    scheduled_departure = parse_dt(
-        flight.get("movement", {})
-              .get("scheduledTime", {})
-              .get("utc")
-    )
-
-    actual_departure = parse_dt(flight.get("movement", {}).get("revisedTime", {}).get("local"))
-    scheduled_arrival = parse_dt(flight.get("movement", {}).get("scheduledTime", {}).get("local"))
-    actual_arrival = parse_dt(flight.get("movement", {}).get("revisedTime", {}).get("utc"))
-    status = flight.get("status")
-    airline_code = flight.get("airline", {}).get("iata")
-
-    data_row = (
-        flight_id,
-        flight_number,
-        aircraft_registration,
-        origin_iata,
-        destination_iata,
-        scheduled_departure,
-        actual_departure,
-        scheduled_arrival,
-        actual_arrival,
-        status,
-        airline_code
-    )
-
-    cursor.execute(insert_sql, data_row)
+iata = iata_AIRPORTS
 
-conn.commit()
+# Only the time windows after each airport's watermark are requested; the
+# watermark advances in the same transaction as the flights it covers.
+# flight_id is a hash of flight number, origin and scheduled departure, so
+# the re-fetched overlap only refreshes status and actual times.
+flight_stats, aircraft_regs = pipeline.ingest_flights_incremental(client, conn, iata)
 
 
 # %%
-for item in all_flights:
-    flight = item.get("flight", {})
-    reg = flight.get("aircraft", {}).get("reg")
-    print(reg)
-
-
-# %%
-import requests
-import time
-
-def fetch_aircraft(reg):
-    url = f"https://aerodatabox.p.rapidapi.com/aircrafts/reg/{reg}"
-    r = requests.get(url, headers=HEADERS, timeout=10)
-
-    if r.status_code == 200:
-        return r.json()
-    else:
-        print("Not found:", reg)
-        return None
-
-aircraft_regs = []
-
-for item in all_flights:
-    flight = item.get("flight", {})
-    reg = flight.get("aircraft", {}).get("reg")
-    if reg:
-        aircraft_regs.append(reg)
-
-
-aircraft_regs = list(aircraft_regs)
-
 print("Total aircraft:", len(aircraft_regs))
 
-
-all_aircraft_data = []
-
-for reg in aircraft_regs:
-    data = fetch_aircraft(reg)
-    if data:
-        all_aircraft_data.append(data)
-        print(data)
-
-    time.sleep(1)   # prevent API blocking
+# Resolve each registration once: registrations already in the aircraft
+# table are skipped, and known 404s come from the cache.
+aircraft_stats = pipeline.ingest_aircraft(client, conn, aircraft_regs)
 
 
 # %%
-all_aircraft_data
-
-# %%
-for fd in all_aircraft_data:
-
-    registration = fd.get("reg") 
-    model = fd.get("model") 
-    manufacturer = fd.get("productionLine") 
-    icao_type_code = fd.get("icaoCode") 
-    owner = fd.get("airlineName") 
-
-    data = (
-        registration,
-        model,
-        manufacturer,
-        icao_type_code,
-        owner
-    )
-
-    cursor.execute("""
-        INSERT IGNORE INTO aircraft
-        (registration, model, manufacturer, icao_type_code, owner)
-        VALUES (%s, %s, %s, %s, %s)
-    """, data)
-
-conn.commit()
+# airport_delays is kept current by the flight loads above (delay_stats.py):
+# real delay minutes per airport and day, upserted, with median and p90
+cursor.execute("""
+SELECT airport_iata, delay_date, total_flights, delayed_flights,
+       avg_delay_min, median_delay_min, p90_delay_min, canceled_flights
+FROM airport_delays
+ORDER BY delay_date DESC, airport_iata
+LIMIT 15
+""")
+for row in cursor.fetchall():
+    print(row)
 
 
 # %%
-iata_list = ["DEL","BOM","BLR","HYD","MAA","CCU","COK","DXB","LHR","JFK","SIN","CDG","HND","FRA","SYD"]
-
-def fetch_airport_delays(iata):
-    url = f"https://aerodatabox.p.rapidapi.com/airports/iata/{iata}/delays"
-    return requests.get(url, headers=HEADERS).json()
+# Parquet copy for the DuckDB dashboard backend; only flight months changed
+# since the last export are rewritten
+from config import PARQUET_EXPORT
+import parquet_store
 
-delay_data = []
-
-for code in iata_list:
-    d = fetch_airport_delays(code)
-
-    delay_data.append({
-        "airport_iata": code,
-        "delay": d
-    })
-
-print("Total airports:", len(delay_data))
+if PARQUET_EXPORT:
+    parquet_stats = parquet_store.export(conn)
 
 
 # %%
-delay_data
-
-# %%
-for item in delay_data:
-
-    airport_iata = item.get("airport_iata")
-    delay = item.get("delay", {})
-
-    # ---------- DATE ----------
-    utc_time = delay.get("from", {}).get("utc")
-    if not utc_time:
-        continue
-
-    delay_date = utc_time[:10]
-
-    # ---------- DELAY INFO ----------
-    dep = delay.get("departuresDelayInformation", {})
-    arr = delay.get("arrivalsDelayInformation", {})
-
-    total_flights = (dep.get("numTotal") or 0) + (arr.get("numTotal") or 0)
-    delayed_flights = (dep.get("numQualifiedTotal") or 0) + (arr.get("numQualifiedTotal") or 0)
-    canceled_flights = (dep.get("numCancelled") or 0) + (arr.get("numCancelled") or 0)
-
-    if total_flights == 0:
-        continue
+# Where the refresh spent its time: API latency and rate-limiter waits,
+# parsing, batch writes and commits (metrics.py). Also written as JSON and
+# Prometheus text if AIR_TRACKER_RUN_SUMMARY / AIR_TRACKER_METRICS_FILE are set
+import metrics
 
-    # ---------- CALCULATIONS ----------
-    delay_ratio = delayed_flights / total_flights
+run_summary = metrics.report([airport_stats, flight_stats, aircraft_stats])
 
-    # Optional: approximate delay minutes if API doesn't give it
-    avg_delay_min = round(delay_ratio * 60, 2)
-    median_delay_min = avg_delay_min
 
-    data = (
-        airport_iata,
-        delay_date,
-        total_flights,
-        delayed_flights,
-        avg_delay_min,
-        median_delay_min,
-        canceled_flights
-    )
-
-    cursor.execute(
-        """
-        INSERT INTO airport_delays
-        (airport_iata, delay_date, total_flights,
-         delayed_flights, avg_delay_min,
-         median_delay_min, canceled_flights)
-        VALUES (%s,%s,%s,%s,%s,%s,%s)
-        """,
-        data
-    )
-
-conn.commit()
+# %%
+# Analytics queries come from the catalog shared with the dashboard (queries.py)
+from queries import FlightScope, build
 
+query1, params1 = build("query1")
 
-# %%
-query1 = """SELECT a.model, COUNT(*) AS flight_count
-FROM flights f
-JOIN aircraft a 
-ON f.aircraft_registration = a.registration
-GROUP BY a.model;
-"""
-
-cursor.execute(query1)
+cursor.execute(query1, params1)
 for q1 in cursor:
     print(q1)
 
 # %%
-query2 =""" 
-SELECT a.registration, a.model, COUNT(*) AS flight_count
-FROM flights f
-JOIN aircraft a ON f.aircraft_registration = a.registration
-GROUP BY a.registration, a.model
-HAVING COUNT(*) > 5;
-
-"""
-cursor.execute(query2)
+query2, params2 = build("query2")
+cursor.execute(query2, params2)
 for q2 in cursor:
     print(q2)
 
 # %%
-query3 = """
-SELECT ap.name, COUNT(*) AS outbound_flights
-FROM flights f
-JOIN airport ap
-ON f.origin_iata = ap.iata_code
-GROUP BY ap.name
-HAVING COUNT(*) > 5;
-"""
-cursor.execute(query3)
+query3, params3 = build("query3")
+cursor.execute(query3, params3)
 results = cursor.fetchall()
 for q3 in results:
     print("Airport:", q3[0], "| Outbound Flights:", q3[1])
 
 # %%
-query4 = """
-SELECT ap.name, ap.city, COUNT(*) AS arrivals
-FROM flights f
-JOIN airport ap
-ON f.destination_iata = ap.iata_code
-GROUP BY ap.name, ap.city
-ORDER BY arrivals DESC
-LIMIT 1;
-"""
-
-cursor.execute(query4)
+query4, params4 = build("query4")
+
+cursor.execute(query4, params4)
 
 results = cursor.fetchall()
 
@@ -465,21 +151,9 @@ for row in results:
 
 
 # %%
-query5 = """
-SELECT 
-    f.flight_number,
-    o.iata_code AS origin,
-    d.iata_code AS destination,
-    CASE
-        WHEN o.country = d.country THEN 'Domestic'
-        ELSE 'International'
-    END AS flight_type
-FROM flights f
-JOIN airport o ON f.origin_iata = o.iata_code
-JOIN airport d ON f.destination_iata = d.iata_code;
-"""
-
-cursor.execute(query5)
+query5, params5 = build("query5")
+
+cursor.execute(query5, params5)
 
 results = cursor.fetchall()
 
@@ -494,22 +168,11 @@ for row in results:
 
 # %%
 
-query6 = """
-SELECT
-    f.flight_number,
-    f.aircraft_registration AS aircraft,
-    ao.name AS departure_airport,
-    COALESCE(f.actual_arrival, f.scheduled_arrival) AS arrival_time
-FROM flights f
-JOIN airport ao
-    ON ao.iata_code = f.origin_iata
-WHERE f.destination_iata = 'DEL'
-ORDER BY arrival_time DESC
-LIMIT 5;
-
-
-"""
-cursor.execute(query6)
+# Airport whose latest arrivals are listed
+ARRIVALS_AIRPORT = "DEL"
+
+query6, params6 = build("query6", FlightScope(airport=ARRIVALS_AIRPORT))
+cursor.execute(query6, params6)
 results = cursor.fetchall()
 
 for row in results:
@@ -522,15 +185,8 @@ for row in results:
 
 
 # %%
-query7= """ SELECT
-    ap.iata_code,
-    ap.name
-FROM airport ap
-LEFT JOIN flights f
-    ON ap.iata_code = f.destination_iata
-WHERE f.flight_id IS NULL;
-"""
-cursor.execute(query7)
+query7, params7 = build("query7")
+cursor.execute(query7, params7)
 results = cursor.fetchall()
 for row in results:
     print(
@@ -539,18 +195,8 @@ for row in results:
     )
 
 # %%
-query8 = """
-SELECT
-    airline_code,
-    SUM(CASE WHEN status = 'On Time' THEN 1 ELSE 0 END) AS on_time,
-    SUM(CASE WHEN status = 'Delayed' THEN 1 ELSE 0 END) AS `delayed`,
-    SUM(CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled
-FROM flights
-GROUP BY airline_code;
-
-
-"""
-cursor.execute(query8)
+query8, params8 = build("query8")
+cursor.execute(query8, params8)
 results = cursor.fetchall()
 for row in results:
     print(
@@ -561,22 +207,8 @@ for row in results:
     )
 
 # %%
-query9="""
-SELECT
-    f.flight_number,
-    f.aircraft_registration,
-    ao.name AS origin_airport,
-    ad.name AS destination_airport,
-    f.scheduled_departure
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-JOIN airport ad ON ad.iata_code = f.destination_iata
-WHERE f.status = 'Cancelled'
-ORDER BY f.scheduled_departure DESC;
-
-
-"""
-cursor.execute(query9)
+query9, params9 = build("query9")
+cursor.execute(query9, params9)
 results = cursor.fetchall()
 for row in results:
     print(
@@ -588,20 +220,8 @@ for row in results:
     )
 
 # %%
-query10 = """ 
-SELECT
-    ao.city AS origin_city,
-    ad.city AS destination_city,
-    COUNT(DISTINCT a.model) AS aircraft_models
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-JOIN airport ad ON ad.iata_code = f.destination_iata
-JOIN aircraft a ON a.registration = f.aircraft_registration
-GROUP BY ao.city, ad.city
-HAVING COUNT(DISTINCT a.model) > 2;
-
-"""
-cursor.execute(query10)
+query10, params10 = build("query10")
+cursor.execute(query10, params10)
 results = cursor.fetchall()
 for row in results:
     print(
@@ -612,20 +232,8 @@ for row in results:
     
 
 # %%
-query11 = """ SELECT
-    ap.name AS destination_airport,
-    ROUND(
-        SUM(CASE WHEN f.status = 'Delayed' THEN 1 ELSE 0 END) * 100.0
-        / COUNT(f.flight_id),
-        2
-    ) AS delayed_percentage
-FROM flights f
-JOIN airport ap
-    ON ap.iata_code = f.destination_iata
-GROUP BY ap.name
-ORDER BY delayed_percentage DESC;
-"""
-cursor.execute(query11)
+query11, params11 = build("query11")
+cursor.execute(query11, params11)
 results = cursor.fetchall()
 for row in results:
     print(
@@ -634,3 +242,8 @@ for row in results:
     )
 
 
+# %%
+# Every catalog query should be served by an index, never a full scan of flights
+from queries import check_catalog
+
+plan_failures = check_catalog(cursor)
@@ -0,0 +1,206 @@
+"""
+Air Tracker Configuration
+
+Central settings shared by the command line (cli.py), the ingestion
+notebook (code.py) and the dashboard (ui.py). Every value can be overridden through an environment
+variable so scheduled runs and local mock servers do not need code edits.
+"""
+
+import os
+
+# ============================================================
+# AERODATABOX API
+# ============================================================
+
+API_HOST = os.environ.get("AIR_TRACKER_API_HOST", "aerodatabox.p.rapidapi.com")
+API_KEY = os.environ.get(
+    "AIR_TRACKER_API_KEY", "71ff288c8emshc86261cd5e028edp170804jsnb6a70ef0a394"
+)
+
+# Base URL of the API. Point this at a local mock server for testing,
+# e.g. AIR_TRACKER_API_BASE_URL=http://127.0.0.1:8000
+API_BASE_URL = os.environ.get("AIR_TRACKER_API_BASE_URL", f"https://{API_HOST}")
+
+# Request quota of the RapidAPI plan (requests per second) and the
+# number of requests allowed back-to-back before the limiter kicks in.
+API_RATE_PER_SEC = float(os.environ.get("AIR_TRACKER_API_RATE", "1"))
+API_BURST = int(os.environ.get("AIR_TRACKER_API_BURST", "1"))
+
+# Number of requests kept in flight at the same time.
+API_MAX_WORKERS = int(os.environ.get("AIR_TRACKER_API_WORKERS", "4"))
+
+API_TIMEOUT = float(os.environ.get("AIR_TRACKER_API_TIMEOUT", "10"))
+
+# Range the request rate adapts within (scheduler.py): it climbs towards
+# the maximum while 2xx responses come back and halves on every 429.
+# 0 = API_RATE_PER_SEC, raised to what the quota headers leave room for
+API_RATE_MAX = float(os.environ.get("AIR_TRACKER_API_RATE_MAX", "0"))
+API_RATE_MIN = float(os.environ.get("AIR_TRACKER_API_RATE_MIN", "0.1"))
+
+# Retries of connection errors, timeouts, 429 and 5xx responses, with
+# full-jitter exponential backoff starting at BASE seconds, capped at MAX
+API_MAX_RETRIES = int(os.environ.get("AIR_TRACKER_API_MAX_RETRIES", "4"))
+API_BACKOFF_BASE = float(os.environ.get("AIR_TRACKER_API_BACKOFF_BASE", "0.5"))
+API_BACKOFF_MAX = float(os.environ.get("AIR_TRACKER_API_BACKOFF_MAX", "30"))
+
+# Longest Retry-After waited for; a longer one means the plan's quota is
+# used up, and requests fail without being sent until it resets
+API_MAX_RETRY_AFTER = float(os.environ.get("AIR_TRACKER_API_MAX_RETRY_AFTER", "60"))
+
+# Failures in a row that open an endpoint's circuit breaker, and seconds
+# it stays open before a trial request
+API_BREAKER_FAILURES = int(os.environ.get("AIR_TRACKER_API_BREAKER_FAILURES", "5"))
+API_BREAKER_RESET = float(os.environ.get("AIR_TRACKER_API_BREAKER_RESET", "30"))
+
+# ============================================================
+# TRACKED AIRPORTS
+# ============================================================
+
+# IATA codes ingested by ``air-tracker ingest``, comma-separated
+AIRPORTS = [
+    code.strip().upper()
+    for code in os.environ.get(
+        "AIR_TRACKER_AIRPORTS", "DEL,BOM,BLR,HYD,MAA,CCU,COK,DXB,LHR,JFK,SIN,CDG,HND,FRA,SYD"
+    ).split(",")
+    if code.strip()
+]
+
+# File of IATA codes to track instead, one per line ("#" starts a
+# comment), for airport sets too large for an environment variable
+AIRPORTS_FILE = os.environ.get("AIR_TRACKER_AIRPORTS_FILE", "")
+
+# Worker processes the airports are sharded across (shards.py); each gets
+# an equal share of the API rate and its own MySQL connection. 1 ingests
+# in-process, 0 starts one per CPU core
+INGEST_PROCESSES = int(os.environ.get("AIR_TRACKER_INGEST_PROCESSES", "1"))
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+
+CACHE_PATH = os.environ.get("AIR_TRACKER_CACHE_PATH", ".air_tracker_cache.sqlite3")
+CACHE_MAX_BYTES = int(os.environ.get("AIR_TRACKER_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# How long a cache write waits for another process (sharded ingestion)
+# holding the SQLite write lock before it is skipped
+CACHE_BUSY_TIMEOUT = float(os.environ.get("AIR_TRACKER_CACHE_BUSY_TIMEOUT", "10"))
+
+# How long a "Not found" (404) answer is remembered, so unknown aircraft
+# registrations are not looked up again on every run.
+CACHE_NEGATIVE_TTL = float(os.environ.get("AIR_TRACKER_CACHE_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+# ============================================================
+# DATABASE WRITES
+# ============================================================
+
+# Rows per executemany() batch and rows between commits for bulk loads
+DB_BATCH_SIZE = int(os.environ.get("AIR_TRACKER_DB_BATCH_SIZE", "1000"))
+DB_COMMIT_EVERY = int(os.environ.get("AIR_TRACKER_DB_COMMIT_EVERY", "10000"))
+
+# Attempts at a flight window's transaction when it deadlocks (1213) or
+# times out waiting for a row lock (1205), e.g. on rollup rows shared by
+# concurrent ingestion processes
+DB_LOCK_ATTEMPTS = int(os.environ.get("AIR_TRACKER_DB_LOCK_ATTEMPTS", "5"))
+
+# ============================================================
+# INGESTION PIPELINE
+# ============================================================
+
+# Items buffered between pipeline stages (API responses or row batches);
+# a full queue blocks the upstream stage.
+PIPELINE_QUEUE_SIZE = int(os.environ.get("AIR_TRACKER_PIPELINE_QUEUE_SIZE", "8"))
+
+# Longest time written rows may wait before being committed, so the first
+# rows land quickly even when a batch is not yet full.
+PIPELINE_FLUSH_SECONDS = float(os.environ.get("AIR_TRACKER_PIPELINE_FLUSH_SECONDS", "2"))
+
+# ============================================================
+# INCREMENTAL FLIGHT INGESTION
+# ============================================================
+
+# Longest from/to span the flights time-window endpoint accepts
+FLIGHT_WINDOW_HOURS = float(os.environ.get("AIR_TRACKER_FLIGHT_WINDOW_HOURS", "12"))
+
+# How far back an airport without a watermark starts
+INITIAL_LOOKBACK_HOURS = float(os.environ.get("AIR_TRACKER_INITIAL_LOOKBACK_HOURS", "12"))
+
+# Re-fetched tail before the watermark, to pick up late status changes
+WATERMARK_OVERLAP_MINUTES = float(os.environ.get("AIR_TRACKER_WATERMARK_OVERLAP_MINUTES", "60"))
+
+# How far past "now" scheduled departures are fetched
+LOOKAHEAD_HOURS = float(os.environ.get("AIR_TRACKER_LOOKAHEAD_HOURS", "0"))
+
+# ============================================================
+# DATABASE CONNECTION
+# ============================================================
+
+DB_CONFIG = {
+    "host": os.environ.get("AIR_TRACKER_DB_HOST", "localhost"),
+    "user": os.environ.get("AIR_TRACKER_DB_USER", "root"),
+    "password": os.environ.get("AIR_TRACKER_DB_PASSWORD", "12345678"),
+    "database": os.environ.get("AIR_TRACKER_DB_NAME", "air_tracker"),
+}
+
+# Pooled read connections (used by the dashboard)
+DB_POOL_SIZE = int(os.environ.get("AIR_TRACKER_DB_POOL_SIZE", "5"))
+DB_CONNECT_TIMEOUT = float(os.environ.get("AIR_TRACKER_DB_CONNECT_TIMEOUT", "10"))
+DB_CHECKOUT_TIMEOUT = float(os.environ.get("AIR_TRACKER_DB_CHECKOUT_TIMEOUT", "30"))
+
+# Longest a single SELECT may run on a pooled connection (seconds)
+DB_QUERY_TIMEOUT = float(os.environ.get("AIR_TRACKER_DB_QUERY_TIMEOUT", "30"))
+
+# ============================================================
+# DASHBOARD
+# ============================================================
+
+# Query results kept by the dashboard's cache (shared by all viewers)
+UI_CACHE_MAX_ENTRIES = int(os.environ.get("AIR_TRACKER_UI_CACHE_MAX_ENTRIES", "64"))
+
+# How often the dashboard re-reads the data version to notice new data
+UI_VERSION_POLL_SECONDS = float(os.environ.get("AIR_TRACKER_UI_VERSION_POLL_SECONDS", "10"))
+
+# ============================================================
+# COLUMNAR QUERY BACKEND
+# ============================================================
+
+# Where ingestion writes the Parquet copy of the tables (parquet_store.py)
+PARQUET_DIR = os.environ.get("AIR_TRACKER_PARQUET_DIR", "parquet")
+
+# Export to Parquet at the end of every ingestion run (1 = on); always
+# done once months are archived (partitions.refresh_export)
+PARQUET_EXPORT = os.environ.get("AIR_TRACKER_PARQUET_EXPORT", "0") == "1"
+
+# Rows read from MySQL and written per Parquet row group
+PARQUET_CHUNK_ROWS = int(os.environ.get("AIR_TRACKER_PARQUET_CHUNK_ROWS", "100000"))
+
+# Engine behind the dashboard: "mysql", or "duckdb" to run the catalog
+# on DuckDB over PARQUET_DIR
+QUERY_BACKEND = os.environ.get("AIR_TRACKER_QUERY_BACKEND", "mysql")
+
+# ============================================================
+# FLIGHT PARTITIONS
+# ============================================================
+
+# Whole months of flights kept in MySQL before the current one; older
+# monthly partitions are moved to the Parquet store (partitions.py)
+FLIGHTS_RETENTION_MONTHS = int(os.environ.get("AIR_TRACKER_FLIGHTS_RETENTION_MONTHS", "12"))
+
+# Empty monthly partitions kept ready past the current month
+FLIGHTS_PARTITIONS_AHEAD = int(os.environ.get("AIR_TRACKER_FLIGHTS_PARTITIONS_AHEAD", "3"))
+
+# ============================================================
+# INSTRUMENTATION
+# ============================================================
+
+# Prometheus text file rewritten at the end of every ingestion run, e.g.
+# for node_exporter's textfile collector (empty = off)
+METRICS_FILE = os.environ.get("AIR_TRACKER_METRICS_FILE", "")
+
+# Port serving /metrics from the dashboard or an ingestion process (0 = off)
+METRICS_PORT = int(os.environ.get("AIR_TRACKER_METRICS_PORT", "0"))
+
+# JSON summary of every ingestion run: loads, rows/sec, latency p50/p95
+RUN_SUMMARY_FILE = os.environ.get("AIR_TRACKER_RUN_SUMMARY", "")
+
+# Profile the next run with cProfile and write the stats here (empty = off)
+PROFILE_FILE = os.environ.get("AIR_TRACKER_PROFILE", "")
@@ -0,0 +1,25 @@
+"""
+Air Tracker Data Version
+
+A single counter in the ``data_version`` table that ingestion bumps
+inside every transaction that writes data. The dashboard keys its result
+cache on this value, so cached query results stay valid until new data
+is committed and are refreshed exactly once after that.
+"""
+
+
+def bump(cursor) -> None:
+    """
+    Increment the data version on the caller's transaction.
+
+    Meant as a ``BulkLoader`` ``on_commit`` hook: the new version becomes
+    visible together with the rows it describes.
+    """
+    cursor.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+
+def current(cursor) -> int:
+    """Return the current data version (0 if the counter row is missing)."""
+    cursor.execute("SELECT version FROM data_version WHERE id = 1")
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
@@ -0,0 +1,101 @@
+"""
+Air Tracker Connection Pool
+
+A small wrapper around mysql-connector's ``MySQLConnectionPool`` for
+readers such as the dashboard: callers block for a free connection
+instead of failing when the pool is busy, every checkout is pinged (and
+reconnected if the server dropped it), and each session gets a
+server-side execution time limit so one slow query cannot hold a
+connection indefinitely.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from mysql.connector import pooling
+from mysql.connector.errors import PoolError
+
+import config
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of autocommit MySQL connections.
+
+    Args:
+        size (int, optional): Number of connections (mysql-connector
+            allows at most 32)
+        query_timeout (float, optional): Longest a SELECT may run, in
+            seconds (``MAX_EXECUTION_TIME``); 0 disables the limit
+        checkout_timeout (float, optional): Longest to wait for a free
+            connection before raising ``PoolError``
+        connect_timeout (float, optional): Socket timeout for connecting
+        name (str, optional): Pool name (must be unique per process)
+        db_config (dict, optional): Connection settings; defaults to
+            ``config.DB_CONFIG``
+
+    Example:
+        >>> pool = ConnectionPool(size=4)
+        >>> with pool.connection() as conn:
+        ...     df = pd.read_sql("SELECT COUNT(*) FROM flights", conn)
+    """
+
+    def __init__(
+        self,
+        size: int = config.DB_POOL_SIZE,
+        query_timeout: float = config.DB_QUERY_TIMEOUT,
+        checkout_timeout: float = config.DB_CHECKOUT_TIMEOUT,
+        connect_timeout: float = config.DB_CONNECT_TIMEOUT,
+        name: str = "air_tracker",
+        db_config: Optional[dict] = None,
+    ):
+        self.size = size
+        self.query_timeout = query_timeout
+        self.checkout_timeout = checkout_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._pool = pooling.MySQLConnectionPool(
+            pool_name=name,
+            pool_size=size,
+            pool_reset_session=True,
+            autocommit=True,
+            connection_timeout=int(connect_timeout),
+            **(db_config or config.DB_CONFIG),
+        )
+
+    def _checkout(self):
+        conn = self._pool.get_connection()
+        try:
+            # Pre-ping: a connection idle past wait_timeout is reconnected here
+            # rather than failing the caller's query
+            conn.ping(reconnect=True, attempts=2, delay=1)
+            # Session variables are reset when a connection returns to the pool
+            cursor = conn.cursor()
+            cursor.execute(
+                "SET SESSION MAX_EXECUTION_TIME = %s",
+                (int(self.query_timeout * 1000),),
+            )
+            cursor.close()
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        """
+        Borrow a healthy connection for the duration of a ``with`` block.
+
+        Raises:
+            PoolError: If no connection frees up within ``checkout_timeout``
+        """
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            raise PoolError(f"No free connection after {self.checkout_timeout:g}s")
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            finally:
+                conn.close()  # returns it to the pool
+        finally:
+            self._slots.release()
@@ -0,0 +1,402 @@
+"""
+Air Tracker Delay Statistics
+
+Per-airport, per-day departure delay statistics for ``airport_delays``,
+computed from the flights themselves. A flight's delay is its revised
+departure minus its scheduled departure, both UTC (the ``actual_arrival``
+and ``scheduled_departure`` columns, see ``flight_parser.flight_row``), in
+minutes; early departures count as 0 and cancelled flights are left out.
+
+Every (airport, day) keeps a :class:`DelaySketch` in ``delay_sketches``:
+a log-bucketed histogram (DDSketch) whose quantiles are within
+``RELATIVE_ACCURACY`` of the exact ones. Sketches merge by adding bucket
+counts and, unlike sampling digests, can take a value out again, so when
+a flight's revised time changes its old delay is swapped for the new one.
+Like the rollups, they are updated from each batch of flight upserts in
+the same transaction, and the day's ``airport_delays`` row (mean, median,
+p90) is upserted from the merged sketch without re-reading the day's
+flights.
+"""
+
+import json
+import math
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flight_parser import FLIGHT_COLUMNS
+
+# numpy and pandas are imported by the functions that aggregate, so
+# commands that never touch flights start without them
+if TYPE_CHECKING:
+    import pandas as pd
+
+_ID = FLIGHT_COLUMNS.index("flight_id")
+_ORIGIN = FLIGHT_COLUMNS.index("origin_iata")
+_SCHEDULED = FLIGHT_COLUMNS.index("scheduled_departure")
+# Revised departure time (UTC); see flight_parser.flight_row
+_REVISED = FLIGHT_COLUMNS.index("actual_arrival")
+_STATUS = FLIGHT_COLUMNS.index("status")
+
+# Relative error of the quantiles read from a sketch
+RELATIVE_ACCURACY = 0.01
+
+# Delay from which a departure counts as delayed (the usual 15 minutes)
+DELAYED_MINUTES = 15
+
+CANCELLED_STATUS = "Cancelled"
+
+# Flights read per chunk when rebuilding
+_REBUILD_CHUNK_ROWS = 100_000
+
+# Chunk size for looking up the previous state of a batch
+_LOOKUP_CHUNK_SIZE = 500
+
+DayKey = Tuple[str, date]
+
+
+# ============================================================
+# SKETCH
+# ============================================================
+
+
+class DelaySketch:
+    """
+    Mergeable quantile sketch of delay minutes (DDSketch).
+
+    A value of at least one minute is counted in bucket
+    ``ceil(log_gamma(value))`` with ``gamma = (1 + a) / (1 - a)``, and
+    smaller ones in a zero bucket, so any quantile is returned within
+    relative error ``a`` using a few hundred buckets at most. Counts may
+    be negative in a delta that removes values.
+
+    Example:
+        >>> sketch = DelaySketch().add([0, 5, 12, 40, 95])
+        >>> round(sketch.quantile(0.5))
+        12
+    """
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self, zero: int = 0, bins: Optional[Dict[int, int]] = None, total: float = 0.0):
+        self.zero = zero
+        self.bins: Dict[int, int] = dict(bins or {})
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.bins.values())
+
+    def add(self, minutes: Iterable[float], sign: int = 1) -> "DelaySketch":
+        """Count ``minutes`` (any array-like), or uncount them with ``sign=-1``."""
+        import numpy as np
+
+        values = np.asarray(minutes, dtype=float)
+        if not values.size:
+            return self
+        positive = values[values >= 1]
+        self.zero += sign * int(values.size - positive.size)
+        self.total += sign * float(values.sum())
+        index, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma), return_counts=True)
+        for bucket, n in zip(index.astype(int).tolist(), counts.tolist()):
+            self._bump(bucket, sign * n)
+        return self
+
+    def remove(self, minutes: Iterable[float]) -> "DelaySketch":
+        return self.add(minutes, sign=-1)
+
+    def merge(self, other: "DelaySketch") -> "DelaySketch":
+        """Add ``other``'s counts (a sketch or a delta) to this one."""
+        self.zero += other.zero
+        self.total += other.total
+        for bucket, n in other.bins.items():
+            self._bump(bucket, n)
+        return self
+
+    def _bump(self, bucket: int, n: int) -> None:
+        updated = self.bins.get(bucket, 0) + n
+        if updated:
+            self.bins[bucket] = updated
+        else:
+            self.bins.pop(bucket, None)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated ``q`` quantile (0-1), or None for an empty sketch."""
+        count = self.count
+        if count <= 0:
+            return None
+        rank = q * (count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for bucket in sorted(self.bins):
+            seen += self.bins[bucket]
+            if rank < seen:
+                break
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def mean(self) -> Optional[float]:
+        count = self.count
+        return self.total / count if count > 0 else None
+
+    def to_json(self) -> str:
+        """Bucket counts as stored in ``delay_sketches.sketch`` (the sum has its own column)."""
+        return json.dumps({"zero": self.zero, "bins": {str(k): v for k, v in sorted(self.bins.items())}})
+
+    @classmethod
+    def from_json(cls, text: str, total: float = 0.0) -> "DelaySketch":
+        data = json.loads(text)
+        return cls(data["zero"], {int(k): v for k, v in data["bins"].items()}, total)
+
+
+@dataclass
+class DayStats:
+    """Delay statistics of one airport and day, or a change to them."""
+
+    total_flights: int = 0
+    delayed_flights: int = 0
+    canceled_flights: int = 0
+    sketch: DelaySketch = field(default_factory=DelaySketch)
+
+    def __bool__(self) -> bool:
+        """False for a delta that changes nothing."""
+        return bool(self.total_flights or self.delayed_flights or self.canceled_flights
+                    or self.sketch.zero or self.sketch.bins or self.sketch.total)
+
+    def merge(self, other: "DayStats") -> "DayStats":
+        self.total_flights += other.total_flights
+        self.delayed_flights += other.delayed_flights
+        self.canceled_flights += other.canceled_flights
+        self.sketch.merge(other.sketch)
+        return self
+
+    def row(self, key: DayKey) -> tuple:
+        """``airport_delays`` values in ``DELAY_COLUMNS`` order."""
+        def minutes(value: Optional[float]) -> Optional[int]:
+            return None if value is None else int(round(value))
+
+        return (
+            *key,
+            self.total_flights,
+            self.delayed_flights,
+            minutes(self.sketch.mean()),
+            minutes(self.sketch.quantile(0.5)),
+            minutes(self.sketch.quantile(0.9)),
+            self.canceled_flights,
+        )
+
+
+# ============================================================
+# VECTORISED AGGREGATION
+# ============================================================
+
+DELAY_COLUMNS = [
+    "airport_iata", "delay_date", "total_flights", "delayed_flights",
+    "avg_delay_min", "median_delay_min", "p90_delay_min", "canceled_flights",
+]
+
+
+def delay_minutes(scheduled: "pd.Series", revised: "pd.Series") -> "pd.Series":
+    """Departure delay in minutes (NaN without a revised time; early is 0)."""
+    import pandas as pd
+
+    delta = pd.to_datetime(revised) - pd.to_datetime(scheduled)
+    return (delta.dt.total_seconds() / 60).clip(lower=0)
+
+
+def day_stats(origin: Sequence, scheduled: Sequence, revised: Sequence, status: Sequence,
+              sign: int = 1) -> Dict[DayKey, DayStats]:
+    """
+    Aggregate flights into per-(origin, day) statistics in one pass.
+
+    The columns are parallel sequences (or Series) of the flights'
+    ``origin_iata``, ``scheduled_departure``, revised departure and
+    ``status``; ``sign=-1`` builds the delta that removes them.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame({
+        "origin": pd.Series(origin, dtype=object),
+        "scheduled": pd.to_datetime(pd.Series(scheduled)),
+        "revised": pd.to_datetime(pd.Series(revised)),
+        "status": pd.Series(status, dtype=object),
+    })
+    frame = frame[frame["origin"].notna() & frame["scheduled"].notna()]
+    if frame.empty:
+        return {}
+    canceled = frame["status"] == CANCELLED_STATUS
+    minutes = delay_minutes(frame["scheduled"], frame["revised"]).where(~canceled)
+    frame = frame.assign(
+        day=frame["scheduled"].dt.date,
+        minutes=minutes,
+        canceled=canceled,
+        delayed=minutes >= DELAYED_MINUTES,
+    )
+    stats = {}
+    for key, group in frame.groupby(["origin", "day"], sort=False):
+        stats[key] = DayStats(
+            sign * len(group),
+            sign * int(group["delayed"].sum()),
+            sign * int(group["canceled"].sum()),
+            DelaySketch().add(group["minutes"].dropna().to_numpy(), sign),
+        )
+    return stats
+
+
+def merge_stats(into: Dict[DayKey, DayStats], other: Dict[DayKey, DayStats]) -> Dict[DayKey, DayStats]:
+    for key, stats in other.items():
+        into.setdefault(key, DayStats()).merge(stats)
+    return into
+
+
+def _columns(rows: Sequence[Sequence], *indexes: int) -> List[list]:
+    return [[row[i] for row in rows] for i in indexes]
+
+
+# ============================================================
+# STORAGE
+# ============================================================
+
+
+def _stored(cursor, keys: List[DayKey]) -> Dict[DayKey, DayStats]:
+    """Locked current sketches of ``keys``."""
+    stored = {}
+    for start in range(0, len(keys), _LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + _LOOKUP_CHUNK_SIZE]
+        placeholders = ", ".join(["(%s, %s)"] * len(chunk))
+        cursor.execute(
+            f"SELECT airport_iata, delay_date, total_flights, delayed_flights, canceled_flights, "
+            f"delay_sum, sketch FROM delay_sketches "
+            f"WHERE (airport_iata, delay_date) IN ({placeholders}) FOR UPDATE",
+            [value for key in chunk for value in key],
+        )
+        for iata, day, total, delayed, canceled, delay_sum, sketch in cursor.fetchall():
+            stored[(iata, day)] = DayStats(total, delayed, canceled, DelaySketch.from_json(sketch, delay_sum))
+    return stored
+
+
+def write(cursor, stats: Dict[DayKey, DayStats]) -> None:
+    """Store ``stats`` as the current sketches and ``airport_delays`` rows."""
+    if not stats:
+        return
+    cursor.executemany(
+        """
+        INSERT INTO delay_sketches
+            (airport_iata, delay_date, total_flights, delayed_flights, canceled_flights, delay_sum, sketch)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_flights = VALUES(total_flights), delayed_flights = VALUES(delayed_flights),
+            canceled_flights = VALUES(canceled_flights), delay_sum = VALUES(delay_sum),
+            sketch = VALUES(sketch)
+        """,
+        [
+            (*key, s.total_flights, s.delayed_flights, s.canceled_flights, s.sketch.total, s.sketch.to_json())
+            for key, s in stats.items()
+        ],
+    )
+    updates = ", ".join(f"{column} = VALUES({column})" for column in DELAY_COLUMNS[2:])
+    cursor.executemany(
+        f"INSERT INTO airport_delays ({', '.join(DELAY_COLUMNS)}) "
+        f"VALUES ({', '.join(['%s'] * len(DELAY_COLUMNS))}) "
+        f"ON DUPLICATE KEY UPDATE {updates}",
+        [s.row(key) for key, s in stats.items()],
+    )
+
+
+def _previous_rows(cursor, flight_ids: List[str], departures: Tuple) -> List[tuple]:
+    """Stored ``(origin, scheduled, revised, status)`` of flights in the batch."""
+    previous = []
+    for start in range(0, len(flight_ids), _LOOKUP_CHUNK_SIZE):
+        chunk = flight_ids[start:start + _LOOKUP_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT origin_iata, scheduled_departure, actual_arrival, status FROM flights "
+            f"WHERE flight_id IN ({placeholders}) AND scheduled_departure BETWEEN %s AND %s",
+            [*chunk, *departures],
+        )
+        previous.extend(cursor.fetchall())
+    return previous
+
+
+def apply_flight_batch(cursor, rows: Sequence[Sequence]) -> Dict[DayKey, DayStats]:
+    """
+    ``BulkLoader`` flush hook: fold a batch of flight rows about to be
+    upserted into the day sketches and ``airport_delays``, on the same
+    cursor and transaction.
+
+    Flights already stored are first taken out with their stored delay,
+    so re-ingesting a flight with a new revised time replaces its delay.
+
+    Args:
+        cursor: The loader's cursor
+        rows: Flight rows in ``FLIGHT_COLUMNS`` order
+
+    Returns:
+        dict: ``(airport, day)`` -> the statistics now stored
+    """
+    # A flight repeated within the batch ends up as its last row
+    latest = list({row[_ID]: row for row in rows}.values())
+    if not latest:
+        return {}
+    departures = [row[_SCHEDULED] for row in latest if row[_SCHEDULED] is not None]
+    previous = _previous_rows(cursor, [row[_ID] for row in latest], (min(departures), max(departures))) \
+        if departures else []
+
+    delta = day_stats(*_columns(latest, _ORIGIN, _SCHEDULED, _REVISED, _STATUS))
+    if previous:
+        merge_stats(delta, day_stats(*zip(*previous), sign=-1))
+    # Flights seen again unchanged cancel out
+    delta = {key: stats for key, stats in delta.items() if stats}
+    if not delta:
+        return {}
+    current = _stored(cursor, list(delta))
+    write(cursor, merge_stats(current, delta))
+    return current
+
+
+def rebuild(cursor, since: Optional[datetime] = None, until: Optional[datetime] = None) -> None:
+    """
+    Recompute the sketches and ``airport_delays`` rows of the days in
+    ``[since, until)`` (midnight bounds; default all days) from ``flights``.
+
+    Needed once after the table is created, to repair drift, or after
+    flights were rewritten in place. Days before
+    ``partitions.archived_until`` are never touched: their flights are in
+    Parquet, not MySQL. Flights are read one month at a time, streamed in
+    chunks when ``cursor`` is unbuffered.
+    """
+    import partitions
+
+    archived = partitions.archived_until(cursor)
+    if archived is not None and (since is None or since < archived):
+        since = archived
+    days, departures, params = "", "", []
+    if since is not None:
+        days += " AND delay_date >= %s"
+        departures += " AND scheduled_departure >= %s"
+        params.append(since)
+    if until is not None:
+        days += " AND delay_date < %s"
+        departures += " AND scheduled_departure < %s"
+        params.append(until)
+    day_params = [value.date() for value in params]
+    cursor.execute(f"DELETE FROM delay_sketches WHERE TRUE{days}", day_params)
+    cursor.execute(f"DELETE FROM airport_delays WHERE TRUE{days}", day_params)
+
+    cursor.execute(f"SELECT MIN(scheduled_departure), MAX(scheduled_departure) FROM flights "
+                   f"WHERE TRUE{departures}", params)
+    oldest, newest = cursor.fetchall()[0]
+    stats: Dict[DayKey, DayStats] = {}
+    month = partitions.month_start(oldest) if oldest else None
+    while month is not None and month <= newest:
+        following = partitions.add_months(month, 1)
+        cursor.execute(
+            "SELECT origin_iata, scheduled_departure, actual_arrival, status FROM flights "
+            "WHERE origin_iata IS NOT NULL AND scheduled_departure >= %s AND scheduled_departure < %s",
+            (max(month, since or month), min(following, until or following)),
+        )
+        for chunk in iter(lambda: cursor.fetchmany(_REBUILD_CHUNK_ROWS), []):
+            merge_stats(stats, day_stats(*zip(*chunk)))
+        month = following
+    write(cursor, stats)
@@ -0,0 +1,92 @@
+"""
+Air Tracker Aircraft Enrichment
+
+Resolves the aircraft registrations seen in flight data to airframe
+records. Each registration is looked up at most once per run: duplicates
+are collapsed, registrations already stored in the ``aircraft`` table are
+skipped, and unknown registrations are answered from the client's
+negative cache instead of the API.
+"""
+
+from typing import Iterable, List, Set
+
+from aerodatabox import AeroDataBoxClient
+
+# Registrations per "IN (...)" lookup against the aircraft table
+LOOKUP_CHUNK_SIZE = 500
+
+
+def unique_registrations(regs: Iterable[str]) -> List[str]:
+    """
+    Deduplicate registrations, preserving first-seen order.
+
+    Args:
+        regs (Iterable[str]): Registrations, possibly repeated and empty
+
+    Returns:
+        list: Unique, non-empty, whitespace-stripped registrations
+    """
+    seen = set()
+    unique = []
+    for reg in regs:
+        reg = (reg or "").strip()
+        if reg and reg not in seen:
+            seen.add(reg)
+            unique.append(reg)
+    return unique
+
+
+def existing_registrations(cursor, regs: List[str]) -> Set[str]:
+    """
+    Return the subset of ``regs`` already present in the aircraft table.
+
+    Args:
+        cursor: MySQL cursor
+        regs (list): Unique registrations to check
+
+    Returns:
+        set: Registrations that already have an aircraft row
+    """
+    found = set()
+    for start in range(0, len(regs), LOOKUP_CHUNK_SIZE):
+        chunk = regs[start:start + LOOKUP_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT registration FROM aircraft WHERE registration IN ({placeholders})",
+            chunk,
+        )
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def missing_registrations(cursor, regs: Iterable[str]) -> List[str]:
+    """
+    Deduplicate ``regs`` and drop those already stored in the database.
+
+    Args:
+        cursor: MySQL cursor
+        regs (Iterable[str]): Registrations taken from flight data
+
+    Returns:
+        list: Registrations that still need to be fetched
+    """
+    unique = unique_registrations(regs)
+    known = existing_registrations(cursor, unique)
+    return [reg for reg in unique if reg not in known]
+
+
+def enrich_aircraft(client: AeroDataBoxClient, cursor, regs: Iterable[str]) -> List[dict]:
+    """
+    Fetch airframe records for registrations not yet in the database.
+
+    Args:
+        client (AeroDataBoxClient): API client (with a cache for 404s)
+        cursor: MySQL cursor
+        regs (Iterable[str]): Registrations taken from flight data
+
+    Returns:
+        list: Aircraft API responses for the newly resolved registrations
+    """
+    missing = missing_registrations(cursor, regs)
+    print("Aircraft to fetch:", len(missing))
+    return list(client.fetch_all(client.fetch_aircraft, missing).values())
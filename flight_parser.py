@@ -0,0 +1,128 @@
+"""
+Air Tracker Flight Parsing
+
+Turns AeroDataBox departure records into rows for the ``flights`` table.
+Each flight gets a deterministic ``flight_id`` derived from its natural
+key, so re-ingesting an overlapping time window updates existing rows
+instead of duplicating them. All timestamps are stored as naive UTC
+(see ``timezones``).
+"""
+
+import hashlib
+from datetime import datetime, timezone, tzinfo
+from typing import Optional, Tuple
+
+FLIGHT_COLUMNS = [
+    "flight_id", "flight_number", "aircraft_registration",
+    "origin_iata", "destination_iata",
+    "scheduled_departure", "actual_departure",
+    "scheduled_arrival", "actual_arrival",
+    "status", "airline_code",
+]
+
+# Columns refreshed when a flight is seen again; everything else is part
+# of the schedule and stays as first recorded.
+FLIGHT_UPDATE_COLUMNS = ["status", "actual_departure", "actual_arrival"]
+
+
+def parse_dt(value: Optional[str]) -> Optional[datetime]:
+    """Parse an AeroDataBox ISO-8601 timestamp, or return None if empty."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def to_utc(value: datetime, local_zone: Optional[tzinfo] = None) -> Optional[datetime]:
+    """
+    Convert a datetime to naive UTC.
+
+    Aware values are converted using their own offset; naive ones are
+    wall-clock time in ``local_zone``. Returns None for a naive value
+    without a zone, since its instant is unknown.
+    """
+    if value.tzinfo is None:
+        if local_zone is None:
+            return None
+        value = value.replace(tzinfo=local_zone)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_utc(time_value: Optional[dict], local_zone: Optional[tzinfo] = None) -> Optional[datetime]:
+    """
+    Naive UTC time of an AeroDataBox time object (``{"utc": ..., "local": ...}``).
+
+    The ``utc`` value is used when present. Otherwise ``local`` is
+    converted through its own offset or, if it has none, as wall-clock
+    time in ``local_zone`` (the airport's zone); None if neither works.
+    """
+    time_value = time_value or {}
+    value = parse_dt(time_value.get("utc"))
+    if value is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    value = parse_dt(time_value.get("local"))
+    return None if value is None else to_utc(value, local_zone)
+
+
+def flight_key(flight_number: Optional[str], origin_iata: Optional[str],
+               scheduled_departure_utc: Optional[datetime]) -> str:
+    """
+    Build the deterministic flight_id for one flight.
+
+    The key is a SHA-1 of flight number, origin airport and scheduled
+    departure (UTC, minute precision), so the same flight always maps to
+    the same row no matter how often it is fetched.
+
+    Args:
+        flight_number (str): Flight number, e.g. ``"AI 101"``
+        origin_iata (str): Departure airport IATA code
+        scheduled_departure_utc (datetime): Scheduled departure; aware
+            values are converted to UTC, naive values are taken as UTC
+
+    Returns:
+        str: 40-character hex digest
+    """
+    number = "".join((flight_number or "").upper().split())
+    origin = (origin_iata or "").upper()
+    if scheduled_departure_utc is None:
+        departure = ""
+    else:
+        if scheduled_departure_utc.tzinfo is not None:
+            scheduled_departure_utc = scheduled_departure_utc.astimezone(timezone.utc)
+        departure = scheduled_departure_utc.strftime("%Y-%m-%d %H:%M")
+    natural_key = f"{number}|{origin}|{departure}"
+    return hashlib.sha1(natural_key.encode("utf-8")).hexdigest()
+
+
+def flight_row(origin_iata: str, flight: dict, local_zone: Optional[tzinfo] = None) -> Tuple:
+    """
+    Flatten one departure record into a ``flights`` row.
+
+    Args:
+        origin_iata (str): Airport the departures were requested for
+        flight (dict): One entry of the API ``departures`` list
+        local_zone (tzinfo, optional): The origin airport's zone, for
+            local times without an offset
+
+    Returns:
+        tuple: Values in ``FLIGHT_COLUMNS`` order, timestamps naive UTC
+    """
+    movement = flight.get("movement", {})
+    scheduled = parse_utc(movement.get("scheduledTime"), local_zone)
+    revised = parse_utc(movement.get("revisedTime"), local_zone)
+    flight_number = flight.get("number")
+
+    # A departures record only carries the departure movement, so the
+    # arrival columns repeat its scheduled and revised times
+    return (
+        flight_key(flight_number, origin_iata, scheduled),
+        flight_number,
+        flight.get("aircraft", {}).get("reg"),
+        origin_iata,
+        movement.get("airport", {}).get("iata"),
+        scheduled,
+        revised,
+        scheduled,
+        revised,
+        flight.get("status"),
+        flight.get("airline", {}).get("iata"),
+    )
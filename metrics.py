@@ -0,0 +1,419 @@
+"""
+Air Tracker Metrics
+
+In-process instrumentation of ingestion and the dashboard. The API
+client, the pipeline stages, the bulk loaders and the query backends
+record counters and latency histograms into one thread-safe registry
+(``REGISTRY``), so a slow refresh can be attributed to API latency,
+rate-limiter waits, parsing, or MySQL writes and commits.
+
+- :func:`prometheus_text` renders the registry in the Prometheus text
+  format; :func:`write_prometheus` writes it to ``AIR_TRACKER_METRICS_FILE``
+  (e.g. for node_exporter's textfile collector) and :func:`serve` exposes
+  it on ``/metrics`` at ``AIR_TRACKER_METRICS_PORT``
+- :func:`report` ends a run: it writes a JSON summary (loads, rows/sec and
+  p50/p95 per series) to ``AIR_TRACKER_RUN_SUMMARY`` and the metrics file
+- :func:`profiled` runs a block under cProfile when ``AIR_TRACKER_PROFILE``
+  names an output file
+
+Metrics (prefixed ``air_tracker_`` when exported):
+
+- ``api_requests_total{endpoint,status}``: responses by HTTP status
+  (``cache`` for cache hits, ``error`` when no response arrived)
+- ``api_request_seconds{endpoint}``: request latency
+- ``api_decode_seconds{endpoint}``: JSON decoding
+- ``api_rate_limited_total{endpoint}``: 429 responses
+- ``api_retries_total{endpoint}``: requests sent again
+- ``ratelimit_wait_seconds{endpoint}``: time blocked in the token bucket
+- ``parse_seconds{table}``: parse stage, per response
+- ``db_hook_seconds{table}``: ``on_flush`` hooks (rollups, delay sketches), per batch
+- ``db_flush_seconds{table}``: one batch written, hooks included
+- ``db_commit_seconds{table}``: one commit
+- ``db_rows_total{table}``: rows written
+- ``load_rows_per_second{table}``: throughput of the last finished load (gauge)
+- ``query_seconds{backend}``: analytics query latency
+- ``dashboard_page_seconds``: time until every panel of a page was rendered
+"""
+
+import cProfile
+import copy
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+
+PREFIX = "air_tracker_"
+
+# Histogram bucket bounds in seconds, from single MySQL statements up to
+# slow API calls and whole-page renders
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _label_text(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram, as Prometheus stores one.
+
+    Args:
+        buckets (tuple, optional): Increasing upper bounds in seconds; a
+            final ``+Inf`` bucket is implied
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the observations of ``other``, which must have the same buckets."""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimated ``q`` quantile (0-1), interpolated within its bucket like
+        PromQL's ``histogram_quantile``; None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """
+    Thread-safe registry of labelled counters, gauges and histograms.
+
+    Series are created on first use, so recording needs no declaration.
+
+    Example:
+        >>> registry = Metrics()
+        >>> with registry.timer("db_commit_seconds", table="flights"):
+        ...     conn.commit()
+        >>> registry.inc("db_rows_total", 1000, table="flights")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, amount: float = 1.0, **labels) -> None:
+        """Add ``amount`` to a counter."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record one duration in a histogram."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of the ``with`` block, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self) -> None:
+        """Forget every series, e.g. between benchmark runs."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[Labels, Any]]]:
+        """Picklable copy of every series, e.g. to send from a worker process."""
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "gauges": {name: dict(series) for name, series in self._gauges.items()},
+                "histograms": {
+                    name: {labels: copy.deepcopy(histogram) for labels, histogram in series.items()}
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def merge(self, snapshot: Dict[str, Dict[str, Dict[Labels, Any]]], **labels) -> None:
+        """
+        Add a :meth:`snapshot` of another registry to this one.
+
+        Counters and histograms are summed. Gauges are copied with
+        ``labels`` added (e.g. ``shard="2"``), as summing them would be
+        wrong for most (remaining quota, last throughput).
+        """
+        extra = _labels(labels)
+        with self._lock:
+            for name, series in snapshot["counters"].items():
+                mine = self._counters.setdefault(name, {})
+                for key, value in series.items():
+                    mine[key] = mine.get(key, 0.0) + value
+            for name, series in snapshot["gauges"].items():
+                mine = self._gauges.setdefault(name, {})
+                for key, value in series.items():
+                    mine[tuple(sorted(key + extra))] = value
+            for name, series in snapshot["histograms"].items():
+                mine = self._histograms.setdefault(name, {})
+                for key, histogram in series.items():
+                    if key not in mine:
+                        mine[key] = Histogram(histogram.buckets)
+                    mine[key].merge(histogram)
+
+    # ============================================================
+    # EXPORT
+    # ============================================================
+
+    def prometheus_text(self) -> str:
+        """The registry in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for kind, families in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted(families):
+                    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                    for labels, value in sorted(families[name].items()):
+                        lines.append(f"{PREFIX}{name}{_label_text(labels)} {value!r}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f"{PREFIX}{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}"
+                        )
+                    lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        JSON-friendly digest: per series, counter and gauge values, and
+        histogram count, total seconds, p50 and p95.
+        """
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        with self._lock:
+            for families in (self._counters, self._gauges):
+                for name, series in families.items():
+                    result[name] = [
+                        {"labels": dict(labels), "value": value}
+                        for labels, value in sorted(series.items())
+                    ]
+            for name, series in self._histograms.items():
+                result[name] = [
+                    {
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "seconds": round(histogram.sum, 6),
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                    }
+                    for labels, histogram in sorted(series.items())
+                ]
+        return dict(sorted(result.items()))
+
+
+REGISTRY = Metrics()
+
+
+def inc(name: str, amount: float = 1.0, **labels) -> None:
+    """Add to a counter of :data:`REGISTRY`."""
+    REGISTRY.inc(name, amount, **labels)
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Set a gauge of :data:`REGISTRY`."""
+    REGISTRY.set(name, value, **labels)
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    """Record a duration in a histogram of :data:`REGISTRY`."""
+    REGISTRY.observe(name, seconds, **labels)
+
+
+def timer(name: str, **labels):
+    """Time a ``with`` block into a histogram of :data:`REGISTRY`."""
+    return REGISTRY.timer(name, **labels)
+
+
+def prometheus_text() -> str:
+    return REGISTRY.prometheus_text()
+
+
+# ============================================================
+# OUTPUTS
+# ============================================================
+
+
+def _write_atomic(path: str, text: str) -> None:
+    # Scrapers must never see a half-written file
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_prometheus(path: str = config.METRICS_FILE) -> None:
+    """Write :func:`prometheus_text` to ``path`` (no-op if empty)."""
+    if path:
+        _write_atomic(path, prometheus_text())
+
+
+def serve(port: int = config.METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve :func:`prometheus_text` on ``http://0.0.0.0:<port>/metrics``
+    from a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None if ``port`` is 0
+    """
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics on :{port}/metrics")
+    return server
+
+
+def report(stats: Iterable[Any] = (), path: str = config.RUN_SUMMARY_FILE) -> Dict[str, Any]:
+    """
+    Summarise a finished run and write its outputs.
+
+    The summary (``LoadStats`` of every load with rows/sec, plus
+    :meth:`Metrics.summary`) goes to ``path`` as JSON, and the metrics to
+    ``AIR_TRACKER_METRICS_FILE``; either is skipped when unset. Where the
+    time went is printed per stage.
+
+    Args:
+        stats (Iterable): ``LoadStats`` of the run's loads
+        path (str, optional): JSON summary file
+
+    Returns:
+        dict: The summary
+    """
+    summary = {
+        "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "loads": [dict(asdict(load), rows_per_sec=round(load.rows_per_sec, 1)) for load in stats],
+        "metrics": REGISTRY.summary(),
+    }
+    for name in ("api_request_seconds", "ratelimit_wait_seconds", "parse_seconds",
+                 "db_hook_seconds", "db_flush_seconds", "db_commit_seconds"):
+        series = summary["metrics"].get(name, [])
+        if series:
+            seconds = sum(entry["seconds"] for entry in series)
+            count = sum(entry["count"] for entry in series)
+            print(f"{name}: {seconds:.2f}s over {count} observations")
+    if path:
+        _write_atomic(path, json.dumps(summary, indent=2, default=str))
+    write_prometheus()
+    return summary
+
+
+@contextmanager
+def profiled(path: str = config.PROFILE_FILE, top: int = 25) -> Iterator[None]:
+    """
+    Run the ``with`` block under cProfile if ``path`` is set.
+
+    Threads started inside the block (fetch workers, pipeline stages) get
+    a profiler of their own, and everything is merged at the end. The
+    stats are dumped to ``path`` (open with ``python -m pstats``) and the
+    ``top`` functions by cumulative time are printed.
+    """
+    if not path:
+        yield None
+        return
+    profiles = [cProfile.Profile()]
+
+    def profile_thread(*_):
+        profile = cProfile.Profile()
+        profiles.append(profile)
+        sys.setprofile(None)
+        profile.enable()
+
+    threading.setprofile(profile_thread)
+    profiles[0].enable()
+    try:
+        yield None
+    finally:
+        profiles[0].disable()
+        threading.setprofile(None)
+        merged = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            merged.add(profile)
+        merged.dump_stats(path)
+        merged.sort_stats("cumulative").print_stats(top)
+        print(f"Profile of {len(profiles)} threads written to {path}")
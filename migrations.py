@@ -0,0 +1,475 @@
+"""
+Air Tracker Schema Migrations
+
+Versioned schema changes for the air_tracker database. Applied versions
+are recorded in ``schema_migrations`` so each migration runs exactly
+once, in order. The query plans these indexes are meant to produce are
+checked by ``queries.py``.
+
+Each migration spells out its DDL and SQL as they were when it was
+written, rather than calling the modules that use the tables, so a
+fresh database goes through the same schema versions as an old one.
+Backfills that need application code (``BACKFILLS``) run once the last
+pending migration is applied, against the schema as it is then.
+
+Usage:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending versions
+"""
+
+import sys
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import mysql.connector
+
+import config
+import delay_stats
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+
+def index_exists(cursor, table: str, index: str) -> bool:
+    """Return True if ``table`` already has an index called ``index``."""
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+        """,
+        (table, index),
+    )
+    return cursor.fetchone() is not None
+
+
+def create_index(cursor, table: str, index: str, columns: List[str]) -> None:
+    """Create an index unless one with the same name exists."""
+    if not index_exists(cursor, table, index):
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({', '.join(columns)})")
+
+
+def null_overlong(cursor, table: str, column: str, length: int) -> None:
+    """Clear values that would not fit a narrowed VARCHAR column."""
+    cursor.execute(
+        f"UPDATE {table} SET {column} = NULL WHERE CHAR_LENGTH({column}) > %s",
+        (length,),
+    )
+    if cursor.rowcount:
+        print(f"Cleared {cursor.rowcount} over-long {table}.{column} values")
+
+
+def _backfill_dashboard_rollups(cursor) -> None:
+    """Count ``flights`` into the four rollup tables of migration 004."""
+    cursor.execute("""
+    INSERT INTO rollup_flights_by_registration (aircraft_registration, flight_count)
+    SELECT aircraft_registration, COUNT(*) FROM flights
+    WHERE aircraft_registration IS NOT NULL GROUP BY aircraft_registration
+    """)
+    cursor.execute("""
+    INSERT INTO rollup_flights_by_origin (origin_iata, flight_count)
+    SELECT origin_iata, COUNT(*) FROM flights
+    WHERE origin_iata IS NOT NULL GROUP BY origin_iata
+    """)
+    cursor.execute("""
+    INSERT INTO rollup_flights_by_destination (destination_iata, flight_count, delayed_count)
+    SELECT destination_iata, COUNT(*), SUM(CASE WHEN status = 'Delayed' THEN 1 ELSE 0 END)
+    FROM flights
+    WHERE destination_iata IS NOT NULL GROUP BY destination_iata
+    """)
+    # NULL airline codes / statuses are stored as '' (part of the key)
+    cursor.execute("""
+    INSERT INTO rollup_flights_by_airline_status (airline_code, status, flight_count)
+    SELECT COALESCE(airline_code, ''), COALESCE(status, ''), COUNT(*) FROM flights
+    GROUP BY COALESCE(airline_code, ''), COALESCE(status, '')
+    """)
+
+
+def _backfill_route_rollup(cursor) -> None:
+    """Count ``flights`` into the route rollup of migration 006."""
+    cursor.execute("""
+    INSERT INTO rollup_flights_by_route (origin_iata, destination_iata, flight_count)
+    SELECT origin_iata, destination_iata, COUNT(*) FROM flights
+    WHERE origin_iata IS NOT NULL AND destination_iata IS NOT NULL
+    GROUP BY origin_iata, destination_iata
+    """)
+
+
+def _month_start(value: datetime, months: int = 0) -> datetime:
+    """First instant of the month ``months`` after the one ``value`` falls in."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+# ============================================================
+# MIGRATIONS
+# ============================================================
+
+
+def m001_initial_schema(cursor) -> None:
+    """Base tables (idempotent, so safe on databases created by code.py)."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS airport (
+        airport_id INT AUTO_INCREMENT PRIMARY KEY,
+        icao_code VARCHAR(4) UNIQUE,
+        iata_code VARCHAR(3) UNIQUE,
+        name VARCHAR(150),
+        city VARCHAR(100),
+        country VARCHAR(100),
+        continent VARCHAR(50),
+        latitude DOUBLE,
+        longitude DOUBLE,
+        timezone VARCHAR(50)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS aircraft (
+        aircraft_id INT AUTO_INCREMENT PRIMARY KEY,
+        registration VARCHAR(10) UNIQUE,
+        model VARCHAR(50),
+        manufacturer VARCHAR(50),
+        icao_type_code VARCHAR(10),
+        owner VARCHAR(100)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS flights (
+        flight_id VARCHAR(50) PRIMARY KEY,
+        flight_number VARCHAR(20),
+        aircraft_registration VARCHAR(300),
+        origin_iata VARCHAR(7),
+        destination_iata VARCHAR(7),
+        scheduled_departure DATETIME,
+        actual_departure DATETIME,
+        scheduled_arrival DATETIME,
+        actual_arrival DATETIME,
+        status VARCHAR(20),
+        airline_code VARCHAR(50)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS airport_delays (
+        delay_id INT AUTO_INCREMENT PRIMARY KEY,
+        airport_iata VARCHAR(5),
+        delay_date DATE,
+        total_flights INT,
+        delayed_flights INT,
+        avg_delay_min INT,
+        median_delay_min INT,
+        canceled_flights INT
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ingestion_watermark (
+        airport_iata VARCHAR(3) PRIMARY KEY,
+        loaded_until DATETIME NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def m002_align_join_keys(cursor) -> None:
+    """
+    Give the join columns of ``flights`` and ``airport_delays`` the same
+    types as the keys they join to (airport.iata_code VARCHAR(3),
+    aircraft.registration VARCHAR(10)), so joins compare like with like
+    and the indexes below stay small.
+    """
+    null_overlong(cursor, "flights", "aircraft_registration", 10)
+    null_overlong(cursor, "flights", "origin_iata", 3)
+    null_overlong(cursor, "flights", "destination_iata", 3)
+    null_overlong(cursor, "airport_delays", "airport_iata", 3)
+    cursor.execute("""
+    ALTER TABLE flights
+        MODIFY aircraft_registration VARCHAR(10),
+        MODIFY origin_iata VARCHAR(3),
+        MODIFY destination_iata VARCHAR(3)
+    """)
+    cursor.execute("ALTER TABLE airport_delays MODIFY airport_iata VARCHAR(3)")
+
+
+def m003_dashboard_indexes(cursor) -> None:
+    """
+    Composite indexes matched to the dashboard queries. Most are covering,
+    so aggregates read only the index instead of the table.
+    """
+    # Q4, Q7, Q11: arrivals and delayed share per destination
+    create_index(cursor, "flights", "idx_flights_dest_status", ["destination_iata", "status"])
+    # Q3 and origin/date filters
+    create_index(cursor, "flights", "idx_flights_origin_sched", ["origin_iata", "scheduled_departure"])
+    # Q5: domestic vs international route pairs
+    create_index(cursor, "flights", "idx_flights_origin_dest", ["origin_iata", "destination_iata"])
+    # Q1, Q2, Q10: aircraft joins and city pairs per airframe
+    create_index(
+        cursor, "flights", "idx_flights_reg_route",
+        ["aircraft_registration", "origin_iata", "destination_iata"],
+    )
+    # Q8: status counts per airline
+    create_index(cursor, "flights", "idx_flights_airline_status", ["airline_code", "status"])
+    # Q9: cancelled flights, newest first
+    create_index(cursor, "flights", "idx_flights_status_sched", ["status", "scheduled_departure"])
+    # Delay history per airport
+    create_index(cursor, "airport_delays", "idx_delays_airport_date", ["airport_iata", "delay_date"])
+
+
+def m004_dashboard_rollups(cursor) -> None:
+    """Summary tables for the aggregate panels, backfilled from flights."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_flights_by_registration (
+        aircraft_registration VARCHAR(10) PRIMARY KEY,
+        flight_count INT NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_flights_by_origin (
+        origin_iata VARCHAR(3) PRIMARY KEY,
+        flight_count INT NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_flights_by_destination (
+        destination_iata VARCHAR(3) PRIMARY KEY,
+        flight_count INT NOT NULL DEFAULT 0,
+        delayed_count INT NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_flights_by_airline_status (
+        airline_code VARCHAR(50) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        flight_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (airline_code, status)
+    )
+    """)
+    _backfill_dashboard_rollups(cursor)
+
+
+def m005_data_version(cursor) -> None:
+    """Counter bumped by ingestion; keys the dashboard's result cache."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS data_version (
+        id TINYINT PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("INSERT IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+
+def m006_flight_listings(cursor) -> None:
+    """Route rollup for the domestic/international split; keyset index for Q5."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rollup_flights_by_route (
+        origin_iata VARCHAR(3) NOT NULL,
+        destination_iata VARCHAR(3) NOT NULL,
+        flight_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (origin_iata, destination_iata)
+    )
+    """)
+    _backfill_route_rollup(cursor)
+    # Q5 pages through all flights newest first; InnoDB appends flight_id
+    # (the primary key), so this serves ORDER BY scheduled_departure, flight_id
+    create_index(cursor, "flights", "idx_flights_sched", ["scheduled_departure"])
+
+
+def m007_filter_indexes(cursor) -> None:
+    """
+    Indexes for the dashboard's sidebar filters: a date range combined
+    with an airport (matched as origin OR destination, so MySQL merges
+    this index with ``idx_flights_origin_sched``) or with an airline.
+    """
+    create_index(cursor, "flights", "idx_flights_dest_sched", ["destination_iata", "scheduled_departure"])
+    create_index(cursor, "flights", "idx_flights_airline_sched", ["airline_code", "scheduled_departure"])
+
+
+def m008_parquet_dirty_months(cursor) -> None:
+    """Flight months changed since the last Parquet export."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS parquet_dirty_months (
+        month CHAR(7) PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 1
+    )
+    """)
+
+
+def m009_flight_partitions(cursor) -> None:
+    """
+    Monthly range partitions on ``flights.scheduled_departure`` and the
+    log of months archived to Parquet.
+
+    MySQL requires the partitioning column in every unique key, so the
+    primary key becomes ``(flight_id, scheduled_departure)`` (flight_id
+    already determines the departure) and ``scheduled_departure`` becomes
+    NOT NULL; flights without one belong to no partition and are deleted
+    first. One partition is created per month from the oldest flight to
+    ``AIR_TRACKER_FLIGHTS_PARTITIONS_AHEAD`` months past the current one;
+    ``partitions.py`` adds later ones.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS flight_archive (
+        partition_name VARCHAR(16) PRIMARY KEY,
+        less_than DATETIME NOT NULL,
+        row_count BIGINT NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("""
+    SELECT 1 FROM information_schema.partitions
+    WHERE table_schema = DATABASE() AND table_name = 'flights' AND partition_name IS NOT NULL
+    LIMIT 1
+    """)
+    if cursor.fetchone() is not None:
+        return
+
+    cursor.execute("DELETE FROM flights WHERE scheduled_departure IS NULL")
+    if cursor.rowcount:
+        print(f"Deleted {cursor.rowcount} flights without a scheduled departure")
+        for table in ("registration", "origin", "destination", "airline_status", "route"):
+            cursor.execute(f"DELETE FROM rollup_flights_by_{table}")
+        _backfill_dashboard_rollups(cursor)
+        _backfill_route_rollup(cursor)
+
+    cursor.execute("""
+    ALTER TABLE flights
+        MODIFY scheduled_departure DATETIME NOT NULL,
+        DROP PRIMARY KEY,
+        ADD PRIMARY KEY (flight_id, scheduled_departure)
+    """)
+
+    current = _month_start(datetime.now(timezone.utc))
+    cursor.execute("SELECT MIN(scheduled_departure) FROM flights")
+    oldest = cursor.fetchone()[0]
+    month = _month_start(oldest) if oldest else current
+    definitions = []
+    while month <= _month_start(current, config.FLIGHTS_PARTITIONS_AHEAD):
+        following = _month_start(month, 1)
+        definitions.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{following:%Y-%m-%d}')")
+        month = following
+    definitions.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    cursor.execute(
+        "ALTER TABLE flights PARTITION BY RANGE COLUMNS (scheduled_departure) ("
+        + ", ".join(definitions) + ")"
+    )
+
+
+def m010_flight_delay_stats(cursor) -> None:
+    """
+    ``airport_delays`` derived from flights (``delay_stats.py``): one row
+    per airport and day, upserted, with a p90. The rows written by the
+    delays endpoint (guessed minutes, one per run) are replaced; the new
+    ones are filled in after the migration run (see ``BACKFILLS``).
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS delay_sketches (
+        airport_iata VARCHAR(3) NOT NULL,
+        delay_date DATE NOT NULL,
+        total_flights INT NOT NULL DEFAULT 0,
+        delayed_flights INT NOT NULL DEFAULT 0,
+        canceled_flights INT NOT NULL DEFAULT 0,
+        delay_sum DOUBLE NOT NULL DEFAULT 0,
+        sketch TEXT NOT NULL,
+        PRIMARY KEY (airport_iata, delay_date)
+    )
+    """)
+    cursor.execute("DELETE FROM airport_delays")
+    if index_exists(cursor, "airport_delays", "idx_delays_airport_date"):
+        cursor.execute("DROP INDEX idx_delays_airport_date ON airport_delays")
+    cursor.execute("""
+    ALTER TABLE airport_delays
+        ADD COLUMN p90_delay_min INT AFTER median_delay_min,
+        ADD UNIQUE KEY uq_delays_airport_date (airport_iata, delay_date)
+    """)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "initial schema", m001_initial_schema),
+    (2, "align join key types", m002_align_join_keys),
+    (3, "dashboard indexes", m003_dashboard_indexes),
+    (4, "dashboard rollups", m004_dashboard_rollups),
+    (5, "data version", m005_data_version),
+    (6, "paginated flight listings", m006_flight_listings),
+    (7, "dashboard filter indexes", m007_filter_indexes),
+    (8, "parquet dirty months", m008_parquet_dirty_months),
+    (9, "partition flights by month", m009_flight_partitions),
+    (10, "delay statistics from flights", m010_flight_delay_stats),
+]
+
+
+# Version -> backfill run after a migration run that applied it; delay
+# sketches are built in Python, not SQL
+BACKFILLS: Dict[int, Callable] = {
+    10: delay_stats.rebuild,
+}
+
+# ============================================================
+# RUNNER
+# ============================================================
+
+
+def applied_versions(cursor) -> Dict[int, str]:
+    """Create the bookkeeping table if needed and return applied versions."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(100),
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("SELECT version, name FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def migrate(conn) -> List[int]:
+    """
+    Apply every pending migration in version order.
+
+    MySQL commits DDL implicitly, so each migration is recorded right
+    after it succeeds; a failed migration stops the run and is retried
+    next time. The ``BACKFILLS`` of the versions applied then run, each
+    in its own transaction.
+
+    Args:
+        conn: MySQL connection
+
+    Returns:
+        list: Versions applied by this call
+    """
+    cursor = conn.cursor(buffered=True)
+    applied = applied_versions(cursor)
+    newly_applied = []
+    for version, name, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"Applying migration {version:03d}: {name}")
+        migration(cursor)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+            (version, name),
+        )
+        conn.commit()
+        newly_applied.append(version)
+    for version in newly_applied:
+        if version in BACKFILLS:
+            print(f"Backfilling migration {version:03d}")
+            BACKFILLS[version](cursor)
+            conn.commit()
+    cursor.close()
+    return newly_applied
+
+
+if __name__ == "__main__":
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    if "--status" in sys.argv:
+        done = applied_versions(connection.cursor(buffered=True))
+        for version, name, _ in MIGRATIONS:
+            state = "applied" if version in done else "pending"
+            print(f"{version:03d} {name}: {state}")
+    else:
+        versions = migrate(connection)
+        print("Applied:", versions or "nothing, schema is up to date")
+    connection.close()
@@ -0,0 +1,391 @@
+"""
+Air Tracker Parquet Store
+
+A columnar copy of ``flights``, ``airport``, ``aircraft`` and
+``airport_delays`` for the embedded DuckDB query backend
+(``query_backend.py``). The dated tables are partitioned by month, so a
+date filter only opens the files it needs:
+
+    <PARQUET_DIR>/flights/month=2026-01/data.parquet
+    <PARQUET_DIR>/airport_delays/month=2026-01/data.parquet
+    <PARQUET_DIR>/airport/data.parquet
+    <PARQUET_DIR>/aircraft/data.parquet
+    <PARQUET_DIR>/_export.json          # data version of the export
+
+Flight loaders mark the months they touch in ``parquet_dirty_months``
+inside the same transaction as the rows, so an export only rewrites those
+months; the small tables are rewritten whole. Every file is written
+beside its target and renamed over it, so readers never see a partial
+file. pyarrow is only needed to export, not to mark.
+
+Months archived out of MySQL (``partitions.py``) are stored as
+``archive-*.parquet`` files in the same month directories, which the
+export leaves alone, so readers see archived and live months as one table.
+
+Usage:
+    python parquet_store.py          # export everything that changed
+    python parquet_store.py --full   # rewrite every partition
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, groupby, islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import mysql.connector
+
+import config
+import data_version
+from bulk_loader import LoadStats
+from flight_parser import FLIGHT_COLUMNS
+
+_SCHEDULED = FLIGHT_COLUMNS.index("scheduled_departure")
+
+# Partition of rows whose partition column is NULL; always present, so
+# the flights glob never comes up empty
+NO_MONTH = "none"
+
+MANIFEST = "_export.json"
+
+# File of a month written by the export; archived months sit beside it
+EXPORT_FILE = "data.parquet"
+
+
+@dataclass(frozen=True)
+class ParquetTable:
+    """
+    Layout of one exported table.
+
+    Args:
+        name (str): MySQL table (and directory) name
+        columns (tuple): ``(column, arrow type name)`` pairs, in file order
+        partition_by (str, optional): DATE/DATETIME column whose month
+            partitions the table
+    """
+
+    name: str
+    columns: Tuple[Tuple[str, str], ...]
+    partition_by: Optional[str] = None
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column for column, _ in self.columns]
+
+    def schema(self):
+        import pyarrow as pa
+
+        types = {
+            "string": pa.string(), "int32": pa.int32(), "float64": pa.float64(),
+            "timestamp": pa.timestamp("us"), "date": pa.date32(),
+        }
+        return pa.schema([(column, types[kind]) for column, kind in self.columns])
+
+
+TABLES: Dict[str, ParquetTable] = {t.name: t for t in [
+    ParquetTable(
+        "flights",
+        (
+            ("flight_id", "string"), ("flight_number", "string"),
+            ("aircraft_registration", "string"),
+            ("origin_iata", "string"), ("destination_iata", "string"),
+            ("scheduled_departure", "timestamp"), ("actual_departure", "timestamp"),
+            ("scheduled_arrival", "timestamp"), ("actual_arrival", "timestamp"),
+            ("status", "string"), ("airline_code", "string"),
+        ),
+        partition_by="scheduled_departure",
+    ),
+    ParquetTable(
+        "airport",
+        (
+            ("airport_id", "int32"), ("icao_code", "string"), ("iata_code", "string"),
+            ("name", "string"), ("city", "string"), ("country", "string"),
+            ("continent", "string"), ("latitude", "float64"), ("longitude", "float64"),
+            ("timezone", "string"),
+        ),
+    ),
+    ParquetTable(
+        "aircraft",
+        (
+            ("aircraft_id", "int32"), ("registration", "string"), ("model", "string"),
+            ("manufacturer", "string"), ("icao_type_code", "string"), ("owner", "string"),
+        ),
+    ),
+    ParquetTable(
+        "airport_delays",
+        (
+            ("delay_id", "int32"), ("airport_iata", "string"), ("delay_date", "date"),
+            ("total_flights", "int32"), ("delayed_flights", "int32"),
+            ("avg_delay_min", "int32"), ("median_delay_min", "int32"),
+            ("p90_delay_min", "int32"), ("canceled_flights", "int32"),
+        ),
+        partition_by="delay_date",
+    ),
+]}
+
+
+def month_of(value) -> str:
+    """Partition key of a DATE/DATETIME value (``YYYY-MM``)."""
+    return NO_MONTH if value is None else f"{value:%Y-%m}"
+
+
+def month_range(month: str) -> Tuple[datetime, datetime]:
+    """``[start, end)`` of a ``YYYY-MM`` partition."""
+    start = datetime.strptime(month, "%Y-%m")
+    end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start, end
+
+
+# ============================================================
+# DIRTY MONTHS
+# ============================================================
+
+
+def mark_flight_batch(cursor, rows: Sequence[Sequence]) -> None:
+    """
+    Record the months a batch of flight rows falls in.
+
+    Meant to run from a ``BulkLoader`` ``on_flush`` hook, in the same
+    transaction as the rows. Each mark carries a version so an export
+    only clears marks that did not change while it was running.
+    """
+    mark_months(cursor, {month_of(row[_SCHEDULED]) for row in rows})
+
+
+def mark_months(cursor, months: Iterable[str]) -> None:
+    """Record flight months (``YYYY-MM``) changed outside a flight loader."""
+    months = sorted(months)
+    if months:
+        cursor.executemany(
+            "INSERT INTO parquet_dirty_months (month) VALUES (%s) "
+            "ON DUPLICATE KEY UPDATE version = version + 1",
+            [(month,) for month in months],
+        )
+
+
+# ============================================================
+# WRITING
+# ============================================================
+
+
+def _replace(table, path: str) -> None:
+    """Write an arrow table next to ``path`` and rename it into place."""
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, staging, compression="zstd")
+    os.replace(staging, path)
+
+
+def _arrow(spec: ParquetTable, rows: List[Sequence]):
+    import pyarrow as pa
+
+    schema = spec.schema()
+    columns = list(zip(*rows)) if rows else [[] for _ in spec.columns]
+    return pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _fetch(cursor, sql: str, params: tuple = ()) -> Iterable[List[Sequence]]:
+    cursor.execute(sql, params)
+    while True:
+        chunk = cursor.fetchmany(config.PARQUET_CHUNK_ROWS)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _chunked(rows: Iterable[Sequence]) -> Iterable[List[Sequence]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, config.PARQUET_CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_month(spec: ParquetTable, root: str, month: str, chunks: Iterable[List[Sequence]],
+                filename: str = EXPORT_FILE) -> int:
+    """Write one month (streamed in chunks) over its previous file; return the row count."""
+    import pyarrow.parquet as pq
+
+    path = os.path.join(root, spec.name, f"month={month}", filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    staging = f"{path}.{os.getpid()}.tmp"
+    rows = 0
+    with pq.ParquetWriter(staging, spec.schema(), compression="zstd") as writer:
+        for chunk in chunks:
+            writer.write_table(_arrow(spec, chunk))
+            rows += len(chunk)
+        if not rows:
+            writer.write_table(_arrow(spec, []))
+    os.replace(staging, path)
+    return rows
+
+
+def remove_month(spec: ParquetTable, root: str, month: str) -> None:
+    """
+    Delete the exported file of one month. Other files in the month's
+    directory (archived flights, see ``partitions.py``) are kept.
+    """
+    directory = os.path.join(root, spec.name, f"month={month}")
+    try:
+        os.remove(os.path.join(directory, EXPORT_FILE))
+        os.rmdir(directory)
+    except (FileNotFoundError, OSError):
+        pass
+
+
+def existing_months(spec: ParquetTable, root: str) -> List[str]:
+    """Months currently present in the export of ``spec``."""
+    directory = os.path.join(root, spec.name)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name.split("=", 1)[1] for name in os.listdir(directory) if name.startswith("month="))
+
+
+def export_table(conn, spec: ParquetTable, root: str = config.PARQUET_DIR,
+                 months: Optional[Iterable[str]] = None) -> LoadStats:
+    """
+    Write ``spec``'s table to Parquet.
+
+    Unpartitioned tables are always rewritten whole. Partitioned tables
+    rewrite ``months`` only, or every month (dropping months that no
+    longer have rows) when ``months`` is None.
+
+    Args:
+        conn: MySQL connection
+        spec (ParquetTable): Table layout
+        root (str, optional): Export directory
+        months (Iterable[str], optional): ``YYYY-MM`` partitions to rewrite
+
+    Returns:
+        LoadStats: Rows written and time taken
+    """
+    started = time.perf_counter()
+    stats = LoadStats(spec.name)
+    column_list = ", ".join(spec.column_names)
+    cursor = conn.cursor()
+    try:
+        if spec.partition_by is None:
+            rows = [row for chunk in _fetch(cursor, f"SELECT {column_list} FROM {spec.name}") for row in chunk]
+            _replace(_arrow(spec, rows), os.path.join(root, spec.name, EXPORT_FILE))
+            stats.rows, stats.batches = len(rows), 1
+        elif months is None:
+            # One pass in partition order; each month is streamed to its
+            # own file as the rows go by
+            key = spec.column_names.index(spec.partition_by)
+            rows = chain.from_iterable(
+                _fetch(cursor, f"SELECT {column_list} FROM {spec.name} ORDER BY {spec.partition_by}")
+            )
+            written = set()
+            for month, group in groupby(rows, key=lambda row: month_of(row[key])):
+                stats.rows += write_month(spec, root, month, _chunked(group))
+                stats.batches += 1
+                written.add(month)
+            if NO_MONTH not in written:
+                write_month(spec, root, NO_MONTH, [])
+                written.add(NO_MONTH)
+            for month in set(existing_months(spec, root)) - written:
+                remove_month(spec, root, month)
+        else:
+            for month in sorted(set(months)):
+                if month == NO_MONTH:
+                    sql = f"SELECT {column_list} FROM {spec.name} WHERE {spec.partition_by} IS NULL"
+                    params = ()
+                else:
+                    sql = (
+                        f"SELECT {column_list} FROM {spec.name} "
+                        f"WHERE {spec.partition_by} >= %s AND {spec.partition_by} < %s"
+                    )
+                    params = month_range(month)
+                rows = write_month(spec, root, month, _fetch(cursor, sql, params))
+                if not rows and month != NO_MONTH:
+                    remove_month(spec, root, month)
+                stats.rows += rows
+                stats.batches += 1
+    finally:
+        cursor.close()
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+
+def read_manifest(root: str = config.PARQUET_DIR) -> Optional[dict]:
+    """Contents of the export manifest, or None if nothing was exported yet."""
+    try:
+        with open(os.path.join(root, MANIFEST)) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def export(conn, root: str = config.PARQUET_DIR, full: bool = False) -> List[LoadStats]:
+    """
+    Bring the Parquet copy up to date with MySQL.
+
+    All tables are read from one consistent snapshot, whose data version
+    is recorded in the manifest (the DuckDB backend keys its cache on it).
+    Without a previous export, or with ``full``, every flight month is
+    rewritten; otherwise only the months marked dirty since the last one.
+
+    Args:
+        conn: MySQL connection (writers must have committed; a read-only
+            transaction left open by earlier SELECTs is ended)
+        root (str, optional): Export directory
+        full (bool, optional): Rewrite every partition
+
+    Returns:
+        list: LoadStats per table
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.start_transaction(consistent_snapshot=True)
+    try:
+        cursor = conn.cursor(buffered=True)
+        version = data_version.current(cursor)
+        cursor.execute("SELECT month, version FROM parquet_dirty_months")
+        marks = cursor.fetchall()
+        cursor.close()
+
+        full = full or read_manifest(root) is None
+        months = None if full else [month for month, _ in marks]
+        stats = [export_table(conn, TABLES["flights"], root, months)]
+        stats += [export_table(conn, spec, root) for name, spec in TABLES.items() if name != "flights"]
+
+        # A month re-marked during the export keeps its mark for next time
+        cursor = conn.cursor()
+        cursor.executemany(
+            "DELETE FROM parquet_dirty_months WHERE month = %s AND version = %s", marks
+        )
+        cursor.close()
+        os.makedirs(root, exist_ok=True)
+        manifest = {"data_version": version, "exported_at": datetime.utcnow().isoformat(timespec="seconds")}
+        staging = os.path.join(root, f"{MANIFEST}.{os.getpid()}.tmp")
+        with open(staging, "w") as handle:
+            json.dump(manifest, handle)
+        os.replace(staging, os.path.join(root, MANIFEST))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for table_stats in stats:
+        print(f"Exported {table_stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    export(connection, full="--full" in sys.argv)
+    connection.close()
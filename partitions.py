@@ -0,0 +1,246 @@
+"""
+Air Tracker Flight Partitions
+
+``flights`` is range-partitioned by month of ``scheduled_departure``:
+``p202601`` holds January 2026 and ``pmax`` anything past the last month.
+Date-filtered queries then only open the months they ask for (partition
+pruning), and old months leave MySQL with a metadata-only DROP PARTITION
+instead of a huge DELETE.
+
+The retention job keeps empty partitions a few months ahead of the clock
+and moves partitions older than ``AIR_TRACKER_FLIGHTS_RETENTION_MONTHS``
+to the Parquet store, as ``archive-<partition>.parquet`` files in the
+month directories of ``<PARQUET_DIR>/flights``. The DuckDB backend reads
+those beside the exported live months, so archived history stays
+queryable; the dashboard sends filters that reach before the oldest live
+month to it (see ``flight_archive``), and from then on every ingestion
+run refreshes the export (:func:`refresh_export`). The rollup tables keep counting
+archived flights, so unfiltered totals do not change when a month is
+archived.
+
+Usage (or ``air-tracker archive [--status]``):
+    python partitions.py              # add future partitions, archive old months
+    python partitions.py --status     # list partitions and archived months
+"""
+
+import sys
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+import mysql.connector
+
+import config
+import data_version
+import parquet_store
+import watermark
+from bulk_loader import LoadStats
+
+MAX_PARTITION = "pmax"
+
+
+def month_start(value) -> datetime:
+    """First instant of the month ``value`` falls in."""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def _definition(month: datetime) -> str:
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+def flight_partitions(cursor) -> List[Tuple[str, Optional[datetime]]]:
+    """
+    ``(name, less_than)`` of every ``flights`` partition, oldest first
+    (``less_than`` is None for ``pmax``); empty if not partitioned.
+    """
+    cursor.execute(
+        """
+        SELECT partition_name, partition_description FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'flights' AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+        """
+    )
+    return [
+        (name, None if description == "MAXVALUE" else datetime.fromisoformat(description.strip("'")))
+        for name, description in cursor.fetchall()
+    ]
+
+
+def add_future_partitions(cursor, now: Optional[datetime] = None,
+                          ahead: int = config.FLIGHTS_PARTITIONS_AHEAD) -> List[str]:
+    """
+    Split monthly partitions off ``pmax`` until ``ahead`` months past
+    ``now`` are covered, so new flights never pile up in ``pmax``.
+
+    Returns:
+        list: Names of the partitions added
+    """
+    partitions = flight_partitions(cursor)
+    bounds = [bound for _, bound in partitions if bound is not None]
+    if not bounds:
+        return []
+    month, last = bounds[-1], add_months(month_start(now or watermark.utc_now()), ahead)
+    added = []
+    while month <= last:
+        added.append(month)
+        month = add_months(month, 1)
+    if added:
+        cursor.execute(
+            f"ALTER TABLE flights REORGANIZE PARTITION {MAX_PARTITION} INTO ("
+            + ", ".join(_definition(m) for m in added)
+            + f", PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        )
+    return [partition_name(m) for m in added]
+
+
+# ============================================================
+# ARCHIVAL
+# ============================================================
+
+
+def _archive_partition(conn, name: str, root: str) -> Tuple[int, List[str]]:
+    """Write one partition's rows to Parquet, month by month."""
+    spec = parquet_store.TABLES["flights"]
+    column_list = ", ".join(spec.column_names)
+    key = spec.column_names.index(spec.partition_by)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT {column_list} FROM flights PARTITION ({name}) ORDER BY scheduled_departure")
+        rows, months = 0, []
+        chunks = iter(lambda: cursor.fetchmany(config.PARQUET_CHUNK_ROWS), [])
+        flat = (row for chunk in chunks for row in chunk)
+        for month, group in groupby(flat, key=lambda row: parquet_store.month_of(row[key])):
+            rows += parquet_store.write_month(
+                spec, root, month, parquet_store._chunked(group), filename=f"archive-{name}.parquet"
+            )
+            months.append(month)
+    finally:
+        cursor.close()
+    return rows, months
+
+
+def _remove_exported(root: str, until: datetime) -> None:
+    """Delete exported (not archived) flight months before ``until``."""
+    spec = parquet_store.TABLES["flights"]
+    for month in parquet_store.existing_months(spec, root):
+        if month != parquet_store.NO_MONTH and month < f"{until:%Y-%m}":
+            parquet_store.remove_month(spec, root, month)
+
+
+def archive(conn, retain_months: int = config.FLIGHTS_RETENTION_MONTHS,
+            now: Optional[datetime] = None, root: str = config.PARQUET_DIR) -> List[LoadStats]:
+    """
+    Move partitions older than ``retain_months`` from MySQL to Parquet.
+
+    Each partition is written to Parquet and its row count checked again
+    before it is logged in ``flight_archive`` and dropped. The live months
+    are then exported (``parquet_store.export``) so the archive and the
+    rest of ``flights`` can be read together. Safe to re-run: a partition
+    that was written but not dropped is simply archived again.
+
+    Args:
+        conn: MySQL connection
+        retain_months (int, optional): Whole months kept in MySQL besides
+            the current one
+        now (datetime, optional): Naive UTC "now"; defaults to the clock
+        root (str, optional): Parquet store directory
+
+    Returns:
+        list: LoadStats per archived partition, then the export's
+    """
+    cutoff = add_months(month_start(now or watermark.utc_now()), -retain_months)
+    cursor = conn.cursor(buffered=True)
+    partitions = flight_partitions(cursor)
+    until = archived_until(cursor)
+    cursor.close()
+    if until is not None:
+        # Finish a previous run that dropped partitions but not their export copies
+        _remove_exported(root, until)
+
+    stats = []
+    for name, bound in partitions:
+        if bound is None or bound > cutoff:
+            break
+        started = time.perf_counter()
+        rows, months = _archive_partition(conn, name, root)
+
+        cursor = conn.cursor(buffered=True)
+        cursor.execute(f"SELECT COUNT(*) FROM flights PARTITION ({name})")
+        if cursor.fetchone()[0] != rows:
+            cursor.close()
+            print(f"Skipped {name}: rows changed while archiving; retry later")
+            continue
+        cursor.execute(
+            "INSERT INTO flight_archive (partition_name, less_than, row_count) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE row_count = VALUES(row_count), archived_at = CURRENT_TIMESTAMP",
+            (name, bound, rows),
+        )
+        data_version.bump(cursor)
+        conn.commit()
+        cursor.execute(f"ALTER TABLE flights DROP PARTITION {name}")
+        cursor.close()
+        # The export's copy of these months now duplicates the archive
+        _remove_exported(root, bound)
+
+        stats.append(LoadStats(f"flights {name} -> archive", rows=rows, batches=len(months),
+                               commits=1, seconds=time.perf_counter() - started))
+        print(f"Archived {stats[-1]}")
+
+    return stats + parquet_store.export(conn, root)
+
+
+def archived_until(cursor) -> Optional[datetime]:
+    """Start of the oldest month still in MySQL, or None if nothing was archived."""
+    cursor.execute("SELECT MAX(less_than) FROM flight_archive")
+    rows = cursor.fetchall()
+    return rows[0][0] if rows else None
+
+
+def refresh_export(conn) -> List[LoadStats]:
+    """
+    Refresh the Parquet copy at the end of an ingestion run if
+    ``AIR_TRACKER_PARQUET_EXPORT`` is on or any month is archived.
+
+    Archived scopes read the exported live months beside the archive, so
+    once a month has left MySQL the copy must follow every run, whichever
+    backend the dashboard uses otherwise.
+    """
+    if not config.PARQUET_EXPORT:
+        cursor = conn.cursor(buffered=True)
+        archived = archived_until(cursor)
+        cursor.close()
+        if archived is None:
+            return []
+    return parquet_store.export(conn)
+
+
+def maintain(conn) -> List[LoadStats]:
+    """The scheduled job: add future partitions, then archive old ones."""
+    cursor = conn.cursor(buffered=True)
+    added = add_future_partitions(cursor)
+    cursor.close()
+    if added:
+        print("Added partitions:", ", ".join(added))
+    return archive(conn)
+
+
+if __name__ == "__main__":
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    if "--status" in sys.argv:
+        status_cursor = connection.cursor(buffered=True)
+        for partition, less_than in flight_partitions(status_cursor):
+            print(f"{partition}: < {less_than or 'MAXVALUE'}")
+        print("Archived until:", archived_until(status_cursor) or "nothing archived")
+    else:
+        maintain(connection)
+    connection.close()
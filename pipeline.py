@@ -0,0 +1,438 @@
+"""
+Air Tracker Ingestion Pipeline
+
+Streams AeroDataBox data into MySQL as fetch -> parse -> write stages
+connected by bounded queues. Each stage runs in its own thread and blocks
+when the next one falls behind, so memory stays flat no matter how many
+airports are tracked, and rows are committed while later airports are
+still being fetched.
+"""
+
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta, tzinfo
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import config
+import data_version
+import delay_stats
+import metrics
+import parquet_store
+import partitions
+import rollups
+import timezones
+import watermark
+from aerodatabox import AeroDataBoxClient
+from bulk_loader import BulkLoader, LoadStats
+from enrichment import missing_registrations
+from flight_parser import FLIGHT_COLUMNS, FLIGHT_UPDATE_COLUMNS, flight_row
+
+AIRPORT_COLUMNS = [
+    "icao_code", "iata_code", "name", "city", "country", "continent",
+    "latitude", "longitude", "timezone",
+]
+AIRCRAFT_COLUMNS = ["registration", "model", "manufacturer", "icao_type_code", "owner"]
+
+_SCHEDULED = FLIGHT_COLUMNS.index("scheduled_departure")
+
+# Lock errors after which a transaction can simply be run again
+_LOCK_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+_DONE = object()
+
+
+class _Failure:
+    """Carries an exception from a producer thread to the consumer."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+# ============================================================
+# STAGE PLUMBING
+# ============================================================
+
+def buffered(iterable: Iterable, maxsize: int = config.PIPELINE_QUEUE_SIZE) -> Iterator:
+    """
+    Run ``iterable`` in a background thread behind a bounded queue.
+
+    The producer blocks once ``maxsize`` items are waiting, which
+    propagates backpressure upstream. Exceptions raised by the producer
+    are re-raised in the consumer.
+
+    Args:
+        iterable (Iterable): Upstream stage
+        maxsize (int, optional): Queue capacity
+
+    Yields:
+        Items of ``iterable``, in order
+    """
+    items: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            put(_Failure(exc))
+        else:
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+def write_rows(loader: BulkLoader, batches: Iterable[List[tuple]],
+               flush_seconds: float = config.PIPELINE_FLUSH_SECONDS) -> LoadStats:
+    """
+    Writer stage: feed row batches to ``loader``, committing at least
+    every ``flush_seconds`` so early rows become visible quickly.
+
+    Args:
+        loader (BulkLoader): Loader for the target table
+        batches (Iterable[list]): Row batches from the parse stage
+        flush_seconds (float, optional): Maximum commit latency
+
+    Returns:
+        LoadStats: Totals and throughput for the load
+    """
+    last_flush = time.monotonic()
+    with loader:
+        for batch in batches:
+            loader.extend(batch)
+            if time.monotonic() - last_flush >= flush_seconds:
+                loader.flush()
+                loader.commit()
+                last_flush = time.monotonic()
+    return loader.stats
+
+
+def fetched(client: AeroDataBoxClient, fetch, items: Iterable[str],
+            failures: Optional[List[Tuple[str, str]]] = None) -> Iterator[Tuple[str, dict]]:
+    """
+    Fetch stage: yield ``(item, response)``, reporting failures and 404s.
+    Failed items are also appended to ``failures`` as ``(item, error)``.
+    """
+    for item, result, error in client.iter_fetch(fetch, items):
+        if error is not None:
+            print("Request failed:", item, error)
+            if failures is not None:
+                failures.append((item, str(error)))
+        elif result is None:
+            print("Not found:", item)
+        else:
+            yield item, result
+
+
+# ============================================================
+# PARSERS
+# ============================================================
+
+def airport_row(airport: dict) -> tuple:
+    """Flatten an ``/airports/iata/{iata}`` response into an airport row."""
+    return (
+        airport.get("icao"),
+        airport.get("iata"),
+        airport.get("fullName"),
+        airport.get("municipalityName"),
+        airport.get("country", {}).get("name"),
+        airport.get("continent", {}).get("name"),
+        airport.get("location", {}).get("lat"),
+        airport.get("location", {}).get("lon"),
+        airport.get("timeZone"),
+    )
+
+
+def aircraft_row(aircraft: dict) -> tuple:
+    """Flatten an ``/aircrafts/reg/{reg}`` response into an aircraft row."""
+    return (
+        aircraft.get("reg"),
+        aircraft.get("model"),
+        aircraft.get("productionLine"),
+        aircraft.get("icaoCode"),
+        aircraft.get("airlineName"),
+    )
+
+
+def departure_rows(responses: Iterable[Tuple[str, dict]],
+                   registrations: Optional[Set[str]] = None,
+                   zones: Optional[Dict[str, tzinfo]] = None) -> Iterator[List[tuple]]:
+    """
+    Parse stage for flights: one batch of rows per airport response.
+
+    Departures without an aircraft registration or a scheduled departure
+    (which picks the row's monthly partition) are skipped. Registrations
+    seen are added to ``registrations`` for enrichment. ``zones`` (from
+    ``timezones.airport_zones``) resolves local times without an offset.
+    """
+    zones = zones or {}
+    for origin_iata, response in responses:
+        started = time.perf_counter()
+        batch = []
+        for flight in response.get("departures", []):
+            reg = flight.get("aircraft", {}).get("reg")
+            if not reg:
+                continue
+            row = flight_row(origin_iata, flight, zones.get(origin_iata))
+            if row[_SCHEDULED] is None:
+                continue
+            batch.append(row)
+            if registrations is not None:
+                registrations.add(reg)
+        metrics.observe("parse_seconds", time.perf_counter() - started, table="flights")
+        if batch:
+            yield batch
+
+
+# ============================================================
+# INGESTION STAGES
+# ============================================================
+
+def flight_batch_hook(cursor, rows: List[tuple]) -> None:
+    """``on_flush`` of flight loaders: rollup deltas, delay sketches and Parquet dirty months."""
+    rollups.apply_flight_batch(cursor, rows)
+    delay_stats.apply_flight_batch(cursor, rows)
+    parquet_store.mark_flight_batch(cursor, rows)
+
+
+def table_loader(conn, table: str, columns: List[str], **kwargs) -> BulkLoader:
+    """``BulkLoader`` that bumps the data version with every commit of new rows."""
+    return BulkLoader(conn, table, columns, on_commit=data_version.bump, **kwargs)
+
+
+def ingest_airports(client: AeroDataBoxClient, conn, iata_codes: Iterable[str],
+                    failures: Optional[List[Tuple[str, str]]] = None) -> LoadStats:
+    """Fetch airport metadata and upsert it into the airport table."""
+    responses = buffered(fetched(client, client.fetch_airport, iata_codes, failures))
+    batches = ([airport_row(airport)] for _, airport in responses)
+    loader = table_loader(conn, "airport", AIRPORT_COLUMNS, update_columns=AIRPORT_COLUMNS[2:])
+    return write_rows(loader, batches)
+
+
+def ingest_flights(client: AeroDataBoxClient, conn, iata_codes: Iterable[str],
+                   failures: Optional[List[Tuple[str, str]]] = None) -> Tuple[LoadStats, Set[str]]:
+    """
+    Stream departures for each airport into the flights table.
+
+    Returns:
+        tuple: ``(LoadStats, registrations)`` where ``registrations`` is
+        the set of aircraft registrations seen, for enrichment
+    """
+    iata_codes = list(iata_codes)
+    cursor = conn.cursor()
+    try:
+        zones = timezones.airport_zones(cursor, iata_codes)
+    finally:
+        cursor.close()
+
+    registrations: Set[str] = set()
+    responses = buffered(fetched(client, client.fetch_flights, iata_codes, failures))
+    batches = buffered(departure_rows(responses, registrations, zones))
+    loader = table_loader(
+        conn, "flights", FLIGHT_COLUMNS, update_columns=FLIGHT_UPDATE_COLUMNS,
+        on_flush=flight_batch_hook,
+    )
+    return write_rows(loader, batches), registrations
+
+
+def write_window(loader: BulkLoader, cursor, rows: List[tuple], iata: str,
+                 advanced_to: Optional[datetime], attempts: int = config.DB_LOCK_ATTEMPTS) -> None:
+    """
+    Write one flight window and advance ``iata``'s watermark to
+    ``advanced_to`` (if set) in one transaction.
+
+    Concurrent ingestion processes upsert the same rollup rows, so the
+    transaction can deadlock or time out on a row lock; it is then rolled
+    back and run again, up to ``attempts`` times. Rows committed by an
+    earlier attempt are upserted again unchanged, which the flush hooks
+    count as no change.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            loader.extend(rows)
+            loader.flush()
+            if advanced_to is not None:
+                watermark.set_watermark(cursor, iata, advanced_to)
+            loader.commit(force=True)
+            return
+        except mysql.connector.Error as exc:
+            if exc.errno not in _LOCK_ERRORS or attempt == attempts:
+                raise
+            loader.rollback()
+            metrics.inc("db_lock_retries_total", table=loader.table)
+            print(f"Retrying {iata} window after {exc.msg} (attempt {attempt + 1}/{attempts})")
+            time.sleep(random.uniform(0.05, 0.2) * attempt)
+
+
+def ingest_flights_incremental(
+    client: AeroDataBoxClient,
+    conn,
+    iata_codes: Iterable[str],
+    now: Optional[datetime] = None,
+    max_span: timedelta = timedelta(hours=config.FLIGHT_WINDOW_HOURS),
+    initial_lookback: timedelta = timedelta(hours=config.INITIAL_LOOKBACK_HOURS),
+    overlap: timedelta = timedelta(minutes=config.WATERMARK_OVERLAP_MINUTES),
+    lookahead: timedelta = timedelta(hours=config.LOOKAHEAD_HOURS),
+    failures: Optional[List[Tuple[str, str]]] = None,
+) -> Tuple[LoadStats, Set[str]]:
+    """
+    Stream only the departures after each airport's ingestion watermark.
+
+    Gaps since the watermark are split into API-sized windows which are
+    fetched concurrently. Each window's flights are written and the
+    airport's watermark is advanced in one transaction (:func:`write_window`,
+    which retries it on lock errors); the watermark only moves past
+    windows whose predecessors have all been written, so a failed window
+    is simply retried on the next run.
+
+    Args:
+        client (AeroDataBoxClient): API client
+        conn: MySQL connection
+        iata_codes (Iterable[str]): Airports to refresh
+        now (datetime, optional): Naive UTC "now"; defaults to the clock
+        max_span (timedelta, optional): Longest window per request
+        initial_lookback (timedelta, optional): Start of airports
+            without a watermark, relative to ``now``
+        overlap (timedelta, optional): Tail re-fetched before the
+            watermark to pick up late status changes
+        lookahead (timedelta, optional): How far past ``now`` to fetch
+        failures (list, optional): Collects ``(window, error)`` of windows
+            that failed, as for :func:`fetched`
+
+    Returns:
+        tuple: ``(LoadStats, registrations)`` as for :func:`ingest_flights`
+    """
+    iata_codes = list(iata_codes)
+    now = now or watermark.utc_now()
+
+    cursor = conn.cursor()
+    watermarks = watermark.get_watermarks(cursor, iata_codes)
+    zones = timezones.airport_zones(cursor, iata_codes)
+    plan = watermark.plan_chunks(
+        watermarks, iata_codes, now, max_span, initial_lookback, overlap, lookahead, zones
+    )
+
+    chunks = [
+        (iata, index, start, end)
+        for iata, windows in plan.items()
+        for index, (start, end) in enumerate(windows)
+    ]
+    print("Flight windows to fetch:", len(chunks))
+
+    def fetch_chunk(chunk):
+        iata, _, start, end = chunk
+        return client.fetch_flights_window(
+            iata, watermark.to_local(start, zones.get(iata)),
+            watermark.to_local(end, zones.get(iata)),
+        )
+
+    registrations: Set[str] = set()
+    written = {iata: set() for iata in plan}
+    next_index = {iata: 0 for iata in plan}
+
+    def completed_chunks():
+        # An empty window (204) still counts as loaded; failed ones do not
+        for chunk, response, error in client.iter_fetch(fetch_chunk, chunks):
+            if error is not None:
+                print("Request failed:", chunk[0], chunk[2], "-", chunk[3], error)
+                if failures is not None:
+                    failures.append((f"{chunk[0]} {chunk[2]} - {chunk[3]}", str(error)))
+            else:
+                yield chunk, response or {}
+
+    loader = table_loader(
+        conn, "flights", FLIGHT_COLUMNS, update_columns=FLIGHT_UPDATE_COLUMNS,
+        on_flush=flight_batch_hook,
+    )
+    responses = buffered(completed_chunks())
+    try:
+        with loader:
+            for (iata, index, _, _), response in responses:
+                rows = [row for batch in departure_rows([(iata, response)], registrations, zones)
+                        for row in batch]
+
+                # Advance over every contiguous window written so far
+                written[iata].add(index)
+                advanced_to = None
+                while next_index[iata] in written[iata]:
+                    advanced_to = plan[iata][next_index[iata]][1]
+                    next_index[iata] += 1
+                write_window(loader, cursor, rows, iata, advanced_to)
+    finally:
+        cursor.close()
+
+    return loader.stats, registrations
+
+
+def ingest_aircraft(client: AeroDataBoxClient, conn, registrations: Iterable[str],
+                    failures: Optional[List[Tuple[str, str]]] = None) -> LoadStats:
+    """Fetch and insert aircraft for registrations not yet in the database."""
+    cursor = conn.cursor()
+    try:
+        missing = missing_registrations(cursor, registrations)
+    finally:
+        cursor.close()
+    print("Aircraft to fetch:", len(missing))
+
+    responses = buffered(fetched(client, client.fetch_aircraft, missing, failures))
+    batches = ([aircraft_row(aircraft)] for _, aircraft in responses)
+    loader = table_loader(conn, "aircraft", AIRCRAFT_COLUMNS, ignore=True)
+    return write_rows(loader, batches)
+
+
+def run(client: AeroDataBoxClient, conn, iata_codes: Iterable[str],
+        incremental: bool = False) -> List[LoadStats]:
+    """
+    Run the full ingestion: airports, flights, then aircraft, and refresh
+    the Parquet copy if ``AIR_TRACKER_PARQUET_EXPORT`` is on. Delay
+    statistics are kept current by the flight loads themselves
+    (``delay_stats.py``). The run is profiled if ``AIR_TRACKER_PROFILE``
+    is set and ends with a ``metrics.report``.
+
+    Args:
+        client (AeroDataBoxClient): API client
+        conn: MySQL connection
+        iata_codes (Iterable[str]): Airports to track
+        incremental (bool, optional): Fetch only the windows after each
+            airport's watermark (:func:`ingest_flights_incremental`)
+            instead of the endpoint's default window
+
+    Returns:
+        list: LoadStats for each table, in load order
+    """
+    iata_codes = list(iata_codes)
+    with metrics.profiled():
+        airport_stats = ingest_airports(client, conn, iata_codes)
+        ingest = ingest_flights_incremental if incremental else ingest_flights
+        flight_stats, registrations = ingest(client, conn, iata_codes)
+        aircraft_stats = ingest_aircraft(client, conn, registrations)
+        stats = [airport_stats, flight_stats, aircraft_stats]
+        stats += partitions.refresh_export(conn)
+    metrics.report(stats)
+    return stats
@@ -0,0 +1,522 @@
+"""
+Air Tracker Query Catalog
+
+The analytics queries shared by the notebook (code.py) and the dashboard
+(ui.py), each with its title, the parameters it takes and what its plan
+is expected to look like. Queries are templates: ``{fragment}`` markers
+are filled with optional filter conditions and their values are collected
+in the same order, so every value is a bound parameter.
+
+An EXPLAIN-based check runs the whole catalog against a database and
+fails on full table scans of ``flights``, on filesorts in queries that
+must be served in index order and on date-filtered queries that open
+every monthly partition, so index or schema changes that slow a panel
+down are caught before deploy.
+
+Usage:
+    python queries.py          # check every query plan; exit 1 on regressions
+"""
+
+import re
+import string
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import mysql.connector
+
+import config
+import partitions
+
+Fragment = Tuple[str, tuple]
+
+# ============================================================
+# FILTERS
+# ============================================================
+
+
+def sql_filters(conditions: Sequence[Tuple[str, object]]) -> Fragment:
+    """
+    Turn ``(sql_condition, value)`` pairs into an ``AND ...`` fragment,
+    skipping conditions whose value is empty.
+
+    Each ``%s`` in a condition is bound to its value; conditions without
+    placeholders act as switches.
+
+    Example:
+        >>> sql_filters([("f.origin_iata = %s", "DEL"), ("f.airline_code = %s", "")])
+        (' AND f.origin_iata = %s', ('DEL',))
+    """
+    sql, params = "", []
+    for condition, value in conditions:
+        if value:
+            sql += f" AND {condition}"
+            params.extend([value] * condition.count("%s"))
+    return sql, tuple(params)
+
+
+@dataclass(frozen=True)
+class FlightScope:
+    """
+    Filters shared by every query.
+
+    ``start``/``end`` are inclusive dates on ``scheduled_departure``; an
+    empty ``airport`` or ``airline`` means all.
+    """
+
+    start: Optional[date] = None
+    end: Optional[date] = None
+    airport: str = ""
+    airline: str = ""
+
+    @property
+    def active(self) -> bool:
+        """True if any filter is set (queries then read ``flights``, not rollups)."""
+        return bool(self.start or self.end or self.airport or self.airline)
+
+    def key(self) -> tuple:
+        return (self.start, self.end, self.airport, self.airline)
+
+    def sql(self, alias: str = "f", airport: bool = True) -> Fragment:
+        """
+        ``AND ...`` conditions on ``alias`` and their parameters.
+
+        The date bounds are a half-open range on ``scheduled_departure`` so
+        they can use the ``(…, scheduled_departure)`` indexes. The airport
+        matches departures and arrivals; pass ``airport=False`` for queries
+        that apply it themselves.
+        """
+        start = datetime.combine(self.start, datetime.min.time()) if self.start else None
+        end = datetime.combine(self.end + timedelta(days=1), datetime.min.time()) if self.end else None
+        return sql_filters([
+            (f"{alias}.scheduled_departure >= %s", start),
+            (f"{alias}.scheduled_departure < %s", end),
+            (f"({alias}.origin_iata = %s OR {alias}.destination_iata = %s)", self.airport if airport else ""),
+            (f"{alias}.airline_code = %s", self.airline),
+        ])
+
+
+def scope_fragments(scope: FlightScope) -> Dict[str, Fragment]:
+    """Template fragments derived from ``scope``."""
+    return {
+        "scope": scope.sql(),
+        "scope_except_airport": scope.sql(airport=False),
+        "to_airport": sql_filters([("f.destination_iata = %s", scope.airport)]),
+        "at_airport": sql_filters([("ap.iata_code = %s", scope.airport)]),
+        # Unfiltered, the latest arrivals departed shortly before the latest
+        # departure; a filtered scope is narrowed by its own conditions
+        "recent_only": ("" if scope.active else
+                        " AND f.scheduled_departure >= "
+                        "(SELECT MAX(scheduled_departure) - INTERVAL 2 DAY FROM flights)", ()),
+    }
+
+
+# Fragments the dashboard's paginated listings fill in; empty elsewhere
+LISTING_FRAGMENTS = ("filters", "keyset", "limit")
+
+# ============================================================
+# CATALOG
+# ============================================================
+
+
+@dataclass(frozen=True)
+class Query:
+    """
+    One analytics query.
+
+    Args:
+        name (str): Catalog key (``query1`` ...)
+        title (str): Panel title
+        sql (str): Template over ``flights``, with ``{fragment}`` markers
+        rollup_sql (str, optional): Equivalent over the rollup tables,
+            used when no filter is set
+        index_ordered (bool, optional): The ORDER BY must come from an
+            index; a filesort is a plan regression
+    """
+
+    name: str
+    title: str
+    sql: str
+    rollup_sql: Optional[str] = None
+    index_ordered: bool = False
+    fragments: Tuple[str, ...] = field(init=False)
+
+    def __post_init__(self):
+        names = tuple(f for _, f, _, _ in string.Formatter().parse(self.sql) if f)
+        object.__setattr__(self, "fragments", names)
+
+
+CATALOG: Dict[str, Query] = {q.name: q for q in [
+    Query(
+        "query1", "Total Flights per Aircraft Model",
+        """
+        SELECT a.model AS aircraft_model, COUNT(f.flight_id) AS flight_count
+        FROM flights f
+        JOIN aircraft a ON f.aircraft_registration = a.registration
+        WHERE TRUE{scope}
+        GROUP BY a.model
+        ORDER BY flight_count DESC
+        """,
+        rollup_sql="""
+        SELECT a.model AS aircraft_model, SUM(r.flight_count) AS flight_count
+        FROM rollup_flights_by_registration r
+        JOIN aircraft a ON r.aircraft_registration = a.registration
+        GROUP BY a.model
+        ORDER BY flight_count DESC
+        """,
+    ),
+    Query(
+        "query2", "Aircraft Used More Than 5 Flights",
+        """
+        SELECT a.registration, a.model, COUNT(f.flight_id) AS flight_count
+        FROM flights f
+        JOIN aircraft a ON f.aircraft_registration = a.registration
+        WHERE TRUE{scope}
+        GROUP BY a.registration, a.model
+        HAVING COUNT(f.flight_id) > 5
+        """,
+        rollup_sql="""
+        SELECT a.registration, a.model, r.flight_count
+        FROM rollup_flights_by_registration r
+        JOIN aircraft a ON r.aircraft_registration = a.registration
+        WHERE r.flight_count > 5
+        """,
+    ),
+    Query(
+        "query3", "Airports with >5 Outbound Flights",
+        """
+        SELECT ap.name AS airport_name, COUNT(f.flight_id) AS outbound_flights
+        FROM flights f
+        JOIN airport ap ON ap.iata_code = f.origin_iata
+        WHERE TRUE{scope}
+        GROUP BY ap.name
+        HAVING COUNT(f.flight_id) > 5
+        """,
+        rollup_sql="""
+        SELECT ap.name AS airport_name, SUM(r.flight_count) AS outbound_flights
+        FROM rollup_flights_by_origin r
+        JOIN airport ap ON ap.iata_code = r.origin_iata
+        GROUP BY ap.name
+        HAVING SUM(r.flight_count) > 5
+        """,
+    ),
+    Query(
+        "query4", "Top 3 Destination Airports",
+        """
+        SELECT ap.name, ap.city, COUNT(f.flight_id) AS arrival_count
+        FROM flights f
+        JOIN airport ap ON ap.iata_code = f.destination_iata
+        WHERE TRUE{scope}
+        GROUP BY ap.name, ap.city
+        ORDER BY arrival_count DESC
+        LIMIT 3
+        """,
+        rollup_sql="""
+        SELECT ap.name, ap.city, SUM(r.flight_count) AS arrival_count
+        FROM rollup_flights_by_destination r
+        JOIN airport ap ON ap.iata_code = r.destination_iata
+        GROUP BY ap.name, ap.city
+        ORDER BY arrival_count DESC
+        LIMIT 3
+        """,
+    ),
+    Query(
+        "query5_summary", "Domestic vs International Totals",
+        """
+        SELECT
+            CASE
+                WHEN ao.country = ad.country THEN 'Domestic'
+                ELSE 'International'
+            END AS flight_type,
+            COUNT(*) AS flights
+        FROM flights f
+        JOIN airport ao ON ao.iata_code = f.origin_iata
+        JOIN airport ad ON ad.iata_code = f.destination_iata
+        WHERE TRUE{scope}
+        GROUP BY flight_type
+        """,
+        rollup_sql="""
+        SELECT
+            CASE
+                WHEN ao.country = ad.country THEN 'Domestic'
+                ELSE 'International'
+            END AS flight_type,
+            SUM(r.flight_count) AS flights
+        FROM rollup_flights_by_route r
+        JOIN airport ao ON ao.iata_code = r.origin_iata
+        JOIN airport ad ON ad.iata_code = r.destination_iata
+        GROUP BY flight_type
+        """,
+    ),
+    Query(
+        "query5", "Domestic vs International Flights",
+        """
+        SELECT
+            f.flight_number,
+            ao.name AS origin_airport,
+            ad.name AS destination_airport,
+            CASE
+                WHEN ao.country = ad.country THEN 'Domestic'
+                ELSE 'International'
+            END AS flight_type,
+            f.scheduled_departure,
+            f.flight_id
+        FROM flights f
+        JOIN airport ao ON ao.iata_code = f.origin_iata
+        JOIN airport ad ON ad.iata_code = f.destination_iata
+        WHERE f.scheduled_departure IS NOT NULL{scope}{filters}{keyset}
+        ORDER BY f.scheduled_departure DESC, f.flight_id DESC{limit}
+        """,
+        index_ordered=True,
+    ),
+    Query(
+        "query6", "Most Recent Arrivals",
+        # Filtered, idx_flights_dest_sched and the date range narrow the
+        # rows sorted; unfiltered, {recent_only} bounds them to the last
+        # departures instead of sorting every flight by an expression
+        """
+        SELECT
+            f.flight_number,
+            f.aircraft_registration AS aircraft,
+            ao.name AS departure_airport,
+            COALESCE(f.actual_arrival, f.scheduled_arrival) AS arrival_time
+        FROM flights f
+        JOIN airport ao ON ao.iata_code = f.origin_iata
+        WHERE TRUE{to_airport}{scope_except_airport}{recent_only}
+        ORDER BY arrival_time DESC
+        LIMIT 5
+        """,
+    ),
+    Query(
+        "query7", "Airports With No Arriving Flights",
+        # Date and airline narrow the arrivals considered (ON), the airport
+        # narrows the airports listed (WHERE)
+        """
+        SELECT ap.iata_code, ap.name
+        FROM airport ap
+        LEFT JOIN flights f ON ap.iata_code = f.destination_iata{scope_except_airport}
+        WHERE f.flight_id IS NULL{at_airport}
+        """,
+    ),
+    Query(
+        "query8", "Flights by Airline and Status",
+        """
+        SELECT
+            f.airline_code,
+            SUM(CASE WHEN f.status = 'On Time' THEN 1 ELSE 0 END) AS on_time,
+            SUM(CASE WHEN f.status = 'Delayed' THEN 1 ELSE 0 END) AS delayed_count,
+            SUM(CASE WHEN f.status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count
+        FROM flights f
+        WHERE TRUE{scope}
+        GROUP BY f.airline_code
+        """,
+        rollup_sql="""
+        SELECT
+            NULLIF(airline_code, '') AS airline_code,
+            SUM(CASE WHEN status = 'On Time' THEN flight_count ELSE 0 END) AS on_time,
+            SUM(CASE WHEN status = 'Delayed' THEN flight_count ELSE 0 END) AS delayed_count,
+            SUM(CASE WHEN status = 'Cancelled' THEN flight_count ELSE 0 END) AS cancelled_count
+        FROM rollup_flights_by_airline_status
+        GROUP BY airline_code
+        """,
+    ),
+    Query(
+        "query9", "Cancelled Flights",
+        """
+        SELECT
+            f.flight_number,
+            f.aircraft_registration,
+            ao.name AS origin_airport,
+            ad.name AS destination_airport,
+            f.scheduled_departure,
+            f.flight_id
+        FROM flights f
+        JOIN airport ao ON ao.iata_code = f.origin_iata
+        JOIN airport ad ON ad.iata_code = f.destination_iata
+        WHERE f.status = 'Cancelled' AND f.scheduled_departure IS NOT NULL{scope}{filters}{keyset}
+        ORDER BY f.scheduled_departure DESC, f.flight_id DESC{limit}
+        """,
+        index_ordered=True,
+    ),
+    Query(
+        "query10", "City Pairs with Multiple Aircraft Models",
+        """
+        SELECT
+            ao.city AS origin_city,
+            ad.city AS destination_city,
+            COUNT(DISTINCT a.model) AS aircraft_models
+        FROM flights f
+        JOIN airport ao ON ao.iata_code = f.origin_iata
+        JOIN airport ad ON ad.iata_code = f.destination_iata
+        JOIN aircraft a ON a.registration = f.aircraft_registration
+        WHERE TRUE{scope}
+        GROUP BY ao.city, ad.city
+        HAVING COUNT(DISTINCT a.model) > 2
+        """,
+    ),
+    Query(
+        "query11", "% Delayed Flights per Destination Airport",
+        """
+        SELECT
+            ap.name AS destination_airport,
+            ROUND(
+                SUM(CASE WHEN f.status = 'Delayed' THEN 1 ELSE 0 END) * 100.0
+                / COUNT(f.flight_id),
+                2
+            ) AS delayed_percentage
+        FROM flights f
+        JOIN airport ap ON ap.iata_code = f.destination_iata
+        WHERE TRUE{scope}
+        GROUP BY ap.name
+        ORDER BY delayed_percentage DESC
+        """,
+        rollup_sql="""
+        SELECT
+            ap.name AS destination_airport,
+            ROUND(
+                SUM(r.delayed_count) * 100.0 / SUM(r.flight_count),
+                2
+            ) AS delayed_percentage
+        FROM rollup_flights_by_destination r
+        JOIN airport ap ON ap.iata_code = r.destination_iata
+        GROUP BY ap.name
+        ORDER BY delayed_percentage DESC
+        """,
+    ),
+]}
+
+
+def build(name: str, scope: FlightScope = FlightScope(), rollups: bool = True,
+          **fragments: Fragment) -> Tuple[str, tuple]:
+    """
+    Render a catalog query for ``scope``.
+
+    Without filters, queries that have a rollup equivalent use it.
+    Otherwise the ``flights`` template is filled in and the values of its
+    fragments are collected in the order they appear in the SQL.
+
+    Args:
+        name (str): Catalog key
+        scope (FlightScope, optional): Filters; default is all history
+        rollups (bool, optional): Allow the rollup tables; backends
+            without them (DuckDB) always aggregate ``flights``
+        **fragments: Extra ``(sql, params)`` fragments, e.g. the keyset
+            condition of a paginated listing
+
+    Returns:
+        tuple: ``(sql, params)`` ready for ``cursor.execute``
+
+    Example:
+        >>> sql, params = build("query6", FlightScope(airport="DEL"))
+        >>> params
+        ('DEL',)
+    """
+    query = CATALOG[name]
+    if rollups and query.rollup_sql and not scope.active:
+        return query.rollup_sql, ()
+
+    available = {key: ("", ()) for key in LISTING_FRAGMENTS}
+    available.update(scope_fragments(scope))
+    available.update(fragments)
+    sql_parts, params = {}, []
+    for key in query.fragments:
+        sql_parts[key], values = available[key]
+        params.extend(values)
+    return query.sql.format(**sql_parts), tuple(params)
+
+
+# ============================================================
+# PLAN CHECKS
+# ============================================================
+
+# Scope the filtered variants are checked with: a one-day, one-airport view
+SAMPLE_SCOPE = FlightScope(start=date(2026, 1, 1), end=date(2026, 1, 1), airport="DEL")
+
+
+def flights_aliases(query: str) -> set:
+    """Names under which ``flights`` appears in a query (table name and aliases)."""
+    aliases = {"flights"}
+    for alias in re.findall(r"\bflights\s+(?:AS\s+)?(\w+)", query, flags=re.IGNORECASE):
+        if alias.upper() not in {"JOIN", "WHERE", "GROUP", "ORDER", "LEFT", "INNER", "ON", "LIMIT"}:
+            aliases.add(alias)
+    return aliases
+
+
+def plan_problems(cursor, query: str, params: Sequence = (), filesort: bool = False,
+                  partition_count: int = 0) -> List[str]:
+    """
+    EXPLAIN ``query`` and describe what is wrong with its plan.
+
+    Args:
+        cursor: MySQL cursor
+        query (str): SELECT statement
+        params (Sequence, optional): Values for its ``%s`` placeholders
+        filesort (bool, optional): Also flag "Using filesort"
+        partition_count (int, optional): Partitions of ``flights``; if
+            set, flag reads of ``flights`` that open all of them
+
+    Returns:
+        list: Problems found (empty if the plan is fine)
+    """
+    cursor.execute("EXPLAIN " + query.strip().rstrip(";"), tuple(params) or None)
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    aliases = flights_aliases(query)
+    reads_flights = any(row.get("table") in aliases for row in rows)
+
+    problems = [
+        f"full scan of flights ({row.get('rows')} rows)"
+        for row in rows
+        if row.get("table") in aliases and row.get("type") == "ALL"
+    ]
+    if filesort and reads_flights and any("Using filesort" in (row.get("Extra") or "") for row in rows):
+        problems.append("filesort instead of index order")
+    if partition_count > 1:
+        problems += [
+            f"no partition pruning ({partition_count} partitions)"
+            for row in rows
+            if row.get("table") in aliases and len((row.get("partitions") or "").split(",")) >= partition_count
+        ]
+    return problems
+
+
+def check_catalog(cursor, scopes: Sequence[FlightScope] = (FlightScope(), SAMPLE_SCOPE)) -> Dict[str, List[str]]:
+    """
+    Check the plan of every catalog query under each scope.
+
+    Unfiltered variants of ``index_ordered`` queries must also avoid
+    filesorts; filtered ones only sort their (small) slice. Variants
+    with a date range must read only the partitions of that range.
+
+    Args:
+        cursor: MySQL cursor
+        scopes (Sequence[FlightScope], optional): Scopes to render with
+
+    Returns:
+        dict: ``"name [all|filtered]"`` -> problems, for failing variants only
+    """
+    failures = {}
+    partition_count = len(partitions.flight_partitions(cursor))
+    for name, query in CATALOG.items():
+        for scope in scopes:
+            label = f"{name} [{'filtered' if scope.active else 'all'}]"
+            sql, params = build(name, scope)
+            problems = plan_problems(
+                cursor, sql, params,
+                filesort=query.index_ordered and not scope.active,
+                partition_count=partition_count if scope.start and scope.end else 0,
+            )
+            if problems:
+                failures[label] = problems
+                print(f"{label}: {'; '.join(problems)}")
+            else:
+                print(f"{label}: OK")
+    return failures
+
+
+if __name__ == "__main__":
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    failed = check_catalog(connection.cursor(buffered=True))
+    connection.close()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,175 @@
+"""
+Air Tracker Query Backends
+
+Engines the dashboard can run the query catalog on. Both take the same
+SQL (the catalog's MySQL dialect with ``%s`` placeholders) and return a
+DataFrame with the same columns and values:
+
+- ``MySQLBackend``: the row store, through a pooled connection, with the
+  rollup tables serving unfiltered aggregates
+- ``DuckDBBackend``: an embedded columnar engine over the Parquet copy
+  written by ``parquet_store.py``. Aggregates read only the columns they
+  use, and date filters skip month partitions and row groups by their
+  min/max statistics; there is no server to run
+
+Pick one with ``AIR_TRACKER_QUERY_BACKEND`` (``mysql`` or ``duckdb``).
+Months archived out of MySQL (``partitions.py``) are only on DuckDB, so
+the dashboard sends filters reaching back to them there whichever
+backend is picked.
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+import config
+import data_version
+import metrics
+import parquet_store
+import partitions
+from db_pool import ConnectionPool
+
+
+class MySQLBackend:
+    """
+    Catalog queries on MySQL.
+
+    Args:
+        pool (ConnectionPool, optional): Connections to use; defaults to
+            a new pool sized by ``AIR_TRACKER_DB_POOL_SIZE``
+    """
+
+    name = "mysql"
+    rollups = True
+
+    def __init__(self, pool: Optional[ConnectionPool] = None):
+        self.pool = pool or ConnectionPool(name="air_tracker_ui")
+        self.workers = self.pool.size
+
+    def data_version(self) -> int:
+        """Version bumped by every ingestion commit."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                return data_version.current(cursor)
+            finally:
+                cursor.close()
+
+    def archived_until(self) -> Optional[datetime]:
+        """Start of the oldest month still in MySQL, or None if nothing was archived."""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                return partitions.archived_until(cursor)
+            finally:
+                cursor.close()
+
+    def run(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        """
+        Run ``query`` with ``params`` bound to its ``%s`` placeholders.
+
+        Raises:
+            mysql.connector.Error: If the query fails or exceeds
+                ``AIR_TRACKER_DB_QUERY_TIMEOUT``
+        """
+        with self.pool.connection() as conn:
+            # Server-side prepared statement: values are sent separately from
+            # the SQL text, so filters never need quoting or escaping
+            cursor = conn.cursor(prepared=True)
+            try:
+                with metrics.timer("query_seconds", backend=self.name):
+                    cursor.execute(query.strip().rstrip(";"), params)
+                    columns = [column[0] for column in cursor.description]
+                    rows = cursor.fetchall()
+                return pd.DataFrame(rows, columns=columns)
+            finally:
+                cursor.close()
+
+
+class DuckDBBackend:
+    """
+    Catalog queries on DuckDB over the Parquet export.
+
+    Each table of ``parquet_store.TABLES`` is a view over its files, so
+    the catalog SQL runs unchanged; only the placeholders are rewritten.
+    Rollup tables are not exported: the columnar scan of ``flights`` is
+    what they would save.
+
+    Args:
+        root (str, optional): Export directory (``AIR_TRACKER_PARQUET_DIR``)
+        workers (int, optional): Queries the dashboard may run at once
+
+    Raises:
+        FileNotFoundError: If nothing has been exported to ``root`` yet
+    """
+
+    name = "duckdb"
+    rollups = False
+
+    def __init__(self, root: str = config.PARQUET_DIR, workers: int = config.DB_POOL_SIZE):
+        import duckdb
+
+        if parquet_store.read_manifest(root) is None:
+            raise FileNotFoundError(
+                f"No Parquet export in {root!r}; run python parquet_store.py first"
+            )
+        self.root = os.path.abspath(root)
+        self.workers = workers
+        self._db = duckdb.connect()
+        for spec in parquet_store.TABLES.values():
+            self._db.execute(f"CREATE VIEW {spec.name} AS {self._scan(spec)}")
+
+    def _scan(self, spec: parquet_store.ParquetTable) -> str:
+        directory = os.path.join(self.root, spec.name).replace("'", "''")
+        if spec.partition_by is None:
+            return f"SELECT * FROM read_parquet('{directory}/*.parquet')"
+        # The month directory only prunes files; the view keeps the table's columns
+        return (
+            f"SELECT * EXCLUDE (month) FROM read_parquet("
+            f"'{directory}/*/*.parquet', hive_partitioning = true)"
+        )
+
+    def data_version(self) -> int:
+        """MySQL data version the current export was taken at."""
+        manifest = parquet_store.read_manifest(self.root)
+        return int(manifest["data_version"]) if manifest else 0
+
+    def archived_until(self) -> Optional[datetime]:
+        """None: the archived months are read beside the exported ones."""
+        return None
+
+    def run(self, query: str, params: tuple = ()) -> pd.DataFrame:
+        """Run ``query`` with ``params`` bound to its ``%s`` placeholders."""
+        # One connection per call (sharing the database), so panels can
+        # run from several threads
+        cursor = self._db.cursor()
+        try:
+            with metrics.timer("query_seconds", backend=self.name):
+                result = cursor.execute(query.strip().rstrip(";").replace("%s", "?"), list(params))
+                types = [str(column[1]) for column in result.description]
+                frame = result.df()
+        finally:
+            cursor.close()
+        # DuckDB sums integers as HUGEINT, which pandas receives as floats;
+        # MySQL returns whole numbers, so convert them back
+        for column, type_name in zip(frame.columns, types):
+            if type_name == "HUGEINT":
+                frame[column] = frame[column].astype("Int64")
+        return frame
+
+
+BACKENDS: Dict[str, type] = {"mysql": MySQLBackend, "duckdb": DuckDBBackend}
+
+
+def create_backend(name: str = config.QUERY_BACKEND):
+    """
+    Instantiate the backend called ``name`` with its default settings.
+
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown query backend: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,125 @@
+"""
+Air Tracker Rate Limiting
+
+Thread-safe token bucket shared by every worker that talks to the
+AeroDataBox API, so throughput is bounded by the RapidAPI quota instead
+of fixed sleeps between requests. Its rate can be changed and it can be
+paused while in use, which ``scheduler.py`` does from the API's answers.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``.
+    Each request takes one token; callers that find the bucket empty
+    reserve their token and sleep until it has been refilled, which keeps
+    waiting callers in FIFO order without busy looping.
+
+    Args:
+        rate (float): Tokens added per second (the request quota)
+        capacity (float, optional): Maximum burst size. Defaults to ``rate``
+            (at least 1)
+        clock (Callable, optional): Monotonic clock, injectable for tests
+        sleep (Callable, optional): Sleep function, injectable for tests
+
+    Example:
+        >>> bucket = TokenBucket(rate=5)
+        >>> bucket.acquire()
+        0.0
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        # _updated lies in the future while paused: nothing refills until then
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take ``tokens`` from the bucket, blocking until they are available.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            float: Seconds spent waiting for the tokens
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = max(0.0, self._updated - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take ``tokens`` only if they are available right now.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            bool: True if the tokens were taken
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Change the refill rate; tokens already accrued are kept.
+
+        Raises:
+            ValueError: If ``rate`` is not positive
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        with self._lock:
+            self._refill(self._clock())
+            self.rate = float(rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no tokens for ``seconds`` (e.g. a ``Retry-After``).
+
+        The bucket is emptied and stops refilling until the pause ends, so
+        later callers wait for it; callers already sleeping are not
+        recalled. A pause ending before one in progress has no effect.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + seconds)
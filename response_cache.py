@@ -0,0 +1,217 @@
+"""
+Air Tracker Response Cache
+
+Persistent, size-bounded cache for AeroDataBox responses. Entries are
+keyed by endpoint path plus query parameters and expire according to a
+per-endpoint TTL, so slow-changing airport and airframe records are only
+re-downloaded every few days while flights and delays stay fresh.
+
+The cache is a single SQLite file, which keeps it dependency-free and
+safe to share between the client's worker threads. The file is opened in
+WAL mode, so the worker processes of a sharded run (``shards.py``) share
+it too: readers never block, and writers queue for up to
+``AIR_TRACKER_CACHE_BUSY_TIMEOUT``. Writes are best effort: one that
+still finds the file locked is skipped, as a cache miss would be.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+import config
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Ordered (pattern, ttl seconds) rules; the first matching rule wins.
+# Paths that match no rule are not cached.
+DEFAULT_TTLS: List[Tuple[str, float]] = [
+    (r"^/airports/iata/[^/]+/delays$", 15 * MINUTE),
+    (r"^/airports/iata/[^/]+$", 7 * DAY),
+    (r"^/aircrafts/reg/[^/]+$", 30 * DAY),
+    (r"^/flights/", 5 * MINUTE),
+]
+
+# Returned by ResponseCache.get() when there is no usable entry, since
+# None is itself a valid cached value.
+MISS = object()
+
+
+class ResponseCache:
+    """
+    On-disk TTL cache for API responses with least-recently-used eviction.
+
+    Args:
+        path (str, optional): SQLite file to store entries in
+        ttls (list, optional): Ordered ``(regex, seconds)`` TTL rules
+        max_bytes (int, optional): Size budget for stored bodies; the
+            least recently used entries are evicted beyond it
+        clock (Callable, optional): Wall clock, injectable for tests
+        busy_timeout (float, optional): Seconds a write waits for another
+            process's lock on the file
+
+    Example:
+        >>> cache = ResponseCache("/tmp/air_tracker_cache.sqlite3")
+        >>> cache.set("/airports/iata/DEL", None, {"iata": "DEL"})
+        >>> cache.get("/airports/iata/DEL")
+        {'iata': 'DEL'}
+    """
+
+    def __init__(
+        self,
+        path: str = config.CACHE_PATH,
+        ttls: Optional[List[Tuple[str, float]]] = None,
+        max_bytes: int = config.CACHE_MAX_BYTES,
+        clock=time.time,
+        busy_timeout: float = config.CACHE_BUSY_TIMEOUT,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._rules: List[Tuple[Pattern, float]] = [
+            (re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)
+        ]
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                body TEXT,
+                size INTEGER,
+                expires_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build a stable cache key from an endpoint path and its parameters."""
+        if not params:
+            return path
+        return path + "?" + json.dumps(params, sort_keys=True, default=str)
+
+    def ttl_for(self, path: str) -> Optional[float]:
+        """Return the TTL in seconds for an endpoint path, or None if uncached."""
+        for pattern, ttl in self._rules:
+            if pattern.search(path):
+                return ttl
+        return None
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Look up a cached response.
+
+        Args:
+            path (str): Endpoint path
+            params (dict, optional): Query string parameters
+
+        Returns:
+            The cached JSON value, or ``MISS`` if absent or expired
+        """
+        key = self.make_key(path, params)
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, expires_at FROM responses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISS
+            body, expires_at = row
+            if expires_at <= now:
+                self._write("DELETE FROM responses WHERE cache_key = ?", (key,))
+                return MISS
+            self._write("UPDATE responses SET accessed_at = ? WHERE cache_key = ?", (now, key))
+        return json.loads(body)
+
+    def set(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]],
+        value: Any,
+        ttl: Optional[float] = None,
+    ) -> bool:
+        """
+        Store a response if its endpoint is cacheable.
+
+        Args:
+            path (str): Endpoint path
+            params (dict, optional): Query string parameters
+            value: JSON-serialisable response body
+            ttl (float, optional): Override the endpoint's TTL rule
+
+        Returns:
+            bool: True if the value was stored (False if uncacheable, or
+            if another process kept the file locked)
+        """
+        ttl = self.ttl_for(path) if ttl is None else ttl
+        if not ttl:
+            return False
+
+        key = self.make_key(path, params)
+        body = json.dumps(value)
+        now = self._clock()
+        with self._lock:
+            try:
+                self._db.execute(
+                    """
+                    INSERT OR REPLACE INTO responses
+                    (cache_key, body, size, expires_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (key, body, len(body), now + ttl, now),
+                )
+                self._evict()
+                self._db.commit()
+            except sqlite3.OperationalError as exc:
+                self._db.rollback()
+                print("Response cache write skipped:", exc)
+                return False
+        return True
+
+    def _write(self, sql: str, params: tuple) -> None:
+        """Run one best-effort write (caller holds the lock); skipped if the file stays locked."""
+        try:
+            self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.OperationalError:
+            self._db.rollback()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then LRU entries until under ``max_bytes``."""
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (self._clock(),))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_free = total - self.max_bytes
+        victims = []
+        for key, size in self._db.execute(
+            "SELECT cache_key, size FROM responses ORDER BY accessed_at"
+        ):
+            victims.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE cache_key = ?", victims)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._db.close()
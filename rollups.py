@@ -0,0 +1,255 @@
+"""
+Air Tracker Dashboard Rollups
+
+Small summary tables behind the dashboard's aggregate panels (queries 1,
+2, 3, 4, 8 and 11, and the domestic/international split of query 5). They are kept current with deltas computed from each
+batch of flight upserts and written in the same transaction, so the
+dashboard reads a few hundred rows instead of grouping all of
+``flights`` on every page load.
+
+Counts are keyed by aircraft registration rather than model: aircraft
+are enriched after their flights are loaded, so the model is joined in at
+read time from the (small) aircraft table.
+
+Months archived out of ``flights`` (``partitions.py``) stay counted, so
+the totals cover all history. They can no longer be recounted from
+MySQL, so :func:`rebuild` refuses to run once anything was archived.
+"""
+
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flight_parser import FLIGHT_COLUMNS
+
+_ID = FLIGHT_COLUMNS.index("flight_id")
+_REG = FLIGHT_COLUMNS.index("aircraft_registration")
+_ORIGIN = FLIGHT_COLUMNS.index("origin_iata")
+_DEST = FLIGHT_COLUMNS.index("destination_iata")
+_SCHEDULED = FLIGHT_COLUMNS.index("scheduled_departure")
+_STATUS = FLIGHT_COLUMNS.index("status")
+_AIRLINE = FLIGHT_COLUMNS.index("airline_code")
+
+# Statuses counted as delayed for query 11
+DELAYED_STATUS = "Delayed"
+
+REBUILD_SQL = [
+    "DELETE FROM rollup_flights_by_registration",
+    """
+    INSERT INTO rollup_flights_by_registration (aircraft_registration, flight_count)
+    SELECT aircraft_registration, COUNT(*) FROM flights
+    WHERE aircraft_registration IS NOT NULL GROUP BY aircraft_registration
+    """,
+    "DELETE FROM rollup_flights_by_origin",
+    """
+    INSERT INTO rollup_flights_by_origin (origin_iata, flight_count)
+    SELECT origin_iata, COUNT(*) FROM flights
+    WHERE origin_iata IS NOT NULL GROUP BY origin_iata
+    """,
+    "DELETE FROM rollup_flights_by_destination",
+    f"""
+    INSERT INTO rollup_flights_by_destination (destination_iata, flight_count, delayed_count)
+    SELECT destination_iata, COUNT(*),
+           SUM(CASE WHEN status = '{DELAYED_STATUS}' THEN 1 ELSE 0 END)
+    FROM flights
+    WHERE destination_iata IS NOT NULL GROUP BY destination_iata
+    """,
+    "DELETE FROM rollup_flights_by_route",
+    """
+    INSERT INTO rollup_flights_by_route (origin_iata, destination_iata, flight_count)
+    SELECT origin_iata, destination_iata, COUNT(*) FROM flights
+    WHERE origin_iata IS NOT NULL AND destination_iata IS NOT NULL
+    GROUP BY origin_iata, destination_iata
+    """,
+    "DELETE FROM rollup_flights_by_airline_status",
+    """
+    INSERT INTO rollup_flights_by_airline_status (airline_code, status, flight_count)
+    SELECT COALESCE(airline_code, ''), COALESCE(status, ''), COUNT(*) FROM flights
+    GROUP BY COALESCE(airline_code, ''), COALESCE(status, '')
+    """,
+]
+
+# Chunk size for looking up the previous state of a batch
+_LOOKUP_CHUNK_SIZE = 500
+
+
+def rebuild(cursor) -> None:
+    """
+    Recompute every rollup from ``flights``.
+
+    Needed to repair drift only: migrations 004 and 006 fill the tables
+    and normal ingestion keeps them current through
+    :func:`apply_flight_batch`.
+
+    Raises:
+        RuntimeError: If months were archived (``flight_archive`` has
+            rows): recounting ``flights`` would drop their counts
+    """
+    cursor.execute("SELECT COUNT(*) FROM flight_archive")
+    archived = cursor.fetchall()[0][0]
+    if archived:
+        raise RuntimeError(f"{archived} months are archived to Parquet; "
+                           "rebuilding the rollups from flights would drop their counts")
+    for statement in REBUILD_SQL:
+        cursor.execute(statement)
+
+
+def _previous_state(cursor, flight_ids: List[str], departures: Tuple) -> Dict[str, Tuple]:
+    """
+    Current ``(status, airline_code, destination_iata)`` of already stored
+    flights. ``departures`` is the ``(earliest, latest)`` scheduled
+    departure of the batch, so only the partitions holding it are searched.
+    """
+    state = {}
+    for start in range(0, len(flight_ids), _LOOKUP_CHUNK_SIZE):
+        chunk = flight_ids[start:start + _LOOKUP_CHUNK_SIZE]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT flight_id, status, airline_code, destination_iata FROM flights "
+            f"WHERE flight_id IN ({placeholders}) "
+            f"AND scheduled_departure BETWEEN %s AND %s FOR UPDATE",
+            [*chunk, *departures],
+        )
+        for flight_id, status, airline_code, destination_iata in cursor.fetchall():
+            state[flight_id] = (status, airline_code, destination_iata)
+    return state
+
+
+def flight_deltas(rows: Sequence[Sequence], previous: Dict[str, Tuple]) -> Dict[str, Counter]:
+    """
+    Work out how a batch of flight upserts changes each rollup.
+
+    A flight not seen before adds one to every rollup. A flight already
+    stored only changes if its status changed (the upsert keeps route,
+    aircraft and airline), which moves it between status buckets.
+
+    Args:
+        rows: Flight rows in ``FLIGHT_COLUMNS`` order
+        previous (dict): Output of the previous-state lookup; updated in
+            place as rows are applied, so repeats within a batch count once
+
+    Returns:
+        dict: Rollup name -> Counter of key -> delta
+    """
+    registration, origin = Counter(), Counter()
+    destination, delayed = Counter(), Counter()
+    route, airline_status = Counter(), Counter()
+
+    for row in rows:
+        flight_id, status = row[_ID], row[_STATUS]
+        old = previous.get(flight_id)
+        if old is None:
+            airline = row[_AIRLINE]
+            dest = row[_DEST]
+            if row[_REG]:
+                registration[row[_REG]] += 1
+            if row[_ORIGIN]:
+                origin[row[_ORIGIN]] += 1
+            if dest:
+                destination[dest] += 1
+                delayed[dest] += status == DELAYED_STATUS
+            if row[_ORIGIN] and dest:
+                route[(row[_ORIGIN], dest)] += 1
+            airline_status[(airline or "", status or "")] += 1
+            previous[flight_id] = (status, airline, dest)
+        else:
+            old_status, airline, dest = old
+            if old_status != status:
+                airline_status[(airline or "", old_status or "")] -= 1
+                airline_status[(airline or "", status or "")] += 1
+                if dest:
+                    delayed[dest] += (status == DELAYED_STATUS) - (old_status == DELAYED_STATUS)
+            previous[flight_id] = (status, airline, dest)
+
+    return {
+        "registration": registration,
+        "origin": origin,
+        "destination": destination,
+        "delayed": delayed,
+        "route": route,
+        "airline_status": airline_status,
+    }
+
+
+def _upsert(cursor, sql: str, values: List[tuple]) -> None:
+    # Sorted, so concurrent writers (sharded ingestion) lock the rows of
+    # one statement in the same order; deadlocks across statements are
+    # retried by pipeline.write_window
+    if values:
+        cursor.executemany(sql, sorted(values))
+
+
+def apply_deltas(cursor, deltas: Dict[str, Counter]) -> None:
+    """Add ``deltas`` to the rollup tables (on the caller's transaction)."""
+    _upsert(
+        cursor,
+        """
+        INSERT INTO rollup_flights_by_registration (aircraft_registration, flight_count)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE flight_count = flight_count + VALUES(flight_count)
+        """,
+        [(key, n) for key, n in deltas["registration"].items() if n],
+    )
+    _upsert(
+        cursor,
+        """
+        INSERT INTO rollup_flights_by_origin (origin_iata, flight_count)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE flight_count = flight_count + VALUES(flight_count)
+        """,
+        [(key, n) for key, n in deltas["origin"].items() if n],
+    )
+    destinations = set(deltas["destination"]) | set(deltas["delayed"])
+    _upsert(
+        cursor,
+        """
+        INSERT INTO rollup_flights_by_destination (destination_iata, flight_count, delayed_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            flight_count = flight_count + VALUES(flight_count),
+            delayed_count = delayed_count + VALUES(delayed_count)
+        """,
+        [
+            (key, deltas["destination"][key], deltas["delayed"][key])
+            for key in destinations
+            if deltas["destination"][key] or deltas["delayed"][key]
+        ],
+    )
+    _upsert(
+        cursor,
+        """
+        INSERT INTO rollup_flights_by_route (origin_iata, destination_iata, flight_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE flight_count = flight_count + VALUES(flight_count)
+        """,
+        [(origin, dest, n) for (origin, dest), n in deltas["route"].items() if n],
+    )
+    _upsert(
+        cursor,
+        """
+        INSERT INTO rollup_flights_by_airline_status (airline_code, status, flight_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE flight_count = flight_count + VALUES(flight_count)
+        """,
+        [(airline, status, n) for (airline, status), n in deltas["airline_status"].items() if n],
+    )
+
+
+def apply_flight_batch(cursor, rows: Sequence[Sequence]) -> Optional[Dict[str, Counter]]:
+    """
+    ``BulkLoader`` flush hook: update the rollups for a batch of flight
+    rows about to be upserted, on the same cursor and transaction.
+
+    Args:
+        cursor: The loader's cursor
+        rows: Flight rows in ``FLIGHT_COLUMNS`` order
+
+    Returns:
+        dict: The deltas applied, or None for an empty batch
+    """
+    if not rows:
+        return None
+    departures = [row[_SCHEDULED] for row in rows]
+    previous = _previous_state(cursor, list({row[_ID] for row in rows}), (min(departures), max(departures)))
+    deltas = flight_deltas(rows, previous)
+    apply_deltas(cursor, deltas)
+    return deltas
@@ -0,0 +1,345 @@
+"""
+Air Tracker Request Scheduling
+
+Decides when AeroDataBox requests are sent and what happens when they
+fail, from what the API answers:
+
+- Rate: the token bucket's rate adapts. Every 2xx response raises it a
+  little, up to ``AIR_TRACKER_API_RATE_MAX`` (by default the configured
+  rate, or what the rate window's quota headers leave room for); a 429
+  halves it, so the client settles just under the plan's per-second limit.
+  Other client errors (401, 403, 404...) leave the rate alone.
+- Quota headers: when RapidAPI's ``X-RateLimit-Remaining`` reports the
+  current rate window empty, the bucket is paused until
+  ``X-RateLimit-Reset`` instead of spending a request on a 429. When
+  ``X-RateLimit-Requests-Remaining`` reports the plan's quota used up,
+  requests fail without being sent until ``X-RateLimit-Requests-Reset``.
+- ``Retry-After``: a 429 pauses the whole bucket for the time given (the
+  limit is per account, not per request) and the request is retried.
+- Retries: connection errors, timeouts and 5xx responses are retried
+  with full-jitter exponential backoff, up to ``AIR_TRACKER_API_MAX_RETRIES``.
+- Circuit breakers: one per endpoint, closed again by a 2xx response.
+  After ``AIR_TRACKER_API_BREAKER_FAILURES`` failures in a row, requests to that endpoint fail at once for
+  ``AIR_TRACKER_API_BREAKER_RESET`` seconds, then one trial request
+  decides whether it closes, so a failing endpoint does not hold up the
+  others' workers.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+import config
+import metrics
+from ratelimit import TokenBucket
+
+# Statuses worth sending again: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Rate added per successful response, and factor applied on a 429
+RATE_INCREASE = 0.1
+RATE_DECREASE = 0.5
+
+# RapidAPI headers of the plan's quota and of the current rate window
+PLAN_REMAINING_HEADER = "X-RateLimit-Requests-Remaining"
+PLAN_RESET_HEADER = "X-RateLimit-Requests-Reset"
+WINDOW_REMAINING_HEADER = "X-RateLimit-Remaining"
+WINDOW_RESET_HEADER = "X-RateLimit-Reset"
+
+
+class CircuitOpenError(requests.RequestException):
+    """An endpoint's circuit breaker is open; the request was not sent."""
+
+
+class QuotaExhaustedError(requests.RequestException):
+    """The plan's quota is used up; the request was not sent."""
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a ``Retry-After`` header: delay seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait (never negative), or None if absent or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+def _header_float(response: requests.Response, name: str) -> Optional[float]:
+    try:
+        return float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one endpoint.
+
+    Args:
+        failures (int, optional): Consecutive failures that open it
+        reset_after (float, optional): Seconds it stays open before a
+            trial request is let through
+        clock (Callable, optional): Monotonic clock, injectable for tests
+    """
+
+    def __init__(self, failures: int = config.API_BREAKER_FAILURES,
+                 reset_after: float = config.API_BREAKER_RESET,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._clock = clock
+        self._failed = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._clock() - self._opened_at >= self.reset_after else "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; claims the trial when half-open."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self._clock() - self._opened_at < self.reset_after:
+                return False
+            self._trial = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+            self._trial = False
+
+    def release(self) -> None:
+        """Give back a half-open trial whose answer said nothing about the endpoint."""
+        with self._lock:
+            self._trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failed += 1
+            if self._trial or self._failed >= self.failures:
+                self._opened_at = self._clock()
+            self._trial = False
+
+
+class RequestScheduler:
+    """
+    Paces, retries and guards the requests of one API client.
+
+    Args:
+        limiter (TokenBucket): Bucket whose rate is adapted; share it
+            (and the scheduler) between clients that share a quota
+        max_rate (float, optional): Highest rate the bucket may reach;
+            0 starts at the limiter's rate and raises it to what the
+            rate window's quota headers leave room for
+        quota_share (float, optional): Share of the header-reported room
+            this scheduler may use (``1 / shards`` when several processes
+            spend the same account)
+        min_rate (float, optional): Lowest rate 429s may push it down to
+        max_retries (int, optional): Retries per request after the first try
+        backoff_base (float, optional): Backoff ceiling of the first retry;
+            doubles with every retry
+        backoff_max (float, optional): Largest backoff ceiling
+        max_retry_after (float, optional): Longest ``Retry-After`` waited
+            for; a longer one means the quota is exhausted
+        breaker_failures (int, optional): See :class:`CircuitBreaker`
+        breaker_reset (float, optional): See :class:`CircuitBreaker`
+        clock (Callable, optional): Monotonic clock, injectable for tests
+        sleep (Callable, optional): Sleep function, injectable for tests
+
+    Example:
+        >>> scheduler = RequestScheduler(TokenBucket(rate=5))
+        >>> response = scheduler.send("airport", lambda: session.get(url))
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        max_rate: float = config.API_RATE_MAX,
+        quota_share: float = 1.0,
+        min_rate: float = config.API_RATE_MIN,
+        max_retries: int = config.API_MAX_RETRIES,
+        backoff_base: float = config.API_BACKOFF_BASE,
+        backoff_max: float = config.API_BACKOFF_MAX,
+        max_retry_after: float = config.API_MAX_RETRY_AFTER,
+        breaker_failures: int = config.API_BREAKER_FAILURES,
+        breaker_reset: float = config.API_BREAKER_RESET,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.limiter = limiter
+        self.max_rate = max(max_rate, limiter.rate)
+        self._base_max_rate = self.max_rate
+        self._follow_quota = max_rate <= 0
+        self.quota_share = quota_share
+        self.min_rate = min(min_rate, limiter.rate)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._exhausted_until: Optional[float] = None
+        self._decrease_hold_until = 0.0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    # ============================================================
+    # STATE
+    # ============================================================
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(
+                    self.breaker_failures, self.breaker_reset, self._clock
+                )
+            return self._breakers[endpoint]
+
+    def _set_rate(self, rate: float) -> None:
+        self.limiter.set_rate(min(self.max_rate, max(self.min_rate, rate)))
+        metrics.set_gauge("api_rate", self.limiter.rate)
+
+    def _exhausted(self, seconds: float) -> None:
+        with self._lock:
+            self._exhausted_until = self._clock() + seconds
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter delay before retry number ``retry`` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    def _observe_quota(self, response: requests.Response) -> None:
+        remaining = _header_float(response, PLAN_REMAINING_HEADER)
+        if remaining is not None:
+            metrics.set_gauge("api_quota_remaining", remaining)
+            reset = _header_float(response, PLAN_RESET_HEADER)
+            if remaining <= 0 and reset:
+                self._exhausted(reset)
+        remaining = _header_float(response, WINDOW_REMAINING_HEADER)
+        reset = _header_float(response, WINDOW_RESET_HEADER)
+        if remaining is not None and remaining <= 0 and reset:
+            self.limiter.pause(min(reset, self.max_retry_after))
+        elif self._follow_quota and remaining is not None and reset:
+            # Spreading what is left of the window over its remaining seconds
+            with self._lock:
+                self.max_rate = max(self._base_max_rate, remaining / reset * self.quota_share)
+
+    def _throttled(self, hold: float) -> None:
+        # Requests already in flight answer 429 too; slow down once per episode
+        with self._lock:
+            now = self._clock()
+            if now >= self._decrease_hold_until:
+                self._set_rate(self.limiter.rate * RATE_DECREASE)
+                self._decrease_hold_until = now + hold
+
+    def _succeeded(self) -> None:
+        with self._lock:
+            if self.limiter.rate < self.max_rate:
+                self._set_rate(self.limiter.rate + RATE_INCREASE)
+
+    # ============================================================
+    # SENDING
+    # ============================================================
+
+    def send(self, endpoint: str, request: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send ``request`` when the rate allows, retrying transient failures.
+
+        Args:
+            endpoint (str): Name the request is paced, guarded and counted
+                under (one circuit breaker per name)
+            request (Callable): Performs the HTTP request once
+
+        Returns:
+            requests.Response: The first final response (any status not in
+            ``RETRY_STATUSES``), or the last one once retries run out. Only
+            a 2xx raises the rate and closes the endpoint's breaker
+
+        Raises:
+            QuotaExhaustedError: If the plan is used up until later than
+                ``max_retry_after``
+            CircuitOpenError: If the endpoint's breaker is open
+            requests.RequestException: The last connection error or
+                timeout once retries run out
+        """
+        breaker = self.breaker(endpoint)
+        retry = 0
+        while True:
+            if self._exhausted_until is not None and self._clock() < self._exhausted_until:
+                raise QuotaExhaustedError(f"API quota exhausted; resets in "
+                                          f"{self._exhausted_until - self._clock():.0f}s")
+            if not breaker.allow():
+                metrics.inc("api_requests_total", endpoint=endpoint, status="circuit_open")
+                raise CircuitOpenError(f"Circuit open for {endpoint}")
+
+            metrics.observe("ratelimit_wait_seconds", self.limiter.acquire(), endpoint=endpoint)
+            try:
+                with metrics.timer("api_request_seconds", endpoint=endpoint):
+                    response = request()
+            except requests.RequestException:
+                metrics.inc("api_requests_total", endpoint=endpoint, status="error")
+                breaker.failure()
+                if retry >= self.max_retries:
+                    raise
+                delay = self.backoff(retry)
+            else:
+                status = response.status_code
+                metrics.inc("api_requests_total", endpoint=endpoint, status=status)
+                self._observe_quota(response)
+                if status not in RETRY_STATUSES:
+                    if 200 <= status < 300:
+                        breaker.success()
+                        self._succeeded()
+                    else:
+                        # A 401/403/404 is final but no sign of a healthy endpoint
+                        breaker.release()
+                    return response
+                if status == 429:
+                    # The endpoint answered: throttling is the bucket's business
+                    breaker.success()
+                    metrics.inc("api_rate_limited_total", endpoint=endpoint)
+                    retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                    if retry_after is not None and retry_after > self.max_retry_after:
+                        self._exhausted(retry_after)
+                        raise QuotaExhaustedError(f"API quota exhausted; retry after {retry_after:.0f}s")
+                    # Everyone waits out a 429, not just this request
+                    delay = retry_after if retry_after is not None else self.backoff(retry)
+                    self._throttled(max(delay, 1.0))
+                    self.limiter.pause(delay)
+                    delay = 0.0
+                else:
+                    breaker.failure()
+                    retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+                    delay = min(retry_after, self.max_retry_after) if retry_after is not None \
+                        else self.backoff(retry)
+                if retry >= self.max_retries:
+                    return response
+
+            metrics.inc("api_retries_total", endpoint=endpoint)
+            retry += 1
+            if delay > 0:
+                self._sleep(delay)
@@ -0,0 +1,289 @@
+"""
+Air Tracker Sharded Ingestion
+
+Spreads one ingestion run over several worker processes, for airport
+sets in the hundreds. The tracked airports come from configuration
+(``AIR_TRACKER_AIRPORTS_FILE`` or ``AIR_TRACKER_AIRPORTS``) and are dealt
+round-robin into one shard per process. Every worker has its own
+MySQL connection and its own API client, paced at an equal share of the
+global rate (``AIR_TRACKER_API_RATE`` and the scheduler's range divided
+by the number of shards), so together they stay within the plan. All of
+them share the response cache file.
+
+The coordinator (:func:`run`) runs two phases over one process pool:
+
+1. Each shard loads its airports and their new flights (incrementally,
+   behind each airport's watermark) and reports the registrations seen.
+2. The registrations, deduplicated across shards, are sharded again and
+   the missing aircraft fetched, so no aircraft is requested twice.
+
+Results arrive as shards finish: the coordinator prints progress, merges
+load totals, failed items and each worker's metrics into its own
+registry, refreshes the Parquet copy once at the end and writes the
+usual ``metrics.report``. An airport belongs to one shard, so its
+watermark and delay sketches are written by one process only. Rollup
+rows, ``data_version`` and the Parquet dirty months are shared, so two
+shards' transactions can still deadlock or time out on them; the flight
+window is then rolled back and written again
+(``pipeline.write_window``).
+
+Usage:
+    air-tracker ingest --processes 8
+"""
+
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+import config
+import metrics
+from bulk_loader import LoadStats
+
+IATA_PATTERN = re.compile(r"^[A-Z0-9]{3}$")
+
+Failure = Tuple[str, str]
+
+
+# ============================================================
+# AIRPORTS
+# ============================================================
+
+
+def tracked_airports(path: str = config.AIRPORTS_FILE) -> List[str]:
+    """
+    The configured airports: the codes in ``path`` if set, else
+    ``config.AIRPORTS``. Duplicates are dropped, first occurrence wins.
+
+    Raises:
+        ValueError: If a line of ``path`` is not an IATA code
+    """
+    if not path:
+        return list(dict.fromkeys(config.AIRPORTS))
+    codes = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            code = line.split("#", 1)[0].strip().upper()
+            if not code:
+                continue
+            if not IATA_PATTERN.match(code):
+                raise ValueError(f"{path}:{number}: not an IATA code: {code!r}")
+            codes.append(code)
+    return list(dict.fromkeys(codes))
+
+
+def shard(items: Iterable[str], count: int) -> List[List[str]]:
+    """Deal ``items`` round-robin into at most ``count`` shards, none of them empty."""
+    items = list(items)
+    count = max(1, min(count, len(items)))
+    return [items[index::count] for index in range(count)]
+
+
+def process_count(processes: int = config.INGEST_PROCESSES) -> int:
+    """``processes``, with 0 meaning one per CPU core."""
+    return processes if processes > 0 else os.cpu_count() or 1
+
+
+# ============================================================
+# WORKERS
+# ============================================================
+
+
+@dataclass
+class ShardResult:
+    """What a worker process reports back for one shard."""
+
+    index: int
+    items: int
+    stats: List[LoadStats]
+    failures: List[Failure]
+    metrics: Dict
+    registrations: Set[str] = field(default_factory=set)
+    seconds: float = 0.0
+
+
+def shard_client(shards: int):
+    """
+    API client paced at ``1 / shards`` of the configured rate and
+    concurrency. All shards share the one response cache file (opened in
+    WAL mode, see ``response_cache.py``), so whichever shard an airport or
+    registration lands in next run, its cached response and remembered
+    404 are found.
+    """
+    from aerodatabox import AeroDataBoxClient
+    from ratelimit import TokenBucket
+    from response_cache import ResponseCache
+    from scheduler import RequestScheduler
+
+    limiter = TokenBucket(config.API_RATE_PER_SEC / shards, max(1.0, config.API_BURST / shards))
+    scheduler = RequestScheduler(
+        limiter,
+        max_rate=config.API_RATE_MAX / shards,
+        quota_share=1 / shards,
+        min_rate=config.API_RATE_MIN / shards,
+    )
+    return AeroDataBoxClient(
+        scheduler=scheduler,
+        max_workers=max(1, -(-config.API_MAX_WORKERS // shards)),
+        cache=ResponseCache(),
+    )
+
+
+def _in_worker(index: int, shards: int, items: List[str],
+               work: Callable) -> ShardResult:
+    import mysql.connector
+
+    # Worker processes are reused between phases: count each task alone
+    metrics.REGISTRY.reset()
+    started = time.perf_counter()
+    failures: List[Failure] = []
+    client = shard_client(shards)
+    conn = mysql.connector.connect(**config.DB_CONFIG)
+    try:
+        stats, registrations = work(client, conn, items, failures)
+    finally:
+        conn.close()
+    return ShardResult(index, len(items), stats, failures, metrics.REGISTRY.snapshot(),
+                       registrations, time.perf_counter() - started)
+
+
+def _airports_and_flights(client, conn, iata_codes, failures):
+    import pipeline
+
+    airport_stats = pipeline.ingest_airports(client, conn, iata_codes, failures)
+    flight_stats, registrations = pipeline.ingest_flights_incremental(
+        client, conn, iata_codes, failures=failures
+    )
+    return [airport_stats, flight_stats], registrations
+
+
+def _aircraft(client, conn, registrations, failures):
+    import pipeline
+
+    return [pipeline.ingest_aircraft(client, conn, registrations, failures)], set()
+
+
+def ingest_airports_shard(index: int, shards: int, iata_codes: List[str]) -> ShardResult:
+    """Worker task of phase 1: airports and incremental flights of one shard."""
+    return _in_worker(index, shards, iata_codes, _airports_and_flights)
+
+
+def ingest_aircraft_shard(index: int, shards: int, registrations: List[str]) -> ShardResult:
+    """Worker task of phase 2: missing aircraft of one shard of registrations."""
+    return _in_worker(index, shards, registrations, _aircraft)
+
+
+# ============================================================
+# COORDINATOR
+# ============================================================
+
+
+def merge_load_stats(stats: Sequence[LoadStats]) -> List[LoadStats]:
+    """
+    One ``LoadStats`` per table, in first-seen order. Rows, batches and
+    commits add up; seconds is the slowest shard's, as shards run side
+    by side.
+    """
+    merged: Dict[str, LoadStats] = {}
+    for load in stats:
+        total = merged.setdefault(load.table, LoadStats(load.table))
+        total.rows += load.rows
+        total.batches += load.batches
+        total.commits += load.commits
+        total.seconds = max(total.seconds, load.seconds)
+    return list(merged.values())
+
+
+def _run_phase(pool: ProcessPoolExecutor, task: Callable, name: str, shards: List[List[str]],
+               failures: List[Failure], crashed: List[str]) -> List[ShardResult]:
+    futures = {pool.submit(task, index, len(shards), items): index for index, items in enumerate(shards)}
+    results = []
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            result = future.result()
+        except Exception as exc:
+            print(f"{name} shard {index + 1}/{len(shards)} failed: {exc}")
+            failures.append((f"{name} shard {index + 1}", str(exc)))
+            crashed.append(f"{name} shard {index + 1}")
+            continue
+        metrics.REGISTRY.merge(result.metrics, shard=index)
+        failures.extend(result.failures)
+        rows = sum(load.rows for load in result.stats)
+        print(f"{name} shard {index + 1}/{len(shards)} done: {result.items} items, {rows} rows, "
+              f"{len(result.failures)} failures in {result.seconds:.1f}s")
+        results.append(result)
+    return results
+
+
+def run(iata_codes: Iterable[str], processes: int = config.INGEST_PROCESSES
+        ) -> Tuple[List[LoadStats], List[Failure]]:
+    """
+    Ingest ``iata_codes`` across worker processes (see module docstring).
+
+    Args:
+        iata_codes (Iterable[str]): Airports to track
+        processes (int, optional): Worker processes, 0 for one per core;
+            never more than there are airports
+
+    Returns:
+        tuple: ``(LoadStats per table, failures)``, where failures are
+        ``(item, error)`` of every request that failed and of shards
+        that failed as a whole; failed flight windows are retried by
+        the next run, as the watermarks did not pass them
+
+    Raises:
+        RuntimeError: If a whole shard failed (e.g. lost its MySQL
+            connection), after the rest of the run has been reported
+    """
+    iata_codes = list(iata_codes)
+    if not iata_codes:
+        print("No airports to ingest")
+        return [], []
+    airport_shards = shard(iata_codes, process_count(processes))
+    failures: List[Failure] = []
+    crashed: List[str] = []
+    stats: List[LoadStats] = []
+    print(f"Ingesting {len(iata_codes)} airports in {len(airport_shards)} processes")
+
+    # Spawned, not forked: the coordinator may already run threads (metrics server)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(len(airport_shards), mp_context=context) as pool:
+        results = _run_phase(pool, ingest_airports_shard, "Flights", airport_shards, failures, crashed)
+        registrations: Set[str] = set()
+        for result in results:
+            stats += result.stats
+            registrations |= result.registrations
+
+        if registrations:
+            aircraft_shards = shard(sorted(registrations), len(airport_shards))
+            for result in _run_phase(pool, ingest_aircraft_shard, "Aircraft", aircraft_shards,
+                                     failures, crashed):
+                stats += result.stats
+
+        stats = merge_load_stats(stats)
+        import mysql.connector
+        import partitions
+
+        conn = mysql.connector.connect(**config.DB_CONFIG)
+        try:
+            stats += partitions.refresh_export(conn)
+        finally:
+            conn.close()
+
+    for load in stats:
+        print(f"Total {load}")
+    metrics.report(stats)
+    if failures:
+        print(f"{len(failures)} failures:")
+        for item, error in failures[:20]:
+            print(f"  {item}: {error}")
+        if len(failures) > 20:
+            print(f"  ... and {len(failures) - 20} more")
+
+    if crashed:
+        raise RuntimeError(f"{len(crashed)} shards failed: {', '.join(crashed)}")
+    return stats, failures
@@ -0,0 +1,186 @@
+"""
+Air Tracker Time Zones
+
+Every timestamp in ``flights`` is stored as naive UTC, so time-range
+filters ("the last 24 hours", a month) compare the column directly and
+stay index range scans. AeroDataBox sends both a UTC and a local time for
+each movement; the local one is only used when the UTC one is missing,
+and is resolved through its offset or, failing that, the airport's IANA
+zone from the ``airport`` table, looked up once per airport per process.
+
+Rows written before ingestion normalised everything kept the revised
+departure and scheduled arrival columns as local wall-clock time. The
+backfill job rewrites them month by month (see :func:`backfill`).
+
+Usage:
+    python timezones.py               # convert remaining local timestamps to UTC
+"""
+
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import mysql.connector
+
+import config
+import data_version
+import delay_stats
+import parquet_store
+import partitions
+from bulk_loader import LoadStats
+from flight_parser import to_utc
+
+# Airport -> zone, filled on first lookup; airports without a known zone
+# are asked for again, as ingestion may have added them since
+_AIRPORT_ZONES: Dict[str, ZoneInfo] = {}
+
+
+@lru_cache(maxsize=None)
+def zone(name: Optional[str]) -> Optional[ZoneInfo]:
+    """The ``ZoneInfo`` for an IANA name, or None if it is empty or unknown."""
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def airport_zones(cursor, iata_codes: Iterable[str]) -> Dict[str, ZoneInfo]:
+    """
+    Return IATA code -> time zone for the given airports.
+
+    Airports missing from the ``airport`` table or without a valid zone
+    are absent.
+    """
+    iata_codes = list(iata_codes)
+    missing = sorted({iata for iata in iata_codes if iata not in _AIRPORT_ZONES})
+    if missing:
+        placeholders = ", ".join(["%s"] * len(missing))
+        cursor.execute(
+            f"SELECT iata_code, timezone FROM airport WHERE iata_code IN ({placeholders})",
+            missing,
+        )
+        for iata, name in cursor.fetchall():
+            if zone(name) is not None:
+                _AIRPORT_ZONES[iata] = zone(name)
+    return {iata: _AIRPORT_ZONES[iata] for iata in iata_codes if iata in _AIRPORT_ZONES}
+
+
+# ============================================================
+# BACKFILL
+# ============================================================
+
+
+def _months(cursor) -> List[datetime]:
+    cursor.execute("SELECT MIN(scheduled_departure), MAX(scheduled_departure) FROM flights")
+    oldest, newest = cursor.fetchone() or (None, None)
+    if oldest is None:
+        return []
+    months, month = [], partitions.month_start(oldest)
+    while month <= newest:
+        months.append(month)
+        month = partitions.add_months(month, 1)
+    return months
+
+
+def _backfill_month(cursor, start: datetime, end: datetime) -> Tuple[int, int]:
+    """
+    Convert one month of ``flights`` to UTC.
+
+    Returns:
+        tuple: ``(rows changed, revised times resolved through a zone)``
+    """
+    in_month = "scheduled_departure >= %s AND scheduled_departure < %s"
+
+    # No UTC revised time: resolve the local one through the airport's zone
+    cursor.execute(
+        f"SELECT flight_id, scheduled_departure, origin_iata, actual_departure FROM flights "
+        f"WHERE {in_month} AND actual_arrival IS NULL AND actual_departure IS NOT NULL",
+        (start, end),
+    )
+    local_rows = cursor.fetchall()
+    zones = airport_zones(cursor, {origin for _, _, origin, _ in local_rows})
+    updates = []
+    for flight_id, scheduled, origin, local in local_rows:
+        # Left as is while the airport's zone is unknown; a later run picks it up
+        if origin in zones:
+            revised = to_utc(local, zones[origin])
+            updates.append((revised, revised, flight_id, scheduled))
+    if updates:
+        cursor.executemany(
+            "UPDATE flights SET actual_departure = %s, actual_arrival = %s, "
+            "scheduled_arrival = scheduled_departure "
+            "WHERE flight_id = %s AND scheduled_departure = %s",
+            updates,
+        )
+    skipped = len(local_rows) - len(updates)
+    if skipped:
+        print(f"Skipped {skipped} flights in {start:%Y-%m}: origin time zone unknown")
+
+    # The departures endpoint reports one movement, so the local columns
+    # hold the same instants as their UTC counterparts: copy those over
+    cursor.execute(
+        f"""
+        UPDATE flights SET
+            scheduled_arrival = scheduled_departure,
+            actual_departure = COALESCE(actual_arrival, actual_departure)
+        WHERE {in_month} AND (
+            NOT (scheduled_arrival <=> scheduled_departure)
+            OR (actual_arrival IS NOT NULL AND NOT (actual_departure <=> actual_arrival))
+        )
+        """,
+        (start, end),
+    )
+    return cursor.rowcount + len(updates), len(updates)
+
+
+def backfill(conn) -> List[LoadStats]:
+    """
+    Rewrite local-time ``flights`` values as UTC, one month per transaction.
+
+    Each month is marked for the next Parquet export and bumps the data
+    version. Revised times that only existed as local time change the
+    delays, so the delay statistics of a month where any were filled are
+    recomputed in the same transaction. Months already archived to Parquet
+    keep the values (and delay statistics) they were archived with. Safe
+    to re-run: converted rows no longer match.
+
+    Args:
+        conn: MySQL connection
+
+    Returns:
+        list: LoadStats per month that changed
+    """
+    cursor = conn.cursor(buffered=True)
+    stats = []
+    try:
+        for start in _months(cursor):
+            started = time.perf_counter()
+            end = partitions.add_months(start, 1)
+            rows, filled = _backfill_month(cursor, start, end)
+            if not rows:
+                conn.rollback()
+                continue
+            if filled:
+                # Only this month's days have new delays
+                delay_stats.rebuild(cursor, start, end)
+            parquet_store.mark_months(cursor, [parquet_store.month_of(start)])
+            data_version.bump(cursor)
+            conn.commit()
+            stats.append(LoadStats(f"flights {start:%Y-%m} -> UTC", rows=rows, batches=1,
+                                   commits=1, seconds=time.perf_counter() - started))
+            print(f"Converted {stats[-1]}" + (f", {filled} revised times filled" if filled else ""))
+    finally:
+        cursor.close()
+    if not stats:
+        print("All flight timestamps are already UTC")
+    return stats
+
+
+if __name__ == "__main__":
+    connection = mysql.connector.connect(**config.DB_CONFIG)
+    backfill(connection)
+    connection.close()
@@ -10,231 +10,382 @@ Version: 1.0
 Date: January 2026
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
 import streamlit as st
-import mysql.connector
 import pandas as pd
-from typing import Optional
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import config
+import metrics
+from queries import CATALOG, FlightScope, build, sql_filters
+from query_backend import create_backend
 
 # ============================================================
 # DATABASE CONNECTION
 # ============================================================
 
-# Database connection configuration
-DB_CONFIG = {
-    "host": "localhost",
-    "user": "root",
-    "password": "12345678",
-    "database": "air_tracker"
-}
+@st.cache_resource
+def query_backend():
+    """
+    Query engine shared by every session and rerun of this app.
 
-conn = mysql.connector.connect(**DB_CONFIG)
+    Created once per server process from ``AIR_TRACKER_QUERY_BACKEND``:
+    MySQL through a connection pool (size, query timeout and checkout
+    wait from ``config``), or DuckDB over the Parquet export.
+    """
+    return create_backend()
 
 
-def run_query(query: str) -> pd.DataFrame:
+@st.cache_resource
+def history_backend():
     """
-    Execute a SQL query and return results as a pandas DataFrame.
-    
-    Args:
-        query (str): SQL query string to execute
-        
-    Returns:
-        pd.DataFrame: Query results with column names as headers
-        
-    Raises:
-        mysql.connector.Error: If database query fails
-        
-    Example:
-        >>> query = "SELECT * FROM flights LIMIT 10"
-        >>> df = run_query(query)
-        >>> print(df.head())
+    DuckDB over the Parquet store, for filters reaching back to months
+    archived out of MySQL (``partitions.py``). Created on first use.
     """
-    return pd.read_sql(query, conn)
+    return create_backend("duckdb")
 
-st.set_page_config(page_title="Air Tracker Analytics", layout="wide")
-st.title("✈️ Air Tracker – Flight Analytics Dashboard")
 
-# ============================================================
-# 1️⃣ Flights per aircraft model
-# ============================================================
-st.header("1️⃣ Total Flights per Aircraft Model")
+@st.cache_resource
+def metrics_server():
+    """``/metrics`` of this server process, if ``AIR_TRACKER_METRICS_PORT`` is set."""
+    return metrics.serve()
+
+
+def engine(history: bool = False):
+    """The backend queries run on: the archive's, or the configured one."""
+    return history_backend() if history else query_backend()
+
+
+@st.cache_data(ttl=config.UI_VERSION_POLL_SECONDS, show_spinner=False)
+def current_data_version(history: bool = False) -> int:
+    """
+    Read the data version bumped by ingestion (or recorded by the last
+    Parquet export, for DuckDB).
+
+    Cached for ``UI_VERSION_POLL_SECONDS`` across all sessions, so page
+    views do not each hit the database just to check for new data.
+    """
+    return engine(history).data_version()
+
+
+@st.cache_data(ttl=config.UI_VERSION_POLL_SECONDS, show_spinner=False)
+def archived_until():
+    """Start of the oldest month still in MySQL (None if nothing is archived)."""
+    return query_backend().archived_until()
+
+
+@st.cache_data(max_entries=config.UI_CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_query(query: str, version: int, params: tuple = (), history: bool = False) -> pd.DataFrame:
+    """
+    Run ``query`` once per data version and share the result.
+
+    ``version`` is part of the cache key only: when ingestion commits new
+    data the key changes and the query runs again; results for older
+    versions are evicted once ``UI_CACHE_MAX_ENTRIES`` is reached.
+    ``params`` are bound to the ``%s`` placeholders of ``query``;
+    ``history`` runs it on :func:`history_backend`.
+    """
+    return engine(history).run(query, params)
 
-query1 = """
-SELECT a.model AS aircraft_model, COUNT(f.flight_id) AS flight_count
-FROM flights f
-JOIN aircraft a ON f.aircraft_registration = a.registration
-GROUP BY a.model
-ORDER BY flight_count DESC;
-"""
-st.dataframe(run_query(query1))
 
 # ============================================================
-# 2️⃣ Aircraft used more than 5 times
+# PANEL RENDERING
 # ============================================================
-st.header("2️⃣ Aircraft Used More Than 5 Flights")
 
-query2 = """
-SELECT a.registration, a.model, COUNT(f.flight_id) AS flight_count
-FROM flights f
-JOIN aircraft a ON f.aircraft_registration = a.registration
-GROUP BY a.registration, a.model
-HAVING COUNT(f.flight_id) > 5;
-"""
-st.dataframe(run_query(query2))
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+class KeysetPager:
+    """
+    Keyset pagination over ``flights`` ordered newest first.
+
+    Pages are addressed by the ``(scheduled_departure, flight_id)`` of the
+    last row shown rather than an OFFSET, so every page is an index range
+    scan of ``page_size + 1`` rows however deep the user pages. The cursors
+    of the pages visited are kept in ``st.session_state`` for "Previous".
+
+    Args:
+        key (str): Unique widget / session-state prefix
+        context (tuple, optional): Filters set outside the panel; the pager
+            returns to the first page whenever they change
+    """
+
+    def __init__(self, key: str, context: tuple = ()):
+        self.key = key
+        st.session_state.setdefault(f"{key}_cursors", [])
+        st.session_state.setdefault(f"{key}_next", None)
+        if st.session_state.get(f"{key}_context", context) != context:
+            self.reset()
+        st.session_state[f"{key}_context"] = context
+        self.page_size = st.selectbox(
+            "Rows per page", PAGE_SIZES, key=f"{key}_size", on_change=self.reset
+        )
+
+    @property
+    def _cursors(self) -> list:
+        return st.session_state[f"{self.key}_cursors"]
+
+    def reset(self) -> None:
+        """Go back to the first page (after a filter or page-size change)."""
+        st.session_state[f"{self.key}_cursors"] = []
+        st.session_state[f"{self.key}_next"] = None
+
+    def _next_page(self) -> None:
+        self._cursors.append(st.session_state[f"{self.key}_next"])
+
+    def _previous_page(self) -> None:
+        self._cursors.pop()
+
+    def fragments(self, alias: str = "f") -> dict:
+        """
+        ``keyset`` and ``limit`` fragments for the current page, for
+        :func:`queries.build`.
+        """
+        limit = (f" LIMIT {self.page_size + 1}", ())
+        if not self._cursors:
+            return {"keyset": ("", ()), "limit": limit}
+        departure, flight_id = self._cursors[-1]
+        keyset = (
+            f" AND ({alias}.scheduled_departure < %s"
+            f" OR ({alias}.scheduled_departure = %s AND {alias}.flight_id < %s))"
+        )
+        return {"keyset": (keyset, (departure, departure, flight_id)), "limit": limit}
+
+    def show(self, frame: pd.DataFrame) -> None:
+        """Render one page (``page_size + 1`` rows fetched) with navigation."""
+        has_next = len(frame) > self.page_size
+        page = frame.head(self.page_size)
+        if has_next:
+            last = page.iloc[-1]
+            st.session_state[f"{self.key}_next"] = (
+                last["scheduled_departure"].to_pydatetime(), last["flight_id"]
+            )
+        st.dataframe(page.drop(columns=["flight_id"]))
+
+        previous, page_label, following = st.columns([1, 2, 1])
+        previous.button(
+            "◀ Previous", key=f"{self.key}_prev",
+            disabled=not self._cursors, on_click=self._previous_page,
+        )
+        page_label.caption(f"Page {len(self._cursors) + 1}")
+        following.button(
+            "Next ▶", key=f"{self.key}_nextbtn",
+            disabled=not has_next, on_click=self._next_page,
+        )
+
+
+@dataclass
+class Panel:
+    """One dashboard table: where it renders and what fills it."""
+
+    slot: object
+    query: str
+    params: tuple = ()
+    pager: Optional[KeysetPager] = None
+
+
+def loading_slot():
+    """Placeholder shown where a panel's table will appear."""
+    slot = st.empty()
+    slot.caption("⏳ Loading…")
+    return slot
+
+
+def add_panel(query: str, params: tuple = (), pager: Optional[KeysetPager] = None) -> None:
+    """Reserve a slot at this point of the page for ``query``'s result."""
+    panels.append(Panel(loading_slot(), query, params, pager))
+
+
+def render_panels(panels: List[Panel], history: bool = False) -> float:
+    """
+    Run every panel's query concurrently and fill each placeholder as
+    soon as its result arrives.
+
+    All panels read the same data version, so the page is consistent
+    even if ingestion commits while it renders. A failing query only
+    replaces its own panel with an error.
+
+    Args:
+        panels (list): Panels in page order
+        history (bool, optional): Run them on :func:`history_backend`
+
+    Returns:
+        float: Seconds until the last panel was rendered
+    """
+    started = time.perf_counter()
+    version = current_data_version(history)
+
+    def timed(panel: Panel) -> Tuple[pd.DataFrame, float]:
+        query_started = time.perf_counter()
+        frame = cached_query(panel.query, version, panel.params, history)
+        return frame, time.perf_counter() - query_started
+
+    # Workers share this run's context so st.cache_data works in them
+    with ThreadPoolExecutor(
+        max_workers=engine(history).workers,
+        initializer=add_script_run_ctx,
+        initargs=(None, get_script_run_ctx()),
+    ) as executor:
+        futures = {executor.submit(timed, panel): panel for panel in panels}
+        for future in as_completed(futures):
+            panel = futures[future]
+            try:
+                frame, seconds = future.result()
+            except Exception as error:
+                panel.slot.error(f"Query failed: {error}")
+                continue
+            with panel.slot.container():
+                if panel.pager is not None:
+                    panel.pager.show(frame)
+                else:
+                    st.dataframe(frame)
+                st.caption(f"⏱️ {seconds:.2f}s")
+
+    elapsed = time.perf_counter() - started
+    metrics.observe("dashboard_page_seconds", elapsed)
+    return elapsed
+
+
+st.set_page_config(page_title="Air Tracker Analytics", layout="wide")
+st.title("✈️ Air Tracker – Flight Analytics Dashboard")
 
 # ============================================================
-# 3️⃣ Airports with more than 5 outbound flights
+# FILTERS
 # ============================================================
-st.header("3️⃣ Airports with >5 Outbound Flights")
+st.sidebar.header("Filters")
+
+backend = query_backend()
+metrics_server()
+
+# Options come from small tables and are cached per data version like panels
+_options_version = current_data_version()
+airport_codes = cached_query(
+    "SELECT iata_code FROM airport WHERE iata_code IS NOT NULL ORDER BY iata_code",
+    _options_version,
+)["iata_code"].tolist()
+airline_codes = cached_query(
+    "SELECT DISTINCT airline_code FROM "
+    + ("rollup_flights_by_airline_status" if backend.rollups else "flights")
+    + " WHERE airline_code <> '' ORDER BY airline_code",
+    _options_version,
+)["airline_code"].tolist()
+
+date_range = st.sidebar.date_input("Scheduled departure (UTC)", value=(), key="scope_dates")
+selected_airport = st.sidebar.selectbox("Airport", ["All"] + airport_codes, key="scope_airport")
+selected_airline = st.sidebar.selectbox("Airline", ["All"] + airline_codes, key="scope_airline")
+
+scope = FlightScope(
+    start=date_range[0] if date_range else None,
+    end=date_range[-1] if date_range else None,
+    airport="" if selected_airport == "All" else selected_airport,
+    airline="" if selected_airline == "All" else selected_airline,
+)
+# Dates before the oldest month kept in MySQL are only in the Parquet
+# archive; unfiltered pages stay on the rollups, which count archived flights
+_archived_until = archived_until() if scope.start else None
+history = _archived_until is not None and scope.start < _archived_until.date()
+page_backend = engine(history)
+
+if history:
+    st.sidebar.caption(
+        f"Flights before {_archived_until:%Y-%m-%d} are archived: panels read the Parquet store on DuckDB."
+    )
+    # Ingestion refreshes the export once anything is archived; until a
+    # running ingestion finishes, later months lag MySQL
+    if current_data_version(True) < current_data_version(False):
+        st.sidebar.caption("Later months are as of the last Parquet export, refreshed when ingestion finishes.")
+elif scope.active:
+    st.sidebar.caption("Panels read the filtered slice of `flights`.")
+elif backend.rollups:
+    st.sidebar.caption("No filters: aggregate panels read the precomputed rollups.")
+else:
+    st.sidebar.caption(f"No filters: {backend.name} aggregates all of `flights`.")
+
+# Panels are laid out first and filled in by render_panels() below
+panels: List[Panel] = []
+
+
+def section(number: str, name: str, suffix: str = "") -> None:
+    """Panel header using the catalog title of ``name``."""
+    st.header(f"{number} {CATALOG[name].title}{suffix}")
 
-query3 = """
-SELECT ap.name AS airport_name, COUNT(f.flight_id) AS outbound_flights
-FROM flights f
-JOIN airport ap ON ap.iata_code = f.origin_iata
-GROUP BY ap.name
-HAVING COUNT(f.flight_id) > 5;
-"""
-st.dataframe(run_query(query3))
 
 # ============================================================
-# 4️⃣ Top 3 destination airports
+# 1️⃣ - 4️⃣ Aircraft and airport totals
 # ============================================================
-st.header("4️⃣ Top 3 Destination Airports")
-
-query4 = """
-SELECT ap.name, ap.city, COUNT(f.flight_id) AS arrival_count
-FROM flights f
-JOIN airport ap ON ap.iata_code = f.destination_iata
-GROUP BY ap.name, ap.city
-ORDER BY arrival_count DESC
-LIMIT 3;
-"""
-st.dataframe(run_query(query4))
+for number, name in [("1️⃣", "query1"), ("2️⃣", "query2"), ("3️⃣", "query3"), ("4️⃣", "query4")]:
+    section(number, name)
+    add_panel(*build(name, scope, page_backend.rollups))
 
 # ============================================================
 # 5️⃣ Domestic vs International flights
 # ============================================================
-st.header("5️⃣ Domestic vs International Flights")
-
-query5 = """
-SELECT
-    f.flight_number,
-    ao.name AS origin_airport,
-    ad.name AS destination_airport,
-    CASE
-        WHEN ao.country = ad.country THEN 'Domestic'
-        ELSE 'International'
-    END AS flight_type
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-JOIN airport ad ON ad.iata_code = f.destination_iata;
-"""
-st.dataframe(run_query(query5))
+section("5️⃣", "query5")
+add_panel(*build("query5_summary", scope, page_backend.rollups))
+
+type5, origin5, destination5 = st.columns(3)
+pager5 = KeysetPager("q5", scope.key())
+flight_type5 = type5.selectbox(
+    "Flight type", ["All", "Domestic", "International"], key="q5_type", on_change=pager5.reset
+)
+filters5 = sql_filters([
+    ("ao.country = ad.country", flight_type5 == "Domestic"),
+    ("(ao.country = ad.country) IS NOT TRUE", flight_type5 == "International"),
+    ("f.origin_iata = %s", origin5.text_input("Origin IATA", key="q5_origin", on_change=pager5.reset).strip().upper()),
+    ("f.destination_iata = %s", destination5.text_input("Destination IATA", key="q5_dest", on_change=pager5.reset).strip().upper()),
+])
+add_panel(*build("query5", scope, filters=filters5, **pager5.fragments()), pager=pager5)
 
 # ============================================================
-# 6️⃣ 5 most recent arrivals at DEL
+# 6️⃣ 5 most recent arrivals at the selected airport
 # ============================================================
-st.header("6️⃣ Most Recent Arrivals at DEL")
-
-query6 = """
-SELECT
-    f.flight_number,
-    f.aircraft_registration AS aircraft,
-    ao.name AS departure_airport,
-    COALESCE(f.actual_arrival, f.scheduled_arrival) AS arrival_time
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-WHERE f.destination_iata = 'DEL'
-ORDER BY arrival_time DESC
-LIMIT 5;
-"""
-st.dataframe(run_query(query6))
+section("6️⃣", "query6", f" at {scope.airport or 'All Airports'}")
+add_panel(*build("query6", scope, page_backend.rollups))
 
 # ============================================================
 # 7️⃣ Airports with no arrivals
 # ============================================================
-st.header("7️⃣ Airports With No Arriving Flights")
-
-query7 = """
-SELECT ap.iata_code, ap.name
-FROM airport ap
-LEFT JOIN flights f ON ap.iata_code = f.destination_iata
-WHERE f.flight_id IS NULL;
-"""
-st.dataframe(run_query(query7))
+section("7️⃣", "query7")
+add_panel(*build("query7", scope, page_backend.rollups))
 
 # ============================================================
 # 8️⃣ Flights by airline & status
 # ============================================================
-st.header("8️⃣ Flights by Airline and Status")
-
-query8 = """
-SELECT
-    airline_code,
-    SUM(CASE WHEN status = 'On Time' THEN 1 ELSE 0 END) AS on_time,
-    SUM(CASE WHEN status = 'Delayed' THEN 1 ELSE 0 END) AS delayed_count,
-    SUM(CASE WHEN status = 'Cancelled' THEN 1 ELSE 0 END) AS cancelled_count
-FROM flights
-GROUP BY airline_code;
-"""
-st.dataframe(run_query(query8))
+section("8️⃣", "query8")
+add_panel(*build("query8", scope, page_backend.rollups))
 
 # ============================================================
 # 9️⃣ Cancelled flights
 # ============================================================
-st.header("9️⃣ Cancelled Flights")
-
-query9 = """
-SELECT
-    f.flight_number,
-    f.aircraft_registration,
-    ao.name AS origin_airport,
-    ad.name AS destination_airport,
-    f.scheduled_departure
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-JOIN airport ad ON ad.iata_code = f.destination_iata
-WHERE f.status = 'Cancelled'
-ORDER BY f.scheduled_departure DESC;
-"""
-st.dataframe(run_query(query9))
+section("9️⃣", "query9")
+
+origin9, destination9, airline9 = st.columns(3)
+pager9 = KeysetPager("q9", scope.key())
+filters9 = sql_filters([
+    ("f.origin_iata = %s", origin9.text_input("Origin IATA", key="q9_origin", on_change=pager9.reset).strip().upper()),
+    ("f.destination_iata = %s", destination9.text_input("Destination IATA", key="q9_dest", on_change=pager9.reset).strip().upper()),
+    ("f.airline_code = %s", airline9.text_input("Airline code", key="q9_airline", on_change=pager9.reset).strip().upper()),
+])
+add_panel(*build("query9", scope, filters=filters9, **pager9.fragments()), pager=pager9)
 
 # ============================================================
 # 🔟 City pairs with >2 aircraft models
 # ============================================================
-st.header("🔟 City Pairs with Multiple Aircraft Models")
-
-query10 = """
-SELECT
-    ao.city AS origin_city,
-    ad.city AS destination_city,
-    COUNT(DISTINCT a.model) AS aircraft_models
-FROM flights f
-JOIN airport ao ON ao.iata_code = f.origin_iata
-JOIN airport ad ON ad.iata_code = f.destination_iata
-JOIN aircraft a ON a.registration = f.aircraft_registration
-GROUP BY ao.city, ad.city
-HAVING COUNT(DISTINCT a.model) > 2;
-"""
-st.dataframe(run_query(query10))
+section("🔟", "query10")
+add_panel(*build("query10", scope, page_backend.rollups))
 
 # ============================================================
 # 1️⃣1️⃣ % of delayed flights per destination
 # ============================================================
-st.header("1️⃣1️⃣ % Delayed Flights per Destination Airport")
-
-query11 = """
-SELECT
-    ap.name AS destination_airport,
-    ROUND(
-        SUM(CASE WHEN f.status = 'Delayed' THEN 1 ELSE 0 END) * 100.0
-        / COUNT(f.flight_id),
-        2
-    ) AS delayed_percentage
-FROM flights f
-JOIN airport ap ON ap.iata_code = f.destination_iata
-GROUP BY ap.name
-ORDER BY delayed_percentage DESC;
-"""
-st.dataframe(run_query(query11))
+section("1️⃣1️⃣", "query11")
+add_panel(*build("query11", scope, page_backend.rollups))
 
-st.success("✅ All 11 analytics loaded successfully")
+# ============================================================
+# RUN ALL PANELS
+# ============================================================
+page_seconds = render_panels(panels, history)
+st.success(f"✅ All {len(panels)} analytics loaded in {page_seconds:.2f}s")
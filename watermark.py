@@ -0,0 +1,140 @@
+"""
+Air Tracker Ingestion Watermarks
+
+Per-airport record of how far flight ingestion has progressed, stored in
+the ``ingestion_watermark`` table. Incremental runs only request the
+time windows after an airport's watermark, split into chunks the API
+accepts (at most the window length in airport-local wall-clock time, so
+DST changes never stretch one), and advance the watermark in the same transaction as the
+flights written for those chunks.
+"""
+
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Format of the from/to path segments of the flights time-window endpoint
+API_LOCAL_FORMAT = "%Y-%m-%dT%H:%M"
+
+
+def utc_now() -> datetime:
+    """Current time as a naive UTC datetime truncated to the minute."""
+    return datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+
+
+def get_watermarks(cursor, iata_codes: Iterable[str]) -> Dict[str, datetime]:
+    """
+    Read the watermarks of the given airports.
+
+    Args:
+        cursor: MySQL cursor
+        iata_codes (Iterable[str]): Airports to look up
+
+    Returns:
+        dict: IATA code -> ``loaded_until`` (naive UTC); airports without
+        a watermark are absent
+    """
+    iata_codes = list(iata_codes)
+    if not iata_codes:
+        return {}
+    placeholders = ", ".join(["%s"] * len(iata_codes))
+    cursor.execute(
+        f"SELECT airport_iata, loaded_until FROM ingestion_watermark "
+        f"WHERE airport_iata IN ({placeholders})",
+        iata_codes,
+    )
+    return dict(cursor.fetchall())
+
+
+def set_watermark(cursor, iata: str, loaded_until: datetime) -> None:
+    """
+    Move an airport's watermark forward (never backwards).
+
+    Runs on the caller's cursor without committing, so the update is
+    committed together with the flights it covers.
+    """
+    cursor.execute(
+        """
+        INSERT INTO ingestion_watermark (airport_iata, loaded_until)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE
+            loaded_until = GREATEST(loaded_until, VALUES(loaded_until))
+        """,
+        (iata, loaded_until),
+    )
+
+
+def _wall_clock(utc_value: datetime, local_zone: Optional[tzinfo]) -> datetime:
+    """Naive local time of a naive UTC datetime, as :func:`to_local` formats it."""
+    if local_zone is None:
+        return utc_value
+    return utc_value.replace(tzinfo=timezone.utc).astimezone(local_zone).replace(tzinfo=None)
+
+
+def split_windows(start: datetime, end: datetime, max_span: timedelta,
+                  local_zone: Optional[tzinfo] = None) -> List[Tuple[datetime, datetime]]:
+    """
+    Split ``[start, end)`` into consecutive windows of at most ``max_span``.
+
+    The API is sent the windows in airport-local time and checks their
+    length on the wall clock, so with ``local_zone`` a window across a
+    change that moves the clocks forward (start of DST) is shortened
+    until its local span fits too.
+
+    Example:
+        >>> len(split_windows(datetime(2026, 1, 1), datetime(2026, 1, 2), timedelta(hours=12)))
+        2
+    """
+    windows = []
+    cursor = start
+    while cursor < end:
+        window_end = min(cursor + max_span, end)
+        local_start = _wall_clock(cursor, local_zone)
+        while _wall_clock(window_end, local_zone) - local_start > max_span:
+            window_end -= _wall_clock(window_end, local_zone) - local_start - max_span
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows
+
+
+def to_local(utc_value: datetime, local_zone: Optional[tzinfo]) -> str:
+    """
+    Format a naive UTC datetime as airport-local time for the API path.
+
+    Falls back to UTC when the airport's time zone is unknown (None); see
+    ``timezones.airport_zones``.
+    """
+    aware = utc_value.replace(tzinfo=timezone.utc)
+    if local_zone is not None:
+        aware = aware.astimezone(local_zone)
+    return aware.strftime(API_LOCAL_FORMAT)
+
+
+def plan_chunks(
+    watermarks: Dict[str, datetime],
+    iata_codes: Iterable[str],
+    now: datetime,
+    max_span: timedelta,
+    initial_lookback: timedelta,
+    overlap: timedelta,
+    lookahead: timedelta,
+    zones: Optional[Dict[str, Optional[tzinfo]]] = None,
+) -> Dict[str, List[Tuple[datetime, datetime]]]:
+    """
+    Work out which UTC windows each airport still needs.
+
+    An airport resumes from its watermark minus ``overlap`` (to pick up
+    late status changes of recent flights); airports without a watermark
+    start ``initial_lookback`` before ``now``. ``zones`` (IATA code ->
+    time zone, see ``timezones.airport_zones``) keeps each window within
+    ``max_span`` in the airport's local time as well.
+
+    Returns:
+        dict: IATA code -> ordered list of ``(start_utc, end_utc)`` windows
+    """
+    end = now + lookahead
+    plan = {}
+    for iata in iata_codes:
+        watermark = watermarks.get(iata)
+        start = watermark - overlap if watermark else now - initial_lookback
+        plan[iata] = split_windows(start, end, max_span, (zones or {}).get(iata))
+    return plan